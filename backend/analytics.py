@@ -0,0 +1,413 @@
+"""
+Аналитика изменений статусов заявок и кандидатов HH.
+
+Дашборды читают предагрегированную таблицу status_daily_rollup: по строке на
+(день, источник, статус) с числом изменений. Таблица обновляется в той же транзакции,
+что и запись истории статусов (record_status_change), при удалении заявки из нее
+вычитается удаленная история (remove_history), а полностью пересчитывается из
+status_history и hh_status_history командой:
+
+    python analytics.py
+
+Поэтому стоимость запроса дашборда зависит от числа дней в периоде, а не от размера истории.
+
+Воронка найма (funnel) считается по самой истории оконными функциями: LEAD(created_at) по
+записям заявки/кандидата дает момент выхода из статуса. Результат кэшируется в памяти
+воркера по диапазону дат. Сбрасывает его main.py по событиям кэша ответов (response_cache.on_change)
+после commit изменяющего запроса на всех воркерах; вычисление, начатое до сброса, в кэш не попадет.
+
+Показатели рекрутеров (recruiter_stats) считаются одним агрегирующим запросом по
+vacancy_assignments и кэшируются так же, со сбросом после изменения вакансий, назначений
+и пользователей на всех воркерах.
+"""
+import asyncio
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, literal_column, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import models
+from cache import TTLCache
+from config import ANALYTICS_CACHE_TTL, ANALYTICS_CACHE_MAX_ENTRIES
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Источники истории и префиксы статусов в ответе
+HISTORY_SOURCES = {
+    "application": (models.StatusHistory, ""),
+    "hh": (models.HHStatusHistory, "hh_"),
+}
+
+# Поддерживаемые периоды группировки
+GRANULARITIES = ("day", "month")
+
+# Этапы воронки найма по порядку
+FUNNEL_STAGES = ["новый", "собеседование", "оффер", "принят на работу"]
+
+# Воронка по диапазону дат: (start, end) -> ответ
+funnel_cache = TTLCache(maxsize=ANALYTICS_CACHE_MAX_ENTRIES, ttl=ANALYTICS_CACHE_TTL)
+
+# Показатели рекрутеров по периоду: (start_day, end_day) -> ответ
+recruiter_stats_cache = TTLCache(maxsize=ANALYTICS_CACHE_MAX_ENTRIES, ttl=ANALYTICS_CACHE_TTL)
+# Период показателей рекрутеров по умолчанию (недели до сегодняшнего дня)
+RECRUITER_STATS_DEFAULT_WEEKS = 12
+
+# События входа в статус из обеих историй. Заявка из бота создается в статусе "новый"
+# без записи в истории, поэтому вход в "новый" берется из applications.created_at.
+# {since} - фильтр начала периода (события раньше не влияют на LEAD более поздних)
+_FUNNEL_EVENTS_SQL = (
+    "SELECT 'application' AS source, application_id AS entity_id, lower(status) AS status, created_at "
+    "FROM status_history WHERE status IS NOT NULL AND application_id IS NOT NULL{since} "
+    "UNION ALL "
+    "SELECT 'application', id, 'новый', created_at FROM applications WHERE created_at IS NOT NULL{since} "
+    "UNION ALL "
+    "SELECT 'hh', candidate_id, lower(status), created_at "
+    "FROM hh_status_history WHERE status IS NOT NULL AND candidate_id IS NOT NULL{since}"
+)
+
+# Время в статусе - от входа до следующей записи той же заявки/кандидата; статус, из которого
+# еще не вышли, в процентили не попадает. GROUPING SETS дает разбивку по источникам и общий итог
+_FUNNEL_SQL = (
+    "WITH events AS ({events}), "
+    "transitions AS ("
+    "SELECT source, entity_id, status, created_at, "
+    "LEAD(created_at) OVER (PARTITION BY source, entity_id ORDER BY created_at) AS left_at "
+    "FROM events) "
+    "SELECT source, status, "
+    "count(DISTINCT (source, entity_id)) AS entities, "
+    "count(left_at) AS transitions, "
+    "percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM left_at - created_at)) AS median_seconds, "
+    "percentile_cont(0.9) WITHIN GROUP (ORDER BY extract(epoch FROM left_at - created_at)) AS p90_seconds "
+    "FROM transitions{until} "
+    "GROUP BY GROUPING SETS ((source, status), (status))"
+)
+
+# Дальний этап воронки, которого достигла каждая заявка/кандидат: дошедший до оффера считается
+# и прошедшим предыдущие этапы, даже если промежуточный статус не ставили
+_FUNNEL_REACH_SQL = (
+    "WITH events AS ({events}) "
+    "SELECT source, stage, count(*) AS entities FROM ("
+    "SELECT source, entity_id, max(array_position(CAST(:stages AS text[]), status)) AS stage "
+    "FROM events WHERE status = ANY(CAST(:stages AS text[])){until} "
+    "GROUP BY source, entity_id) reached "
+    "GROUP BY GROUPING SETS ((source, stage), (stage))"
+)
+
+
+# Открытые назначения - текущая нагрузка (индекс recruiter_id, status, assigned_at),
+# закрытые за период - время закрытия и пропускная способность
+_RECRUITER_STATS_SQL = (
+    "SELECT a.recruiter_id, u.full_name, u.email, "
+    "count(*) FILTER (WHERE a.status = 'assigned') AS open_assignments, "
+    "min(a.assigned_at) FILTER (WHERE a.status = 'assigned') AS oldest_open_assigned_at, "
+    "count(*) FILTER (WHERE a.status = 'closed') AS closed, "
+    "count(*) FILTER (WHERE a.status = 'closed' AND a.candidate_id IS NOT NULL) AS closed_with_candidate, "
+    "percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM a.closed_at - a.assigned_at)) "
+    "FILTER (WHERE a.status = 'closed') AS median_close_seconds "
+    "FROM vacancy_assignments a JOIN users u ON u.id = a.recruiter_id "
+    "WHERE a.status = 'assigned' "
+    "OR (a.status = 'closed' AND a.closed_at >= :start AND a.closed_at < :end) "
+    "GROUP BY a.recruiter_id, u.full_name, u.email "
+    "ORDER BY u.full_name"
+)
+
+
+def _utc_day(column):
+    # Дни считаются в UTC, как и раньше при группировке created_at в Python.
+    # Константы - литералами, а не параметрами: выражение в SELECT и GROUP BY должно совпадать
+    return func.date(func.timezone(literal_column("'UTC'"), column))
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Дата без часового пояса считается UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _to_utc_date(value: Optional[datetime]) -> Optional[date]:
+    value = _as_utc(value)
+    return value.date() if value else None
+
+
+def _upsert_rollup(statement):
+    """Счетчик уже есть - прибавляем к нему"""
+    return statement.on_conflict_do_update(
+        index_elements=["day", "source", "status"],
+        set_={"count": models.StatusDailyRollup.count + statement.excluded.count}
+    )
+
+
+async def record_status_change(db, source: str, status: Optional[str]):
+    """
+    Учитывает новую запись истории статусов. Вызывается в транзакции записи истории:
+    now() в ней совпадает с created_at записи, счетчик и история фиксируются вместе
+    """
+    if not status:
+        return
+    await db.execute(_upsert_rollup(pg_insert(models.StatusDailyRollup).values(
+        day=_utc_day(func.now()),
+        source=source,
+        status=func.lower(status),
+        count=1
+    )))
+
+
+def _history_counts(source: str, sign: int = 1):
+    """(day, source, status, count) истории источника, сгруппированные в SQL"""
+    model = HISTORY_SOURCES[source][0]
+    day = _utc_day(model.created_at)
+    status = func.lower(model.status)
+    return (
+        select(day.label("day"), literal(source).label("source"), status.label("status"), (func.count() * sign).label("count"))
+        .filter(model.status.isnot(None))
+        .group_by(day, status)
+    )
+
+
+async def remove_history(db, source: str, *conditions):
+    """Вычитает из счетчиков историю, которая будет удалена (вызывать до DELETE, в той же транзакции)"""
+    counts = _history_counts(source, sign=-1).filter(*conditions)
+    statement = pg_insert(models.StatusDailyRollup).from_select(["day", "source", "status", "count"], counts)
+    await db.execute(_upsert_rollup(statement))
+
+
+async def rebuild_status_rollup() -> int:
+    """
+    Полный пересчет status_daily_rollup из истории статусов. TRUNCATE блокирует таблицу
+    до конца транзакции, поэтому параллельные изменения статусов дождутся пересчета
+    и добавятся к новым счетчикам
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(f"TRUNCATE {models.StatusDailyRollup.__tablename__}"))
+        statement = pg_insert(models.StatusDailyRollup).from_select(
+            ["day", "source", "status", "count"],
+            union_all(*(_history_counts(source) for source in HISTORY_SOURCES))
+        )
+        await db.execute(statement)
+        rows = (await db.execute(select(func.count()).select_from(models.StatusDailyRollup))).scalar()
+        await db.commit()
+    logger.info(f"Status rollup rebuilt: {rows} rows")
+    return rows
+
+
+async def status_counts(
+    db,
+    granularity: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[Any]:
+    """Строки (bucket, source, status, count) из status_daily_rollup за дни [start, end]"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    rollup = models.StatusDailyRollup
+    if granularity == "day":
+        query = select(rollup.day.label("bucket"), rollup.source, rollup.status, rollup.count)
+    else:
+        bucket = func.date_trunc(literal_column(f"'{granularity}'"), rollup.day)
+        query = (
+            select(bucket.label("bucket"), rollup.source, rollup.status, func.sum(rollup.count).label("count"))
+            .group_by(bucket, rollup.source, rollup.status)
+        )
+
+    start_day, end_day = _to_utc_date(start), _to_utc_date(end)
+    if start_day:
+        query = query.filter(rollup.day >= start_day)
+    if end_day:
+        query = query.filter(rollup.day <= end_day)
+
+    return [row for row in (await db.execute(query)).all() if row.count]
+
+
+def _add_combined(counts: Dict[str, int]) -> Dict[str, int]:
+    """Добавляет counts combined_<статус> - сумму по заявкам и кандидатам HH"""
+    combined = defaultdict(int)
+    for status, count in counts.items():
+        base_status = status[3:] if status.startswith("hh_") else status
+        combined[f"combined_{base_status}"] += count
+    counts.update(combined)
+    return counts
+
+
+def _group_counts(rows, key_format: str) -> Dict[str, Dict[str, int]]:
+    grouped = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        prefix = HISTORY_SOURCES[row.source][1]
+        grouped[row.bucket.strftime(key_format)][f"{prefix}{row.status}"] += int(row.count)
+    return grouped
+
+
+def daily_status_history(rows) -> Dict[str, Any]:
+    """Ответ /analytics/status-history: данные по дням и итоги"""
+    result = []
+    for date_str, status_counts in sorted(_group_counts(rows, "%Y-%m-%d").items()):
+        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+        result.append({
+            "date": date_str,
+            "weekday": calendar.day_name[date_obj.weekday()],
+            "month": calendar.month_name[date_obj.month],
+            "counts": _add_combined(dict(status_counts))
+        })
+
+    total_stats = defaultdict(int)
+    for date_data in result:
+        for status, count in date_data["counts"].items():
+            total_stats[status] += count
+
+    return {
+        "daily_data": result,
+        "total_stats": dict(total_stats)
+    }
+
+
+def monthly_status_history(rows) -> List[Dict[str, Any]]:
+    """Ответ /analytics/monthly-status-history: данные по месяцам"""
+    result = []
+    for month_str, status_counts in sorted(_group_counts(rows, "%Y-%m").items()):
+        result.append({
+            "month": month_str,
+            "month_name": calendar.month_name[int(month_str[5:7])],
+            "counts": _add_combined(dict(status_counts))
+        })
+    return result
+
+
+def _hours(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds / 3600, 2) if seconds is not None else None
+
+
+def _source_funnel(rows, reach_rows) -> Dict[str, Any]:
+    """Этапы воронки с конверсией и время в каждом статусе для одного источника (или итога)"""
+    # Этап i прошли все, чей дальний этап - i или дальше (array_position считает с 1)
+    furthest = {row.stage: row.entities for row in reach_rows}
+    funnel = []
+    first = previous = None
+    for index, stage in enumerate(FUNNEL_STAGES, start=1):
+        count = sum(entities for stage_index, entities in furthest.items() if stage_index >= index)
+        funnel.append({
+            "status": stage,
+            "count": count,
+            "conversion_from_previous": round(count / previous, 4) if previous else None,
+            "conversion_from_first": round(count / first, 4) if first else None,
+        })
+        if first is None:
+            first = count
+        previous = count
+
+    time_in_status = {
+        row.status: {
+            "entities": row.entities,
+            "transitions": row.transitions,
+            "median_hours": _hours(row.median_seconds),
+            "p90_hours": _hours(row.p90_seconds),
+        }
+        for row in rows
+    }
+    return {"funnel": funnel, "time_in_status": time_in_status}
+
+
+async def hiring_funnel(db, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Воронка найма и время в статусах за период по заявкам, кандидатам HH и в сумме"""
+    start, end = _as_utc(start), _as_utc(end)
+    params = {"stages": FUNNEL_STAGES}
+    since = ""
+    if start:
+        since = " AND created_at >= :start"
+        params["start"] = start
+    if end:
+        params["end"] = end
+    events = _FUNNEL_EVENTS_SQL.format(since=since)
+
+    rows = (await db.execute(
+        text(_FUNNEL_SQL.format(events=events, until=" WHERE created_at <= :end" if end else "")),
+        params
+    )).all()
+    reach_rows = (await db.execute(
+        text(_FUNNEL_REACH_SQL.format(events=events, until=" AND created_at <= :end" if end else "")),
+        params
+    )).all()
+
+    # Строки итога (GROUPING SETS без source) - под ключом combined
+    grouped, reached = defaultdict(list), defaultdict(list)
+    for row in rows:
+        grouped[row.source or "combined"].append(row)
+    for row in reach_rows:
+        reached[row.source or "combined"].append(row)
+
+    return {
+        "stages": FUNNEL_STAGES,
+        "sources": {
+            source: _source_funnel(grouped.get(source, []), reached.get(source, []))
+            for source in ("application", "hh", "combined")
+        }
+    }
+
+
+async def hiring_funnel_cached(db, start: Optional[datetime] = None, end: Optional[datetime] = None, refresh: bool = False) -> Dict[str, Any]:
+    entry, cached = await funnel_cache.get_or_set(
+        (_as_utc(start), _as_utc(end)),
+        lambda: hiring_funnel(db, start, end),
+        refresh=refresh
+    )
+    return {**entry.value, "cache": entry.freshness(cached)}
+
+
+def recruiter_stats_period(start_day: Optional[date] = None, end_day: Optional[date] = None) -> Tuple[date, date]:
+    """Период по дням (UTC) включительно; по умолчанию - последние RECRUITER_STATS_DEFAULT_WEEKS недель"""
+    end_day = end_day or datetime.now(timezone.utc).date()
+    start_day = start_day or end_day - timedelta(weeks=RECRUITER_STATS_DEFAULT_WEEKS)
+    if start_day > end_day:
+        raise ValueError("start_date is after end_date")
+    return start_day, end_day
+
+
+async def recruiter_stats(db, start_day: date, end_day: date) -> Dict[str, Any]:
+    """Нагрузка, медианное время закрытия и закрытия в неделю по каждому рекрутеру"""
+    start = datetime.combine(start_day, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    weeks = (end - start).days / 7
+
+    rows = (await db.execute(text(_RECRUITER_STATS_SQL), {"start": start, "end": end})).all()
+    recruiters = [
+        {
+            "recruiter_id": row.recruiter_id,
+            "full_name": row.full_name,
+            "email": row.email,
+            "open_assignments": row.open_assignments,
+            "oldest_open_assigned_at": row.oldest_open_assigned_at,
+            "closed": row.closed,
+            "closed_with_candidate": row.closed_with_candidate,
+            "closures_per_week": round(row.closed / weeks, 2),
+            "median_days_to_close": round(row.median_close_seconds / 86400, 2) if row.median_close_seconds is not None else None,
+        }
+        for row in rows
+    ]
+    return {
+        "start_date": start_day.isoformat(),
+        "end_date": end_day.isoformat(),
+        "weeks": round(weeks, 2),
+        "recruiters": recruiters
+    }
+
+
+async def recruiter_stats_cached(db, start_day: date, end_day: date, refresh: bool = False) -> Dict[str, Any]:
+    entry, cached = await recruiter_stats_cache.get_or_set(
+        (start_day, end_day),
+        lambda: recruiter_stats(db, start_day, end_day),
+        refresh=refresh
+    )
+    return {**entry.value, "cache": entry.freshness(cached)}
+
+
+if __name__ == "__main__":
+    # Пересчет счетчиков из истории статусов: python analytics.py
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(rebuild_status_rollup()))
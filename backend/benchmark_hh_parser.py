@@ -0,0 +1,106 @@
+"""
+Бенчмарк разбора страниц поиска HH (HeadHunterParser.parse_search_results).
+
+Страницы лежат в fixtures/hh/*.html, рядом - ожидаемый результат разбора (*.json).
+Скрипт проверяет, что разбор дает ожидаемые карточки, и замеряет время разбора страницы.
+Время сравнивается с сохраненным базовым значением (fixtures/hh/benchmark_baseline.json):
+если медиана хуже базовой больше чем на --tolerance, скрипт завершается с кодом 1.
+
+    python benchmark_hh_parser.py                      # проверка
+    python benchmark_hh_parser.py --update-baseline    # сохранить текущие замеры как базовые
+"""
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from hh_api import HeadHunterParser
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "hh"
+BASELINE_FILE = FIXTURES_DIR / "benchmark_baseline.json"
+# Верхняя граница времени разбора одной страницы (мс) независимо от базового замера
+MAX_PARSE_MS = 50.0
+
+
+def load_fixtures():
+    fixtures = []
+    for html_path in sorted(FIXTURES_DIR.glob("*.html")):
+        expected_path = html_path.with_suffix(".json")
+        expected = json.loads(expected_path.read_text(encoding="utf-8")) if expected_path.exists() else None
+        fixtures.append((html_path.stem, html_path.read_text(encoding="utf-8"), expected))
+    return fixtures
+
+
+def measure(parser: HeadHunterParser, html: str, repeat: int) -> list:
+    timings = []
+    # Диагностические print парсера (например, о пустой странице) в замеры не выводим
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            parser.parse_search_results(html)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк разбора страниц поиска HH")
+    arg_parser.add_argument("--repeat", type=int, default=50, help="число прогонов на страницу")
+    arg_parser.add_argument("--tolerance", type=float, default=0.5, help="допустимое ухудшение относительно базового замера (0.5 = +50%%)")
+    arg_parser.add_argument("--max-ms", type=float, default=MAX_PARSE_MS, help="предельное время разбора страницы, мс")
+    arg_parser.add_argument("--update-baseline", action="store_true", help="сохранить результаты как базовые")
+    args = arg_parser.parse_args()
+
+    fixtures = load_fixtures()
+    if not fixtures:
+        print(f"Нет страниц в {FIXTURES_DIR}")
+        return 1
+
+    baseline = json.loads(BASELINE_FILE.read_text(encoding="utf-8")) if BASELINE_FILE.exists() else {}
+    parser = HeadHunterParser(base_url="https://hh.ru")
+    results = {}
+    failures = []
+
+    print(f"{'страница':<24} {'карточек':>8} {'размер, КБ':>10} {'медиана, мс':>12} {'p95, мс':>9} {'база, мс':>9}")
+    for name, html, expected in fixtures:
+        with contextlib.redirect_stdout(io.StringIO()):
+            resumes = parser.parse_search_results(html)
+        if expected is not None and resumes != expected:
+            failures.append(f"{name}: результат разбора не совпадает с {name}.json")
+
+        # Первый прогон выше прогревает парсер, дальше - замеры
+        timings = sorted(measure(parser, html, args.repeat))
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        results[name] = round(median, 3)
+
+        base = baseline.get(name)
+        print(
+            f"{name:<24} {len(resumes):>8} {len(html.encode('utf-8')) / 1024:>10.1f} "
+            f"{median:>12.3f} {p95:>9.3f} {base if base is not None else '-':>9}"
+        )
+
+        if median > args.max_ms:
+            failures.append(f"{name}: медиана {median:.3f} мс больше предела {args.max_ms} мс")
+        if base is not None and not args.update_baseline and median > base * (1 + args.tolerance):
+            failures.append(f"{name}: медиана {median:.3f} мс хуже базовой {base} мс больше чем на {args.tolerance:.0%}")
+
+    if args.update_baseline:
+        BASELINE_FILE.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nБазовые значения сохранены в {BASELINE_FILE}")
+
+    if failures:
+        print("\nРегрессии:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,7 +15,9 @@ from datetime import datetime
 from transliterate import translit
 from pathlib import Path
 import unicodedata
-from config import BOT_TOKEN, API_URL
+from config import BOT_TOKEN, API_URL, RESUME_DIR
+from database import AsyncSessionLocal
+from resume_cache import store_resume_file, count_resume_references
 
 load_dotenv()
 
@@ -696,8 +698,27 @@ def sanitize_filename(filename: str) -> str:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{result}_{timestamp}{ext}"
 
+async def discard_resume_file(file_path: Path):
+    """
+    Удаляет файл резюме неотправленной заявки. Файл по хэшу содержимого может быть общим,
+    поэтому он остается, если на него ссылаются заявки, кандидаты HH или кэш разобранных резюме
+    """
+    try:
+        if not file_path.exists():
+            return
+        async with AsyncSessionLocal() as db:
+            if await count_resume_references(db, file_path.name):
+                return
+            if await db.get(models.ParsedResume, file_path.stem):
+                return
+        file_path.unlink(missing_ok=True)
+    except Exception as e:
+        logger.error(f"Error deleting resume file {file_path}: {str(e)}")
+
 @dp.message_handler(content_types=['document'], state=Form.upload_resume)
 async def process_resume(message: types.Message, state: FSMContext):
+    # Где сейчас лежит загруженный файл (после переименования - имя по хэшу в RESUME_DIR)
+    stored_path = None
     try:
         state_data = await state.get_data()
         language = state_data.get('language', 'ru')
@@ -734,8 +755,18 @@ async def process_resume(message: types.Message, state: FSMContext):
         # Загружаем файл
         file = await message.document.get_file()
         await file.download(destination_file=str(file_path))
+        stored_path = file_path
         logger.info(f"Resume saved successfully to: {file_path}")
         
+        # Переименовываем файл по хэшу содержимого: одинаковые резюме хранятся один раз,
+        # а API берет разобранный текст из кэша
+        try:
+            _, safe_filename = store_resume_file(file_path)
+            stored_path = RESUME_DIR / safe_filename
+            logger.info(f"Resume stored as: {safe_filename}")
+        except Exception as e:
+            logger.error(f"Error storing resume by content hash: {str(e)}")
+        
         # Получаем все необходимые данные из состояния
         data = await state.get_data()
         
@@ -773,11 +804,13 @@ async def process_resume(message: types.Message, state: FSMContext):
                         "Kechirasiz, ariza yuborishda xatolik yuz berdi. Iltimos, keyinroq urinib ko'ring."
                     )
                     # Удаляем файл в случае ошибки
-                    file_path.unlink(missing_ok=True)
+                    await discard_resume_file(stored_path)
                     await state.finish()
             
     except Exception as e:
         logger.error(f"Error processing resume: {e}")
+        if stored_path is not None:
+            await discard_resume_file(stored_path)
         await message.answer(
             "Произошла ошибка при обработке резюме. Пожалуйста, попробуйте позже." if language == 'ru' else
             "Rezyumeni qayta ishlashda xatolik yuz berdi. Iltimos, keyinroq urinib ko'ring."
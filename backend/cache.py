@@ -0,0 +1,171 @@
+"""
+Кэш в памяти процесса с ограничением по времени жизни (TTL) и размеру (LRU).
+
+Используется для результатов, которые дорого получать заново (страницы HH.ru и т.п.).
+Кэш локален для воркера: разные воркеры uvicorn держат свои копии.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    ttl: float
+    # Время получения значения (unix time) - для отдачи клиенту
+    fetched_at: float = field(default_factory=time.time)
+    # Монотонное время записи - для расчета срока жизни
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+    @property
+    def expires_in(self) -> float:
+        return max(self.ttl - self.age, 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.age >= self.ttl
+
+    def freshness(self, cached: bool) -> Dict[str, Any]:
+        """Метаданные свежести для ответа API"""
+        return {
+            "cached": cached,
+            "fetched_at": self.fetched_at,
+            "age": round(self.age, 3),
+            "expires_in": round(self.expires_in, 3),
+        }
+
+
+def _consume_exception(task: asyncio.Future):
+    # Исключение получают ожидающие; если все они отменены, не пишем "exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class TTLCache:
+    """
+    LRU-кэш с TTL. get_or_set гарантирует, что при одновременных запросах одного
+    ключа значение вычисляется один раз, остальные ждут его результат.
+    clear() увеличивает поколение кэша: значение, которое начали вычислять до сброса,
+    отдается своему запросу, но не сохраняется и не передается новым запросам.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # Вычисляемые значения: ключ -> (задача вычисления, поколение на момент ее запуска)
+        self._pending: Dict[Hashable, Tuple[asyncio.Future, int]] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get_entry(key, touch=False) is not None
+
+    def get_entry(self, key: Hashable, touch: bool = True) -> Optional[CacheEntry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expired:
+            del self._data[key]
+            return None
+        if touch:
+            self._data.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> CacheEntry:
+        entry = CacheEntry(value=value, ttl=self.ttl if ttl is None else ttl)
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return entry
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Удаляет записи, ключи которых удовлетворяют условию; возвращает число удаленных"""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        self._generation += 1
+        self._data.clear()
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    async def get_or_set(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        refresh: bool = False,
+        cache_if: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[CacheEntry, bool]:
+        """
+        Возвращает (запись, признак попадания в кэш). При промахе вызывает factory();
+        если задан cache_if и он вернул False, значение отдается, но не кэшируется.
+        """
+        if not refresh:
+            entry = self.get_entry(key)
+            if entry is not None:
+                self.hits += 1
+                return entry, True
+
+        pending = self._pending.get(key)
+        if pending is None or pending[1] != self._generation:
+            # Вычисляем в отдельной задаче: если запрос, начавший вычисление, отменят
+            # (клиент отключился), остальные ожидающие все равно получат значение
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, factory, ttl, cache_if, self._generation))
+            task.add_done_callback(_consume_exception)
+            pending = (task, self._generation)
+            self._pending[key] = pending
+        return await asyncio.shield(pending[0]), False
+
+    async def _compute(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[float],
+        cache_if: Optional[Callable[[Any], bool]],
+        generation: int
+    ) -> CacheEntry:
+        try:
+            value = await factory()
+            # Кэш сбросили во время вычисления - значение могло устареть, не сохраняем его
+            if generation == self._generation and (cache_if is None or cache_if(value)):
+                return self.set(key, value, ttl)
+            return CacheEntry(value=value, ttl=0)
+        finally:
+            # После сброса ключ мог занять более новый запрос
+            pending = self._pending.get(key)
+            if pending is not None and pending[0] is asyncio.current_task():
+                del self._pending[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,102 @@
+"""
+Нормализованные ключи кандидатов для поиска дубликатов.
+
+Телефон приводится к цифрам в формате E.164 (код страны + номер, без "+"),
+ФИО - к ключу без регистра, пунктуации и порядка слов. Ключи хранятся в индексируемых
+колонках (phone_normalized, name_key), поэтому проверка дубликата - поиск по индексу,
+а не LIKE '%цифры%' по всей таблице.
+
+Для нечеткого сравнения ФИО, записанных кириллицей и латиницей ("Юсупов Жасур" и
+"Yusupov Jasur"), есть ключ translit_name_key: ФИО в латинице с упрощенным написанием.
+"""
+import re
+from typing import Optional
+
+from transliterate import translit
+
+from config import DEFAULT_PHONE_COUNTRY_CODE
+
+# Длина национального номера без кода страны (Узбекистан: 90 123 45 67)
+NATIONAL_NUMBER_LENGTH = 9
+# Минимальное число цифр, с которым номер считается пригодным для сравнения
+MIN_PHONE_DIGITS = 9
+
+_NAME_TOKEN_RE = re.compile(r"[\W_]+", re.UNICODE)
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+_REPEATED_LETTERS_RE = re.compile(r"(.)\1+")
+
+# Апострофы узбекской латиницы (o', g') - часть буквы, а не разделитель слов
+_APOSTROPHES_RE = re.compile(r"['`ʻʼ‘’]")
+# Узбекские буквы кириллицы, которых нет в русской таблице transliterate, и "й" как в латинице
+_UZBEK_CYRILLIC = str.maketrans({"ў": "o", "қ": "k", "ғ": "g", "ҳ": "h", "й": "y"})
+
+# Варианты написания одних и тех же звуков в латинице (Yusupov/Jusupov, Xasanov/Hasanov,
+# Djuraev/Zhuraev). Замены применяются по порядку к обеим сторонам сравнения.
+_LATIN_SIMPLIFICATIONS = [
+    ("shch", "sh"), ("sch", "sh"),
+    ("dzh", "j"), ("dj", "j"), ("zh", "j"),
+    ("kh", "h"), ("x", "h"),
+    ("ts", "c"),
+    ("ju", "u"), ("yu", "u"), ("iu", "u"),
+    ("ja", "a"), ("ya", "a"), ("ia", "a"),
+    ("jo", "o"), ("yo", "o"),
+    ("je", "e"), ("ye", "e"),
+    ("y", "i"), ("w", "v"), ("q", "k"), ("ph", "f"),
+]
+
+
+def normalize_phone_e164(phone: Optional[str], country_code: str = DEFAULT_PHONE_COUNTRY_CODE) -> Optional[str]:
+    """
+    Приводит номер к цифрам E.164: "+998 (90) 123-45-67", "90 123 45 67" и "00998901234567"
+    дают "998901234567". Возвращает None, если цифр слишком мало для сравнения.
+    """
+    if not phone:
+        return None
+    digits = "".join(filter(str.isdigit, phone))
+    if digits.startswith("00"):
+        # Международный префикс вместо "+"
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("8") and country_code == "7":
+        # Российский формат 8XXXXXXXXXX
+        digits = "7" + digits[1:]
+    if len(digits) == NATIONAL_NUMBER_LENGTH:
+        digits = country_code + digits
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return digits
+
+
+def name_key(full_name: Optional[str]) -> Optional[str]:
+    """
+    Ключ ФИО: нижний регистр, "ё" -> "е", без пунктуации, слова по алфавиту.
+    "Иванов  Иван-Петрович" и "иван петрович иванов" дают одинаковый ключ.
+    """
+    if not full_name:
+        return None
+    normalized = full_name.lower().replace("ё", "е")
+    tokens = [token for token in _NAME_TOKEN_RE.split(normalized) if token]
+    if not tokens:
+        return None
+    return " ".join(sorted(tokens))
+
+
+def translit_name_key(full_name: Optional[str]) -> Optional[str]:
+    """
+    Ключ ФИО для нечеткого сравнения: латиница, упрощенное написание, без удвоенных букв,
+    слова по алфавиту. "Юсупов Жасур" и "Yusupov Jasur" дают "asur usupov" в обоих случаях.
+    """
+    key = name_key(_APOSTROPHES_RE.sub("", full_name or ""))
+    if not key:
+        return None
+    key = key.translate(_UZBEK_CYRILLIC)
+    if _CYRILLIC_RE.search(key):
+        key = translit(key, "ru", reversed=True)
+    tokens = []
+    for token in key.split():
+        token = "".join(char for char in token if "a" <= char <= "z")
+        for source, target in _LATIN_SIMPLIFICATIONS:
+            token = token.replace(source, target)
+        token = _REPEATED_LETTERS_RE.sub(r"\1", token)
+        if token:
+            tokens.append(token)
+    return " ".join(sorted(tokens)) or None
@@ -28,9 +28,105 @@ CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,https://hh.ru,ht
 # Database Configuration
 DATABASE_URL = os.getenv('DATABASE_URL', f"postgresql://{os.getenv('POSTGRES_USER', 'postgres')}:{os.getenv('POSTGRES_PASSWORD', '5533951')}@{os.getenv('POSTGRES_SERVER', 'localhost')}:{os.getenv('POSTGRES_PORT', '5432')}/{os.getenv('POSTGRES_DB', 'abstract_hr')}")
 
+def _to_async_url(url: str) -> str:
+    """
+    Подменяет синхронный драйвер в строке подключения на asyncpg.
+    Приложение работает только с PostgreSQL (upsert, LISTEN/NOTIFY, полнотекстовый поиск)
+    """
+    for prefix in ('postgresql+psycopg2://', 'postgresql://', 'postgres://'):
+        if url.startswith(prefix):
+            return 'postgresql+asyncpg://' + url[len(prefix):]
+    if url.startswith('postgresql+asyncpg://'):
+        return url
+    raise ValueError(
+        f"DATABASE_URL должен указывать на PostgreSQL (postgresql://...), получено: {url.split(':', 1)[0]}"
+    )
+
+# Строка подключения для асинхронного движка (по умолчанию выводится из DATABASE_URL)
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or _to_async_url(DATABASE_URL)
+
+# Настройки пула соединений (применяются и к синхронному, и к асинхронному движку)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))  # секунды ожидания свободного соединения
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # секунды жизни соединения, -1 - без ограничения
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))  # 0 - без ограничения
+
+# WebSocket: рассылка событий между воркерами uvicorn
+# postgres - через LISTEN/NOTIFY (по умолчанию), memory - только внутри процесса
+WS_BROADCAST_BACKEND = os.getenv('WS_BROADCAST_BACKEND', 'postgres')
+WS_BROADCAST_CHANNEL = os.getenv('WS_BROADCAST_CHANNEL', 'hr_ws_events')
+# Размер очереди исходящих сообщений на одно соединение и таймаут отправки (секунды).
+# Клиент, который не успевает забирать сообщения, отключается
+WS_SEND_QUEUE_SIZE = int(os.getenv('WS_SEND_QUEUE_SIZE', '100'))
+WS_SEND_TIMEOUT = float(os.getenv('WS_SEND_TIMEOUT', '5'))
+
+# Разбор резюме в пуле процессов
+RESUME_PARSER_WORKERS = int(os.getenv('RESUME_PARSER_WORKERS', str(min(4, os.cpu_count() or 1))))
+RESUME_PARSER_TIMEOUT = float(os.getenv('RESUME_PARSER_TIMEOUT', '30'))  # секунды на один файл
+RESUME_PARSER_MAX_QUEUE = int(os.getenv('RESUME_PARSER_MAX_QUEUE', '50'))  # сколько файлов может ждать очереди
+RESUME_MAX_FILE_SIZE = int(os.getenv('RESUME_MAX_FILE_SIZE_MB', '10')) * 1024 * 1024
+# Пакетный импорт резюме: максимум файлов в одном запросе, размер zip-архива
+# и суммарный размер распакованных из архивов файлов (защита от zip-бомб)
+RESUME_BATCH_MAX_FILES = int(os.getenv('RESUME_BATCH_MAX_FILES', '500'))
+RESUME_BATCH_MAX_ZIP_SIZE = int(os.getenv('RESUME_BATCH_MAX_ZIP_SIZE_MB', '200')) * 1024 * 1024
+RESUME_BATCH_MAX_UNPACKED_SIZE = int(os.getenv('RESUME_BATCH_MAX_UNPACKED_SIZE_MB', '500')) * 1024 * 1024
+# Сколько разобранных резюме хранить в кэше (вытесняются давно не использованные)
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv('RESUME_CACHE_MAX_ENTRIES', '5000'))
+
 # Telegram Bot Configuration
 BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 
+# Часовой пояс, в котором вводятся дата и время задач календаря
+APP_TIMEZONE = os.getenv('APP_TIMEZONE', 'Asia/Tashkent')
+
+# Напоминания о задачах: за сколько минут до начала, на сколько часов вперед держать в памяти,
+# период досинхронизации с БД (сек) и сколько минут после срабатывания напоминание еще отправляется
+# (например, после перезапуска). Канал событий об изменении задач между воркерами
+TASK_REMINDER_LEAD_MINUTES = int(os.getenv('TASK_REMINDER_LEAD_MINUTES', '5'))
+TASK_REMINDER_LOOKAHEAD_HOURS = int(os.getenv('TASK_REMINDER_LOOKAHEAD_HOURS', '24'))
+TASK_REMINDER_RESYNC_SECONDS = int(os.getenv('TASK_REMINDER_RESYNC_SECONDS', '60'))
+TASK_REMINDER_GRACE_MINUTES = int(os.getenv('TASK_REMINDER_GRACE_MINUTES', '10'))
+TASK_EVENTS_CHANNEL = os.getenv('TASK_EVENTS_CHANNEL', 'hr_task_events')
+
+# Код страны для номеров без кода (нормализация телефонов кандидатов к E.164)
+DEFAULT_PHONE_COUNTRY_CODE = os.getenv('DEFAULT_PHONE_COUNTRY_CODE', '998')
+
+# Поиск дубликатов кандидатов: порог сходства ФИО (pg_trgm), минимальная оценка предложения,
+# совпадений на запись, размер пачки и час ночного пересчета (0-23, время сервера)
+DEDUP_NAME_SIMILARITY = float(os.getenv('DEDUP_NAME_SIMILARITY', '0.6'))
+DEDUP_MIN_SCORE = float(os.getenv('DEDUP_MIN_SCORE', '0.6'))
+DEDUP_MAX_MATCHES = int(os.getenv('DEDUP_MAX_MATCHES', '20'))
+DEDUP_BATCH_SIZE = int(os.getenv('DEDUP_BATCH_SIZE', '500'))
+DEDUP_NIGHTLY_HOUR = int(os.getenv('DEDUP_NIGHTLY_HOUR', '3'))
+
+# Аналитика: кэш воронки найма в памяти воркера (сек) и число диапазонов дат в кэше
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', '300'))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYTICS_CACHE_MAX_ENTRIES', '100'))
+
+# Кэш ответов списков и аналитики с ETag/304: включен ли, время жизни (сек), число ответов
+# и канал рассылки событий об изменении данных между воркерами (события рассылаются и при
+# выключенном кэше ответов - по ним сбрасываются кэши аналитики)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+RESPONSE_CACHE_CHANNEL = os.getenv('RESPONSE_CACHE_CHANNEL', 'hr_cache_events')
+
 # HeadHunter API Configuration
+HH_LOGIN = os.getenv('HH_LOGIN')
+HH_PASSWORD = os.getenv('HH_PASSWORD')
+HH_BASE_URL = os.getenv('HH_BASE_URL', 'https://hh.ru')
+# HTTP-клиент HeadHunter: размер пула соединений, одновременных запросов, таймаут (сек), повторы при 429/5xx
+HH_MAX_CONNECTIONS = int(os.getenv('HH_MAX_CONNECTIONS', '10'))
+HH_MAX_CONCURRENCY = int(os.getenv('HH_MAX_CONCURRENCY', '5'))
+HH_REQUEST_TIMEOUT = float(os.getenv('HH_REQUEST_TIMEOUT', '20'))
+HH_MAX_RETRIES = int(os.getenv('HH_MAX_RETRIES', '3'))
+HH_RETRY_BACKOFF = float(os.getenv('HH_RETRY_BACKOFF', '0.5'))  # базовая задержка, удваивается с каждой попыткой
+# Кэш страниц поиска и резюме HH (сек) и предзагрузка следующей страницы поиска
+HH_SEARCH_CACHE_TTL = int(os.getenv('HH_SEARCH_CACHE_TTL', '300'))
+HH_RESUME_CACHE_TTL = int(os.getenv('HH_RESUME_CACHE_TTL', '3600'))
+HH_CACHE_MAX_ENTRIES = int(os.getenv('HH_CACHE_MAX_ENTRIES', '500'))
+HH_PREFETCH_NEXT_PAGE = os.getenv('HH_PREFETCH_NEXT_PAGE', 'true').lower() in ('1', 'true', 'yes')
 HH_API_CLIENT_ID = os.getenv('HH_API_CLIENT_ID', '')
 HH_API_CLIENT_SECRET = os.getenv('HH_API_CLIENT_SECRET', '') 
\ No newline at end of file
@@ -1,11 +1,115 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS
+)
 
-engine = create_engine(DATABASE_URL)
+class PoolWaitHistogram:
+    """Гистограмма времени ожидания свободного соединения в пуле (в миллисекундах)"""
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._timeouts = 0
+
+    def observe(self, wait_ms: float):
+        with self._lock:
+            index = len(self.BUCKETS_MS)
+            for i, bound in enumerate(self.BUCKETS_MS):
+                if wait_ms <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self._total += 1
+            self._sum_ms += wait_ms
+            self._max_ms = max(self._max_ms, wait_ms)
+
+    def observe_timeout(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound}": count for bound, count in zip(self.BUCKETS_MS, self._counts)}
+            buckets["le_inf"] = self._counts[-1]
+            return {
+                "count": self._total,
+                "avg_ms": round(self._sum_ms / self._total, 3) if self._total else 0.0,
+                "max_ms": round(self._max_ms, 3),
+                "timeouts": self._timeouts,
+                "buckets": buckets
+            }
+
+class _TimedPoolMixin:
+    """Замеряет, сколько запрос ждал соединение из пула"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = PoolWaitHistogram()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_histogram.observe_timeout()
+            raise
+        self.wait_histogram.observe((time.perf_counter() - started) * 1000)
+        return connection
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    """Параметры пула и таймаута запросов из config.py (только для PostgreSQL)"""
+    if not url.startswith('postgres'):
+        return {}
+
+    options = {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, is_async=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для async-эндпоинтов: запросы не блокируют event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, is_async=True))
+# expire_on_commit=False - после commit объекты остаются загруженными,
+# иначе обращение к атрибутам вызовет ленивую загрузку вне await
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +117,59 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@asynccontextmanager
+async def try_advisory_lock(key: int):
+    """
+    Сессионная advisory-блокировка PostgreSQL, чтобы фоновую задачу выполнял только один воркер.
+    Отдает True, если блокировка получена; соединение удерживается до выхода из блока.
+    """
+    if not ASYNC_DATABASE_URL.startswith("postgresql"):
+        yield True
+        return
+
+    async with async_engine.connect() as connection:
+        locked = bool((await connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})).scalar())
+        await connection.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                await connection.commit()
+
+def _pool_stats(pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {"pool_class": type(pool).__name__}
+
+    histogram = getattr(pool, "wait_histogram", None)
+    return {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # overflow() отрицателен, пока пул не заполнен до pool_size
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "wait_time_ms": histogram.snapshot() if histogram else None
+    }
+
+def get_pool_stats() -> dict:
+    """Текущее состояние пулов соединений синхронного и асинхронного движков"""
+    return {
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.sync_engine.pool),
+        "settings": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS
+        }
+    }
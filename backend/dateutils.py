@@ -1,5 +1,11 @@
-from datetime import datetime, date
+from datetime import datetime, date, time, timedelta
 from typing import Optional, Union
+from zoneinfo import ZoneInfo
+
+from config import APP_TIMEZONE
+
+# Часовой пояс, в котором пользователи вводят дату и время задач
+APP_TZ = ZoneInfo(APP_TIMEZONE)
 
 def date_to_datetime(d: Union[date, str, None]) -> Optional[datetime]:
     """
@@ -31,4 +37,52 @@ def date_to_datetime(d: Union[date, str, None]) -> Optional[datetime]:
         return d
     
     # В остальных случаях возвращаем текущий datetime
-    return datetime.now() 
\ No newline at end of file
+    return datetime.now()
+
+def parse_task_date(value: Union[date, str, None]) -> Optional[date]:
+    """Дата задачи из строки YYYY-MM-DD (формат API) или объекта date"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value.strip()[:10])
+
+def parse_task_time(value: Union[time, str, None]) -> Optional[time]:
+    """Время задачи из строки HH:MM (или HH:MM:SS) или объекта time; секунды отбрасываются"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, time):
+        return value.replace(second=0, microsecond=0)
+    for time_format in ("%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value.strip(), time_format).time().replace(second=0)
+        except ValueError:
+            continue
+    raise ValueError(f"Некорректное время: {value}")
+
+def format_task_date(value: Union[date, str, None]) -> Optional[str]:
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def format_task_time(value: Union[time, str, None]) -> Optional[str]:
+    if isinstance(value, time):
+        return value.strftime("%H:%M")
+    return value
+
+def task_starts_at(task_date: Optional[date], task_time: Optional[time]) -> Optional[datetime]:
+    """
+    Момент начала задачи с часовым поясом APP_TIMEZONE.
+    Задача без времени начинается в полночь своего дня.
+    """
+    if task_date is None:
+        return None
+    return datetime.combine(task_date, task_time or time(0, 0), tzinfo=APP_TZ)
+
+def local_day_range(start: Optional[date], end: Optional[date]):
+    """Границы [начало start, начало дня после end) в APP_TIMEZONE для фильтра по starts_at"""
+    lower = datetime.combine(start, time(0, 0), tzinfo=APP_TZ) if start else None
+    upper = datetime.combine(end + timedelta(days=1), time(0, 0), tzinfo=APP_TZ) if end else None
+    return lower, upper
@@ -0,0 +1,261 @@
+"""
+Поиск дубликатов кандидатов между заявками из бота (applications) и кандидатами HH (hh_candidates).
+
+Одного человека могут записать по-разному: кириллицей и латиницей, с разным форматом телефона.
+Каждая запись сравнивается не со всеми остальными, а только с кандидатами из своих блоков:
+    - тот же телефон в E.164 (btree-индекс по phone_normalized);
+    - похожее ФИО в латинице (триграммный GIN-индекс по name_translit, оператор pg_trgm %).
+Так на запись приходится несколько индексных выборок, а не проход по всей таблице, и полный
+пересчет стоит O(n * k) вместо O(n^2). Найденные пары сохраняются как предложения объединения
+(candidate_merge_suggestions), решение принимает рекрутер.
+
+Запускается инкрементально после создания записи и ночным пересчетом всей базы.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import models
+from config import (
+    DEDUP_NAME_SIMILARITY, DEDUP_MIN_SCORE, DEDUP_MAX_MATCHES,
+    DEDUP_BATCH_SIZE, DEDUP_NIGHTLY_HOUR
+)
+from database import AsyncSessionLocal, try_advisory_lock
+
+logger = logging.getLogger(__name__)
+
+# Типы записей и их модели
+RECORD_MODELS = {
+    "application": models.Application,
+    "hh_candidate": models.HHCandidate,
+}
+
+# Ключ advisory-блокировки ночного пересчета (один воркер на все процессы)
+DEDUP_LOCK_KEY = 7311001
+
+# Похожие ФИО из блока по триграммам; порог оператора % задается на транзакцию
+_MATCH_SQL = (
+    "SELECT id, full_name, phone_normalized, name_translit, "
+    "coalesce(similarity(name_translit, CAST(:name AS text)), 0) AS name_similarity "
+    "FROM {table} "
+    "WHERE (phone_normalized = CAST(:phone AS varchar) OR name_translit % CAST(:name AS text)) AND id <> :exclude_id "
+    "ORDER BY name_similarity DESC, id "
+    "LIMIT :limit"
+)
+
+
+@dataclass
+class CandidateRecord:
+    type: str
+    id: int
+    full_name: Optional[str]
+    phone_normalized: Optional[str]
+    name_translit: Optional[str]
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return (self.type, self.id)
+
+
+def score_pair(record: CandidateRecord, other: CandidateRecord, name_similarity: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """
+    Оценка пары от 0 до 1 и совпавшие признаки; None, если пара не похожа на дубликат.
+    Совпадение телефона - сильный признак, но один телефон бывает у родственников,
+    поэтому без похожего ФИО оценка ниже. Разные телефоны снижают оценку по ФИО.
+    """
+    phone_match = bool(record.phone_normalized) and record.phone_normalized == other.phone_normalized
+    phone_conflict = bool(record.phone_normalized and other.phone_normalized) and not phone_match
+
+    if phone_match and name_similarity >= 0.5:
+        score = 0.9 + 0.1 * name_similarity
+    elif phone_match:
+        score = 0.6 + 0.2 * name_similarity
+    elif name_similarity >= DEDUP_NAME_SIMILARITY:
+        score = name_similarity * (0.6 if phone_conflict else 0.85)
+    else:
+        return None
+
+    if score < DEDUP_MIN_SCORE:
+        return None
+
+    reasons = {
+        "phone_match": phone_match,
+        "phone_conflict": phone_conflict,
+        "name_similarity": round(name_similarity, 3),
+    }
+    return round(score, 4), reasons
+
+
+async def _load_record(db, record_type: str, record_id: int) -> Optional[CandidateRecord]:
+    model = RECORD_MODELS[record_type]
+    row = (await db.execute(
+        select(model.id, model.full_name, model.phone_normalized, model.name_translit)
+        .filter(model.id == record_id)
+    )).first()
+    if row is None:
+        return None
+    return CandidateRecord(record_type, row.id, row.full_name, row.phone_normalized, row.name_translit)
+
+
+async def find_matches(db, record: CandidateRecord) -> List[Tuple[CandidateRecord, float]]:
+    """Кандидаты в дубликаты из блоков записи в обеих таблицах"""
+    if not record.phone_normalized and not record.name_translit:
+        return []
+
+    # Порог оператора % действует до конца транзакции
+    await db.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+        {"threshold": str(DEDUP_NAME_SIMILARITY)}
+    )
+    matches = []
+    for record_type, model in RECORD_MODELS.items():
+        rows = (await db.execute(
+            text(_MATCH_SQL.format(table=model.__tablename__)),
+            {
+                "name": record.name_translit,
+                "phone": record.phone_normalized,
+                "exclude_id": record.id if record_type == record.type else -1,
+                "limit": DEDUP_MAX_MATCHES,
+            }
+        )).mappings().all()
+        for row in rows:
+            other = CandidateRecord(record_type, row["id"], row["full_name"], row["phone_normalized"], row["name_translit"])
+            matches.append((other, float(row["name_similarity"])))
+    return matches
+
+
+async def _save_suggestions(db, suggestions: List[Dict[str, Any]]):
+    if not suggestions:
+        return
+    statement = pg_insert(models.CandidateMergeSuggestion).values(suggestions)
+    # Обновляем оценку только у нерассмотренных предложений: отклоненные пары не возвращаются
+    statement = statement.on_conflict_do_update(
+        constraint="uq_candidate_merge_pair",
+        set_={
+            "score": statement.excluded.score,
+            "reasons": statement.excluded.reasons,
+            "updated_at": func.now(),
+        },
+        where=models.CandidateMergeSuggestion.status == "pending"
+    )
+    await db.execute(statement)
+
+
+def _suggestion(record: CandidateRecord, other: CandidateRecord, score: float, reasons: Dict[str, Any]) -> Dict[str, Any]:
+    left, right = sorted([record.key, other.key])
+    return {
+        "left_type": left[0],
+        "left_id": left[1],
+        "right_type": right[0],
+        "right_id": right[1],
+        "score": score,
+        "reasons": reasons,
+        "status": "pending",
+    }
+
+
+async def _process_record(db, record: CandidateRecord) -> int:
+    suggestions = {}
+    for other, name_similarity in await find_matches(db, record):
+        scored = score_pair(record, other, name_similarity)
+        if scored is None:
+            continue
+        suggestion = _suggestion(record, other, *scored)
+        pair = (suggestion["left_type"], suggestion["left_id"], suggestion["right_type"], suggestion["right_id"])
+        suggestions[pair] = suggestion
+    await _save_suggestions(db, list(suggestions.values()))
+    return len(suggestions)
+
+
+async def check_record(record_type: str, record_id: int) -> int:
+    """
+    Инкрементальная проверка одной записи (после создания заявки или импорта кандидата).
+    Возвращает число найденных пар; ошибки только логируются, чтобы не мешать основному сценарию.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            record = await _load_record(db, record_type, record_id)
+            if record is None:
+                return 0
+            found = await _process_record(db, record)
+            await db.commit()
+            if found:
+                logger.info(f"Dedup: {record_type}:{record_id} has {found} possible duplicates")
+            return found
+    except Exception as e:
+        logger.error(f"Dedup check failed for {record_type}:{record_id}: {e}")
+        return 0
+
+
+async def run_batch(since: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Пересчет предложений по всем записям (или созданным после since), пачками по id.
+    Каждая пачка - отдельная транзакция, чтобы не держать блокировки долго.
+    """
+    started = datetime.now()
+    stats = {"records": 0, "pairs": 0}
+    for record_type, model in RECORD_MODELS.items():
+        last_id = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                query = (
+                    select(model.id, model.full_name, model.phone_normalized, model.name_translit)
+                    .filter(model.id > last_id)
+                    .order_by(model.id)
+                    .limit(DEDUP_BATCH_SIZE)
+                )
+                if since is not None:
+                    query = query.filter(model.created_at >= since)
+                rows = (await db.execute(query)).all()
+                if not rows:
+                    break
+                for row in rows:
+                    record = CandidateRecord(record_type, row.id, row.full_name, row.phone_normalized, row.name_translit)
+                    stats["pairs"] += await _process_record(db, record)
+                await db.commit()
+            last_id = rows[-1].id
+            stats["records"] += len(rows)
+
+    stats["duration_seconds"] = round((datetime.now() - started).total_seconds(), 2)
+    logger.info(f"Dedup batch finished: {stats}")
+    return stats
+
+
+async def run_batch_exclusive(since: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Пересчет под advisory-блокировкой; None, если его уже выполняет другой воркер"""
+    async with try_advisory_lock(DEDUP_LOCK_KEY) as locked:
+        if not locked:
+            logger.info("Dedup batch is already running in another worker")
+            return None
+        return await run_batch(since)
+
+
+def _seconds_until_nightly_run(now: datetime) -> float:
+    next_run = now.replace(hour=DEDUP_NIGHTLY_HOUR, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def nightly_dedup_loop():
+    """Фоновая задача: полный пересчет раз в сутки в DEDUP_NIGHTLY_HOUR"""
+    while True:
+        try:
+            await asyncio.sleep(_seconds_until_nightly_run(datetime.now()))
+            await run_batch_exclusive()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Nightly dedup failed: {e}")
+            await asyncio.sleep(60)
+
+
+if __name__ == "__main__":
+    # Ручной запуск полного пересчета (например, из cron): python dedup_service.py
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run_batch_exclusive()))
@@ -0,0 +1,190 @@
+"""
+Локальный сервер, имитирующий веб-интерфейс HH.ru, для проверки HeadHunterParser без доступа к hh.ru.
+
+Поддерживает вход через форму (/account/login), поиск (/search/resume) и страницу резюме
+(/resume/{id}), а также управляемые сбои: ответы 503/429 с Retry-After, задержку ответа
+и истечение сессии. Запуск вручную:
+
+    python fake_hh_server.py --port 8090
+    HH_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+"""
+import argparse
+import asyncio
+import secrets
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+SESSION_COOKIE = "hhtoken"
+
+LOGIN_PAGE = """<html><body>
+<form action="/account/login" method="post">
+  <input type="hidden" name="_xsrf" value="{xsrf}">
+  <input type="text" name="username">
+  <input type="password" name="password">
+</form>
+</body></html>"""
+
+RESUME_CARD = """<div data-qa="resume-serp__resume">
+  <a data-qa="serp-item__title" href="/resume/{id}">{title}</a>
+  <span data-qa="serp-item__salary">{salary}</span>
+  <div data-qa="serp-item__experience">{experience}</div>
+  <div data-qa="serp-item__skills">{skills}</div>
+</div>"""
+
+RESUME_PAGE = """<html><body>
+<h2 data-qa="resume-personal-name">{full_name}</h2>
+<span data-qa="resume-personal-age">{age} лет, родился {birth_date}</span>
+</body></html>"""
+
+
+def make_resumes(count: int = 40) -> List[Dict]:
+    return [
+        {
+            "id": f"fake{i:04d}",
+            "title": f"Кандидат {i}, Python-разработчик",
+            "full_name": f"Кандидат Тестовый {i}",
+            "salary": f"{(i % 10 + 5) * 1000000} сум",
+            "experience": f"{i % 12} лет",
+            "skills": "Python, SQL, FastAPI",
+            "age": 20 + i % 30,
+            "birth_date": f"{i % 28 + 1} января {1995 - i % 30}",
+        }
+        for i in range(count)
+    ]
+
+
+class FakeHHServer:
+    def __init__(
+        self,
+        login: str = "test@example.com",
+        password: str = "secret",
+        page_size: int = 20,
+        resumes: Optional[List[Dict]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.login = login
+        self.password = password
+        self.page_size = page_size
+        self.resumes = resumes if resumes is not None else make_resumes()
+        self.host = host
+        self.port = port
+        self.sessions = set()
+        self.requests = Counter()
+        # Управляемые сбои: сколько следующих запросов завершить ошибкой
+        self.fail_next = 0
+        self.fail_status = 503
+        self.retry_after: Optional[int] = None
+        self.delay = 0.0
+        # Максимум одновременно обрабатываемых запросов (для проверки ограничения клиента)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_get("/", self.index)
+        self.app.router.add_get("/account/login", self.login_page)
+        self.app.router.add_post("/account/login", self.login_submit)
+        self.app.router.add_get("/search/resume", self.search)
+        self.app.router.add_get("/resume/{resume_id}", self.resume)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # При port=0 порт выбирает ОС
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def fail(self, count: int, status: int = 503, retry_after: Optional[int] = None):
+        """Следующие count запросов вернут status (и Retry-After, если задан)"""
+        self.fail_next = count
+        self.fail_status = status
+        self.retry_after = retry_after
+
+    def expire_sessions(self):
+        self.sessions.clear()
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        self.requests[request.path] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else {}
+                return web.Response(status=self.fail_status, text="Service unavailable", headers=headers)
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    def _is_authorized(self, request) -> bool:
+        return request.cookies.get(SESSION_COOKIE) in self.sessions
+
+    async def index(self, request):
+        return web.Response(text="<html><body>HH</body></html>", content_type="text/html")
+
+    async def login_page(self, request):
+        return web.Response(text=LOGIN_PAGE.format(xsrf=secrets.token_hex(8)), content_type="text/html")
+
+    async def login_submit(self, request):
+        data = await request.post()
+        if not data.get("_xsrf") or data.get("username") != self.login or data.get("password") != self.password:
+            raise web.HTTPFound("/account/login?error=1")
+        token = secrets.token_hex(16)
+        self.sessions.add(token)
+        response = web.HTTPFound("/")
+        response.set_cookie(SESSION_COOKIE, token)
+        raise response
+
+    async def search(self, request):
+        if not self._is_authorized(request):
+            raise web.HTTPFound("/account/login?backurl=/search/resume")
+        page = int(request.query.get("page", 0))
+        text = request.query.get("text", "").lower()
+        found = [r for r in self.resumes if text in r["title"].lower() or text in r["skills"].lower()]
+        items = found[page * self.page_size:(page + 1) * self.page_size]
+        cards = "\n".join(RESUME_CARD.format(**resume) for resume in items)
+        return web.Response(text=f"<html><body>{cards}</body></html>", content_type="text/html")
+
+    async def resume(self, request):
+        if not self._is_authorized(request):
+            raise web.HTTPFound("/account/login")
+        resume_id = request.match_info["resume_id"]
+        resume = next((r for r in self.resumes if r["id"] == resume_id), None)
+        if resume is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=RESUME_PAGE.format(**resume), content_type="text/html")
+
+
+async def _serve(port: int):
+    server = await FakeHHServer(port=port).start()
+    print(f"Тестовый сервер HH запущен на {server.url} (логин {server.login} / {server.password})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Тестовый сервер HH.ru")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.port))
+    except KeyboardInterrupt:
+        pass
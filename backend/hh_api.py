@@ -1,24 +1,214 @@
-import os
-import requests
+import asyncio
+import random
+import re
+from dataclasses import dataclass
 from typing import Optional, List, Dict
+
+import aiohttp
 from bs4 import BeautifulSoup
-from dotenv import load_dotenv
+from lxml import etree
+from lxml import html as lxml_html
+
+from cache import TTLCache
+from config import (
+    HH_LOGIN, HH_PASSWORD, HH_BASE_URL,
+    HH_MAX_CONNECTIONS, HH_MAX_CONCURRENCY, HH_REQUEST_TIMEOUT,
+    HH_MAX_RETRIES, HH_RETRY_BACKOFF,
+    HH_SEARCH_CACHE_TTL, HH_RESUME_CACHE_TTL, HH_CACHE_MAX_ENTRIES, HH_PREFETCH_NEXT_PAGE
+)
+
+# Статусы, при которых запрос повторяется с задержкой
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Максимальная задержка между повторами (секунды), в том числе из Retry-After
+MAX_RETRY_DELAY = 30
+
+
+def _data_qa_selector(tags: List[str], values: List[str], relative: bool = True) -> etree.XPath:
+    """XPath: элементы с одним из тегов tags и атрибутом data-qa из values"""
+    tag_test = ' or '.join(f'self::{tag}' for tag in tags)
+    value_test = ' or '.join(f'@data-qa="{value}"' for value in values)
+    return etree.XPath(f"{'.' if relative else ''}//*[{tag_test}][{value_test}]")
+
+
+# Селекторы карточек поиска (несколько вариантов разметки HH), компилируются один раз при импорте
+CARD_SELECTOR = _data_qa_selector(
+    ['div', 'article'],
+    ['resume-serp__resume', 'resume-serp__resume_standard', 'serp-item'],
+    relative=False
+)
+TITLE_SELECTOR = _data_qa_selector(
+    ['a', 'h3', 'span'],
+    ['resume-serp__resume-title', 'resume-search-item__name', 'serp-item__title']
+)
+SALARY_SELECTOR = _data_qa_selector(
+    ['span', 'div'],
+    ['resume-serp__resume-compensation', 'resume-search-item__compensation', 'serp-item__salary']
+)
+EXPERIENCE_SELECTOR = _data_qa_selector(
+    ['div', 'span'],
+    ['resume-serp__resume-experience', 'resume-search-item__experience', 'serp-item__experience']
+)
+SKILLS_SELECTOR = _data_qa_selector(
+    ['div', 'span'],
+    ['resume-serp__resume-skills', 'resume-search-item__skills', 'serp-item__skills']
+)
+
+
+def _first(elements):
+    return elements[0] if elements else None
+
+
+def _text(element) -> str:
+    """Весь текст элемента с потомками (аналог .text в BeautifulSoup)"""
+    return ''.join(element.itertext())
+
+
+class HHClientError(Exception):
+    """HH.ru недоступен или вернул ошибку после всех повторов"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
 
-load_dotenv()
 
-HH_LOGIN = os.getenv('HH_LOGIN')
-HH_PASSWORD = os.getenv('HH_PASSWORD')
-HH_BASE_URL = 'https://hh.ru'
+@dataclass
+class HHResponse:
+    status: int
+    url: str
+    text: str
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
 
 class HeadHunterParser:
-    def __init__(self):
-        self.session = requests.Session()
+    """
+    Асинхронный клиент веб-интерфейса HH.ru.
+
+    Все запросы идут через один aiohttp.ClientSession с пулом соединений; число
+    одновременных запросов ограничено семафором. Ответы 429/5xx и сетевые ошибки
+    повторяются с экспоненциальной задержкой (учитывается Retry-After). Если сессия
+    на HH истекла (редирект на страницу входа), клиент заново авторизуется и повторяет запрос.
+    """
+
+    def __init__(
+        self,
+        base_url: str = HH_BASE_URL,
+        login: Optional[str] = HH_LOGIN,
+        password: Optional[str] = HH_PASSWORD,
+        max_connections: int = HH_MAX_CONNECTIONS,
+        max_concurrency: int = HH_MAX_CONCURRENCY,
+        timeout: float = HH_REQUEST_TIMEOUT,
+        max_retries: int = HH_MAX_RETRIES,
+        retry_backoff: float = HH_RETRY_BACKOFF
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.login = login
+        self.password = password
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
         self.is_authorized = False
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
         }
+        # Сессия, семафор и блокировка создаются в event loop при первом запросе
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._auth_lock: Optional[asyncio.Lock] = None
+        # Кэш страниц поиска и карточек резюме; фоновые задачи предзагрузки
+        self.search_cache = TTLCache(maxsize=HH_CACHE_MAX_ENTRIES, ttl=HH_SEARCH_CACHE_TTL)
+        self.resume_cache = TTLCache(maxsize=HH_CACHE_MAX_ENTRIES, ttl=HH_RESUME_CACHE_TTL)
+        self.prefetch_next_page = HH_PREFETCH_NEXT_PAGE
+        self._prefetch_tasks = set()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers,
+                # unsafe=True - хранить cookies и для адресов по IP (локальный тестовый сервер)
+                cookie_jar=aiohttp.CookieJar(unsafe=True)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._auth_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self):
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.is_authorized = False
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_DELAY)
+            except ValueError:
+                pass
+        # Экспоненциальная задержка со случайной добавкой, чтобы повторы не шли волной
+        delay = self.retry_backoff * (2 ** attempt)
+        return min(delay + random.uniform(0, delay / 2), MAX_RETRY_DELAY)
+
+    async def _request(self, method: str, path: str, **kwargs) -> HHResponse:
+        """Выполняет запрос с ограничением параллельности и повторами при 429/5xx и сетевых ошибках"""
+        session = self._get_session()
+        url = path if path.startswith('http') else f"{self.base_url}{path}"
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        text = await response.text()
+                        result = HHResponse(response.status, str(response.url), text)
+                        retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise HHClientError(f"HH.ru недоступен: {str(e) or type(e).__name__}") from e
+                print(f"Ошибка запроса к HH ({method} {url}): {e!r}, повтор {attempt + 1}/{self.max_retries}")
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            if result.status in RETRY_STATUSES:
+                if attempt == self.max_retries:
+                    raise HHClientError(
+                        f"HH.ru ответил {result.status} после {self.max_retries + 1} попыток",
+                        status=result.status
+                    )
+                delay = self._retry_delay(attempt, retry_after)
+                print(f"HH ответил {result.status} на {method} {url}, повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+                continue
+
+            return result
+
+    async def _get_authorized(self, path: str, **kwargs) -> HHResponse:
+        """GET с авторизацией: при истекшей сессии входит заново и повторяет запрос один раз"""
+        if not await self.authorize():
+            raise Exception("Не удалось авторизоваться")
+
+        response = await self._request('GET', path, **kwargs)
+        if 'account/login' in response.url:
+            print("Сессия истекла, выполняем повторную авторизацию")
+            self.is_authorized = False
+            if not await self.authorize():
+                raise Exception("Не удалось авторизоваться")
+            response = await self._request('GET', path, **kwargs)
+        return response
 
     async def authorize(self):
         """
@@ -27,64 +217,66 @@ class HeadHunterParser:
         if self.is_authorized:
             return True
 
-        try:
-            # Шаг 1: Получаем страницу входа
-            response = self.session.get(
-                f"{HH_BASE_URL}/account/login", 
-                headers=self.headers,
-                allow_redirects=True
-            )
-            
-            # Шаг 2: Извлекаем все скрытые поля из формы
-            soup = BeautifulSoup(response.text, 'html.parser')
-            login_form = soup.find('form', {'action': '/account/login'})
-            
-            if not login_form:
-                print("Не найдена форма входа")
-                return False
-            
-            # Собираем все скрытые поля
-            hidden_inputs = login_form.find_all('input', {'type': 'hidden'})
-            login_data = {
-                input_field.get('name'): input_field.get('value', '')
-                for input_field in hidden_inputs
-            }
-            
-            # Добавляем учетные данные
-            login_data.update({
-                'backUrl': 'https://hh.ru/',
-                'username': HH_LOGIN,
-                'password': HH_PASSWORD,
-                'remember': 'yes',
-                'action': 'Войти',
-                'continue': ''
-            })
-
-            # Шаг 3: Отправляем форму входа
-            response = self.session.post(
-                f"{HH_BASE_URL}/account/login",
-                data=login_data,
-                headers={
-                    **self.headers,
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Origin': HH_BASE_URL,
-                    'Referer': f"{HH_BASE_URL}/account/login"
-                },
-                allow_redirects=True
-            )
-
-            # Проверяем успешность авторизации
-            if 'account/login' not in response.url:
-                self.is_authorized = True
-                print("Успешная авторизация")
+        self._get_session()
+        # Одновременные запросы не должны запускать несколько входов подряд
+        async with self._auth_lock:
+            if self.is_authorized:
                 return True
-            else:
-                print(f"Ошибка авторизации. URL после входа: {response.url}")
-                return False
 
-        except Exception as e:
-            print(f"Ошибка авторизации: {str(e)}")
-            return False
+            try:
+                # Шаг 1: Получаем страницу входа
+                response = await self._request('GET', '/account/login', allow_redirects=True)
+
+                # Шаг 2: Извлекаем все скрытые поля из формы
+                soup = BeautifulSoup(response.text, 'html.parser')
+                login_form = soup.find('form', {'action': '/account/login'})
+
+                if not login_form:
+                    print("Не найдена форма входа")
+                    return False
+
+                # Собираем все скрытые поля
+                hidden_inputs = login_form.find_all('input', {'type': 'hidden'})
+                login_data = {
+                    input_field.get('name'): input_field.get('value', '')
+                    for input_field in hidden_inputs
+                }
+
+                # Добавляем учетные данные
+                login_data.update({
+                    'backUrl': f'{self.base_url}/',
+                    'username': self.login or '',
+                    'password': self.password or '',
+                    'remember': 'yes',
+                    'action': 'Войти',
+                    'continue': ''
+                })
+
+                # Шаг 3: Отправляем форму входа
+                response = await self._request(
+                    'POST',
+                    '/account/login',
+                    data=login_data,
+                    headers={
+                        'Content-Type': 'application/x-www-form-urlencoded',
+                        'Origin': self.base_url,
+                        'Referer': f"{self.base_url}/account/login"
+                    },
+                    allow_redirects=True
+                )
+
+                # Проверяем успешность авторизации
+                if response.ok and 'account/login' not in response.url:
+                    self.is_authorized = True
+                    print("Успешная авторизация")
+                    return True
+                else:
+                    print(f"Ошибка авторизации. URL после входа: {response.url}")
+                    return False
+
+            except Exception as e:
+                print(f"Ошибка авторизации: {str(e)}")
+                return False
 
     async def search_resumes(
         self,
@@ -96,171 +288,217 @@ class HeadHunterParser:
         """
         Поиск резюме через веб-интерфейс
         """
-        if not await self.authorize():
-            raise Exception("Не удалось авторизоваться")
+        # Формируем URL поиска
+        params = {
+            'text': query,
+            'page': page,
+            'experience': experience if experience else '',
+            'salary': salary if salary else '',
+            'area': 97,  # Узбекистан
+            'currency_code': 'UZS',
+            'label': 'only_with_salary' if salary else '',
+            'search_period': '30',
+            'order_by': 'relevance',
+            'no_magic': 'true',
+            'pos': 'full_text',
+            'source': 'all',
+            'st': 'searchVacancy'
+        }
 
-        try:
-            # Формируем URL поиска
-            params = {
-                'text': query,
-                'page': page,
-                'experience': experience if experience else '',
-                'salary': salary if salary else '',
-                'area': 97,  # Узбекистан
-                'currency_code': 'UZS',
-                'label': 'only_with_salary' if salary else '',
-                'search_period': '30',
-                'order_by': 'relevance',
-                'no_magic': 'true',
-                'pos': 'full_text',
-                'source': 'all',
-                'st': 'searchVacancy'
-            }
-
-            response = self.session.get(
-                f"{HH_BASE_URL}/search/resume",
-                params=params,
-                headers={
-                    **self.headers,
-                    'Referer': f"{HH_BASE_URL}/employer/main"
-                }
-            )
+        # HHClientError (HH недоступен после всех повторов) пробрасывается вызывающему
+        response = await self._get_authorized(
+            '/search/resume',
+            params=params,
+            headers={'Referer': f"{self.base_url}/employer/main"}
+        )
 
-            if not response.ok:
-                print(f"Ошибка при поиске резюме. Статус: {response.status_code}")
-                print(f"Текст ответа: {response.text}")
-                return []
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Проверяем, не перенаправило ли нас на страницу входа
-            if 'account/login' in response.url:
-                print("Сессия истекла, требуется повторная авторизация")
-                self.is_authorized = False
-                return []
-
-            resumes = []
-
-            # Находим все карточки резюме
-            resume_items = soup.find_all(['div', 'article'], {'data-qa': ['resume-serp__resume', 'resume-serp__resume_standard', 'serp-item']})
-            
-            if not resume_items:
-                print("Не найдены резюме на странице")
-                print(f"URL запроса: {response.url}")
-                return []
-
-            for item in resume_items:
-                try:
-                    # Извлекаем основную информацию
-                    title_elem = item.find(['a', 'h3', 'span'], {
-                        'data-qa': [
-                            'resume-serp__resume-title',
-                            'resume-search-item__name',
-                            'serp-item__title'
-                        ]
-                    })
-                    
-                    if not title_elem:
-                        continue
-
-                    # Получаем ссылку и ID резюме
-                    resume_url = title_elem.get('href', '')
-                    if not resume_url.startswith('http'):
-                        resume_url = f"{HH_BASE_URL}{resume_url}"
-                    resume_id = resume_url.split('/')[-1]
-
-                    # Извлекаем зарплату
-                    salary_elem = item.find(['span', 'div'], {
-                        'data-qa': [
-                            'resume-serp__resume-compensation',
-                            'resume-search-item__compensation',
-                            'serp-item__salary'
-                        ]
-                    })
-                    
-                    # Извлекаем опыт работы
-                    experience_elem = item.find(['div', 'span'], {
-                        'data-qa': [
-                            'resume-serp__resume-experience',
-                            'resume-search-item__experience',
-                            'serp-item__experience'
-                        ]
-                    })
-
-                    # Извлекаем навыки
-                    skills_elem = item.find(['div', 'span'], {
-                        'data-qa': [
-                            'resume-serp__resume-skills',
-                            'resume-search-item__skills',
-                            'serp-item__skills'
-                        ]
-                    })
-
-                    resume = {
-                        'id': resume_id,
-                        'title': title_elem.text.strip(),
-                        'fullName': title_elem.text.strip().split(',')[0] if ',' in title_elem.text else title_elem.text.strip(),
-                        'url': resume_url,
-                        'salary': salary_elem.text.strip() if salary_elem else 'Не указана',
-                        'experience': experience_elem.text.strip() if experience_elem else 'Нет опыта',
-                        'skills': [skill.strip() for skill in (skills_elem.text.split(',') if skills_elem else [])]
-                    }
-                    resumes.append(resume)
-
-                except Exception as e:
-                    print(f"Ошибка при парсинге резюме: {str(e)}")
-                    continue
+        if not response.ok:
+            print(f"Ошибка при поиске резюме. Статус: {response.status}")
+            print(f"Текст ответа: {response.text}")
+            return []
 
-            return resumes
+        if 'account/login' in response.url:
+            print("Сессия истекла, повторная авторизация не помогла")
+            self.is_authorized = False
+            return []
 
+        try:
+            return self.parse_search_results(response.text, response.url)
         except Exception as e:
             print(f"Ошибка при поиске резюме: {str(e)}")
             return []
 
-    async def get_resume_detail(self, resume_id: str) -> Dict:
+    @staticmethod
+    def search_cache_key(query: str, experience: Optional[str], salary: Optional[int], page: int) -> tuple:
+        """Нормализованный ключ страницы поиска: регистр и лишние пробелы в запросе не важны"""
+        normalized_query = re.sub(r'\s+', ' ', (query or '').strip().lower())
+        return (normalized_query, experience or None, salary or None, int(page))
+
+    async def search_resumes_cached(
+        self,
+        query: str,
+        experience: Optional[str] = None,
+        salary: Optional[int] = None,
+        page: int = 0,
+        refresh: bool = False
+    ) -> Dict:
         """
-        Получение ФИО и даты рождения из резюме
+        Страница поиска из кэша (или с HH при промахе) с метаданными свежести.
+        Пустые страницы не кэшируются: это может быть и временная ошибка HH.
+        После ответа в фоне загружается следующая страница.
         """
-        if not await self.authorize():
-            raise Exception("Не удалось авторизоваться")
+        key = self.search_cache_key(query, experience, salary, page)
+        entry, cached = await self.search_cache.get_or_set(
+            key,
+            lambda: self.search_resumes(query=query, experience=experience, salary=salary, page=page),
+            refresh=refresh,
+            cache_if=bool
+        )
+        resumes = entry.value
+        if resumes and self.prefetch_next_page:
+            self._schedule_prefetch(query, experience, salary, page + 1)
+
+        return {
+            'resumes': resumes,
+            'ids': [resume['id'] for resume in resumes],
+            'page': page,
+            'cache': entry.freshness(cached)
+        }
+
+    def _schedule_prefetch(self, query: str, experience: Optional[str], salary: Optional[int], page: int):
+        key = self.search_cache_key(query, experience, salary, page)
+        if key in self.search_cache or self.search_cache.is_pending(key):
+            return
+        task = asyncio.create_task(self._prefetch(query, experience, salary, page))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
 
+    async def _prefetch(self, query: str, experience: Optional[str], salary: Optional[int], page: int):
+        key = self.search_cache_key(query, experience, salary, page)
         try:
-            response = self.session.get(
-                f"{HH_BASE_URL}/resume/{resume_id}",
-                headers=self.headers
+            await self.search_cache.get_or_set(
+                key,
+                lambda: self.search_resumes(query=query, experience=experience, salary=salary, page=page),
+                cache_if=bool
             )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Не удалось предзагрузить страницу {page} поиска HH: {str(e)}")
+
+    def parse_search_results(self, html: str, url: str = '') -> List[Dict]:
+        """
+        Извлекает карточки резюме со страницы поиска.
+
+        Разбор идет через lxml (libxml2) заранее скомпилированными XPath-селекторами:
+        из дерева выбираются только карточки и нужные поля внутри них, без обхода
+        всего документа для каждого поля, как при find/find_all в BeautifulSoup.
+        """
+        if not html or not html.strip():
+            print("Пустая страница поиска")
+            return []
+
+        document = lxml_html.fromstring(html)
+
+        # Находим все карточки резюме
+        resume_items = CARD_SELECTOR(document)
+
+        if not resume_items:
+            print("Не найдены резюме на странице")
+            print(f"URL запроса: {url}")
+            return []
+
+        resumes = []
+        for item in resume_items:
+            try:
+                title_elem = _first(TITLE_SELECTOR(item))
+                if title_elem is None:
+                    continue
+
+                # Получаем ссылку и ID резюме
+                resume_url = title_elem.get('href', '')
+                if not resume_url.startswith('http'):
+                    resume_url = f"{self.base_url}{resume_url}"
+                resume_id = resume_url.split('/')[-1]
+
+                title_text = _text(title_elem)
+                salary_elem = _first(SALARY_SELECTOR(item))
+                experience_elem = _first(EXPERIENCE_SELECTOR(item))
+                skills_elem = _first(SKILLS_SELECTOR(item))
+
+                resume = {
+                    'id': resume_id,
+                    'title': title_text.strip(),
+                    'fullName': title_text.strip().split(',')[0] if ',' in title_text else title_text.strip(),
+                    'url': resume_url,
+                    'salary': _text(salary_elem).strip() if salary_elem is not None else 'Не указана',
+                    'experience': _text(experience_elem).strip() if experience_elem is not None else 'Нет опыта',
+                    'skills': [skill.strip() for skill in (_text(skills_elem).split(',') if skills_elem is not None else [])]
+                }
+                resumes.append(resume)
+
+            except Exception as e:
+                print(f"Ошибка при парсинге резюме: {str(e)}")
+                continue
+
+        return resumes
+
+    async def get_resume_detail(self, resume_id: str) -> Dict:
+        """
+        Получение ФИО и даты рождения из резюме
+        """
+        try:
+            response = await self._get_authorized(f"/resume/{resume_id}")
 
             if not response.ok:
-                print(f"Ошибка при получении резюме. Статус: {response.status_code}")
+                print(f"Ошибка при получении резюме. Статус: {response.status}")
                 return {}
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Извлекаем ФИО
-            name_elem = soup.find('h2', {'data-qa': 'resume-personal-name'})
-            if not name_elem:
-                raise Exception("Не удалось найти ФИО в резюме")
-            
-            full_name = name_elem.text.strip()
-
-            # Извлекаем возраст и дату рождения
-            birth_info = soup.find('span', {'data-qa': 'resume-personal-age'})
-            birth_date = None
-            
-            if birth_info:
-                # Текст обычно в формате "30 лет, родился 1 января 1994"
-                birth_text = birth_info.text.strip()
-                if 'родился' in birth_text or 'родилась' in birth_text:
-                    # Извлекаем дату рождения после слова "родился" или "родилась"
-                    birth_parts = birth_text.split('родил')
-                    if len(birth_parts) > 1:
-                        birth_date = birth_parts[1].strip('ась ').strip()
-
-            return {
-                'full_name': full_name,
-                'birth_date': birth_date or 'Не указана'
-            }
+            return self.parse_resume_detail(response.text)
 
+        except HHClientError:
+            raise
         except Exception as e:
             print(f"Ошибка при получении данных резюме: {str(e)}")
-            raise Exception(f"Не удалось получить данные резюме: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Не удалось получить данные резюме: {str(e)}")
+
+    async def get_resume_detail_cached(self, resume_id: str, refresh: bool = False) -> Dict:
+        """Карточка резюме из кэша (или с HH при промахе) с метаданными свежести"""
+        entry, cached = await self.resume_cache.get_or_set(
+            resume_id,
+            lambda: self.get_resume_detail(resume_id),
+            refresh=refresh,
+            cache_if=bool
+        )
+        if not entry.value:
+            return {}
+        return {**entry.value, 'cache': entry.freshness(cached)}
+
+    def parse_resume_detail(self, html: str) -> Dict:
+        """Извлекает ФИО и дату рождения со страницы резюме"""
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Извлекаем ФИО
+        name_elem = soup.find('h2', {'data-qa': 'resume-personal-name'})
+        if not name_elem:
+            raise Exception("Не удалось найти ФИО в резюме")
+
+        full_name = name_elem.text.strip()
+
+        # Извлекаем возраст и дату рождения
+        birth_info = soup.find('span', {'data-qa': 'resume-personal-age'})
+        birth_date = None
+
+        if birth_info:
+            # Текст обычно в формате "30 лет, родился 1 января 1994"
+            birth_text = birth_info.text.strip()
+            if 'родился' in birth_text or 'родилась' in birth_text:
+                # Извлекаем дату рождения после слова "родился" или "родилась"
+                birth_parts = birth_text.split('родил')
+                if len(birth_parts) > 1:
+                    birth_date = birth_parts[1].strip('ась ').strip()
+
+        return {
+            'full_name': full_name,
+            'birth_date': birth_date or 'Не указана'
+        }
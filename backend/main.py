@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from typing import Annotated, List, Optional, Dict, Set, Any, Union
 from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, File, UploadFile, Form, BackgroundTasks, Request, Query, Body
 from fastapi import Path as FastAPIPath  # Явное переименование для избежания конфликта
@@ -6,27 +6,40 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy.orm import Session, joinedload, contains_eager, selectinload, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
 import models, schemas
-from database import engine, get_db, SessionLocal
+from database import engine, get_db, get_async_db, AsyncSessionLocal, get_pool_stats
 from bot import send_message_to_candidate
-from hh_api import HeadHunterParser
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from hh_api import HeadHunterParser, HHClientError
+from ws_broadcast import create_broadcast_backend, MemoryBroadcastBackend
+from pagination import apply_keyset, next_cursor, NEXT_CURSOR_HEADER
+import search as search_service
+import dedup_service
+import analytics
+from reminder_scheduler import reminder_scheduler
+from notification_service import NotificationService
+from response_cache import ResponseCache, ResponseCacheMiddleware
+from task_mentions import extract_mentions, sync_task_mentions
+from resume_parser import (
+    resume_parser_pool, read_upload_limited, SUPPORTED_RESUME_EXTENSIONS,
+    ResumeParseError, ResumeTooLarge, ResumeParseTimeout, ResumeParserBusy
+)
+from resume_cache import save_resume, store_resume_content, get_parsed_resume, get_parsed_resume_for_path, count_resume_references
+from candidate_keys import normalize_phone_e164, name_key
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 import os
 import json
 import logging
 # Импортируем Path из pathlib с явным псевдонимом
 from pathlib import Path as PathLib
-import PyPDF2
-import docx
-import tempfile
-import re
-import shutil
-from docx import Document
 from config import (
     SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
-    RESUME_DIR, CORS_ORIGINS, BASE_DIR
+    RESUME_DIR, CORS_ORIGINS, BASE_DIR,
+    WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT,
+    RESUME_BATCH_MAX_FILES, RESUME_BATCH_MAX_ZIP_SIZE, RESUME_BATCH_MAX_UNPACKED_SIZE, RESUME_MAX_FILE_SIZE
 )
 from werkzeug.utils import secure_filename
 import asyncio
@@ -34,11 +47,12 @@ import hashlib
 import random
 import string
 import zipfile
-import calendar
+import io
 from collections import defaultdict
 import traceback
 import time
-from sqlalchemy import func, or_, and_, desc, distinct
+from sqlalchemy import func, or_, desc, distinct, select, update, delete, tuple_, union
+from fastapi.concurrency import run_in_threadpool
 import base64
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -46,7 +60,9 @@ import smtplib
 from dotenv import load_dotenv
 from auth import create_access_token, get_current_user
 from email_validator import validate_email, EmailNotValidError
-from dateutils import date_to_datetime
+from dateutils import (
+    date_to_datetime, parse_task_date, local_day_range
+)
 from uuid import uuid4
 
 models.Base.metadata.create_all(bind=engine)
@@ -57,6 +73,15 @@ app = FastAPI(title="Abstract HR Platform API")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Кэш ответов GET с ETag/304. Добавляется до CORS, чтобы CORS-заголовки получали и ответы из кэша
+response_cache = ResponseCache()
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+# Кэши аналитики сбрасываются вместе с версиями ресурсов: после commit и на всех воркерах
+response_cache.on_change("status_history", analytics.funnel_cache.clear)
+# Показатели рекрутеров зависят от назначений (вакансии, в т.ч. удаление) и имен пользователей
+response_cache.on_change("vacancies", analytics.recruiter_stats_cache.clear)
+response_cache.on_change("users", analytics.recruiter_stats_cache.clear)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -64,56 +89,229 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # Курсор пагинации должен быть доступен фронтенду
 )
 
 # WebSocket connections manager
+class WebSocketClient:
+    """
+    Одно WebSocket-соединение с собственной ограниченной очередью исходящих сообщений.
+    Отправкой занимается отдельная задача, поэтому медленный клиент не задерживает остальных.
+    """
+    def __init__(self, websocket: WebSocket, user_email: str, role: Optional[str] = None):
+        self.websocket = websocket
+        self.user_email = user_email
+        self.role = role
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.writer_task: Optional[asyncio.Task] = None
+
+    def enqueue(self, text: str) -> bool:
+        """Ставит уже сериализованное сообщение в очередь; False, если очередь переполнена"""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+# Темы WebSocket-подписок:
+#   user:<email>          - личные уведомления пользователя (подписка автоматически)
+#   role:<role>           - уведомления для роли (подписка автоматически)
+#   application:<id>      - чат конкретной заявки
+#   applications          - лента заявок: новые заявки и сообщения кандидатов
+WS_FEED_TOPICS = {"applications"}
+WS_MAX_TOPICS_PER_CONNECTION = 100
+
+def user_topic(email: str) -> str:
+    return f"user:{email}"
+
+def role_topic(role: str) -> str:
+    return f"role:{role}"
+
+def application_topic(application_id: int) -> str:
+    return f"application:{application_id}"
+
+def is_client_subscribable_topic(topic: str) -> bool:
+    """Темы, на которые клиент может подписаться сам (личные и ролевые назначаются сервером)"""
+    if topic in WS_FEED_TOPICS:
+        return True
+    prefix, _, value = topic.partition(":")
+    return prefix == "application" and value.isdigit()
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.authenticated_users: Dict[str, WebSocket] = {}
+    """
+    Хранит WebSocket-соединения текущего воркера и их подписки на темы.
+    События публикуются через бэкенд рассылки (ws_broadcast), который доставляет их
+    на все воркеры, а каждый воркер отправляет событие только подписанным клиентам в deliver().
+    """
+    def __init__(self, backend=None):
+        self.connections: Dict[WebSocket, WebSocketClient] = {}
+        self.topics: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self.backend = backend or MemoryBroadcastBackend()
+    
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
+    
+    @property
+    def authenticated_users(self) -> Dict[str, Set[WebSocket]]:
+        """Соединения пользователей текущего воркера (у одного пользователя может быть несколько вкладок)"""
+        return {
+            topic[len("user:"):]: set(sockets)
+            for topic, sockets in self.topics.items()
+            if topic.startswith("user:")
+        }
+    
+    async def start(self):
+        await self.backend.start(self.deliver)
+        print(f"WebSocket broadcast backend started: {self.backend.name}")
     
-    async def connect(self, websocket: WebSocket, user_email: str):
+    async def stop(self):
+        await self.backend.stop()
+        for websocket in list(self.connections):
+            self.disconnect(websocket)
+    
+    async def connect(self, websocket: WebSocket, user_email: str, role: Optional[str] = None):
         # Обратите внимание, что websocket.accept() вызывается до этого метода
-        self.active_connections.append(websocket)
-        self.authenticated_users[user_email] = websocket
-        print(f"WebSocket connected for user {user_email}. Total connections: {len(self.active_connections)}")
+        client = WebSocketClient(websocket, user_email, role)
+        client.writer_task = asyncio.create_task(self._writer(client))
+        self.connections[websocket] = client
+        self._subscribe(client, user_topic(user_email))
+        if role:
+            self._subscribe(client, role_topic(role))
+        print(f"WebSocket connected for user {user_email}. Total connections: {len(self.connections)}")
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            
-            # Также удаляем из словаря аутентифицированных пользователей
-            for email, conn in list(self.authenticated_users.items()):
-                if conn == websocket:
-                    del self.authenticated_users[email]
-                    print(f"User {email} disconnected")
-                    break
-                    
-            print(f"WebSocket disconnected. Remaining connections: {len(self.active_connections)}")
-        else:
-            print("Attempted to disconnect a WebSocket that was not in active connections")
+        client = self.connections.pop(websocket, None)
+        if client is None:
+            return
+        
+        if client.writer_task and client.writer_task is not asyncio.current_task():
+            client.writer_task.cancel()
+        
+        for topic in list(client.topics):
+            self._unsubscribe(client, topic)
+        
+        print(f"WebSocket disconnected for user {client.user_email}. Remaining connections: {len(self.connections)}")
+
+    def _subscribe(self, client: WebSocketClient, topic: str):
+        client.topics.add(topic)
+        self.topics[topic].add(client.websocket)
+
+    def _unsubscribe(self, client: WebSocketClient, topic: str):
+        client.topics.discard(topic)
+        sockets = self.topics.get(topic)
+        if sockets is not None:
+            sockets.discard(client.websocket)
+            if not sockets:
+                del self.topics[topic]
+
+    def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """Подписка по запросу клиента; False, если тема недоступна или превышен лимит"""
+        client = self.connections.get(websocket)
+        if client is None or not is_client_subscribable_topic(topic):
+            return False
+        if topic not in client.topics and len(client.topics) >= WS_MAX_TOPICS_PER_CONNECTION:
+            return False
+        self._subscribe(client, topic)
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, topic: str) -> bool:
+        client = self.connections.get(websocket)
+        if client is None or not is_client_subscribable_topic(topic):
+            return False
+        self._unsubscribe(client, topic)
+        return True
+
+    async def _writer(self, client: WebSocketClient):
+        """Отправляет сообщения из очереди клиента; при зависшей отправке отключает клиента"""
+        try:
+            while True:
+                text = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(text), timeout=WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            print(f"WebSocket send timed out for {client.user_email}, disconnecting slow client")
+            await self._drop(client, reason="Send timeout")
+        except Exception as e:
+            print(f"Error sending WebSocket message to {client.user_email}: {e}")
+            await self._drop(client)
+
+    async def _drop(self, client: WebSocketClient, reason: str = ""):
+        self.disconnect(client.websocket)
+        await self._close(client.websocket, reason)
+
+    @staticmethod
+    async def _close(websocket: WebSocket, reason: str = ""):
+        try:
+            # 1013 - Try Again Later: клиент переподключится и заново загрузит данные
+            await asyncio.wait_for(websocket.close(code=1013, reason=reason), timeout=WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def _enqueue(self, client: WebSocketClient, text: str):
+        if not client.enqueue(text):
+            print(f"WebSocket queue overflow for {client.user_email}, disconnecting slow client")
+            self.disconnect(client.websocket)
+            asyncio.create_task(self._close(client.websocket, reason="Too slow"))
+
+    @staticmethod
+    def _serialize(message: dict) -> str:
+        return json.dumps(message, ensure_ascii=False, default=str)
+
+    async def send_personal(self, websocket: WebSocket, message: dict):
+        """Отправляет сообщение конкретному соединению текущего воркера"""
+        client = self.connections.get(websocket)
+        if client:
+            self._enqueue(client, self._serialize(message))
 
     async def broadcast(self, message: dict):
-        if not self.active_connections:
-            print("No active connections to broadcast to")
-            return
-            
-        print(f"Broadcasting message to {len(self.active_connections)} clients: {message.get('type', 'no-type')}")
-        disconnected = []
+        """Отправляет сообщение всем клиентам на всех воркерах"""
+        await self.backend.publish({"target": "all", "message": message})
+
+    async def publish(self, topics: List[str], message: dict):
+        """Отправляет сообщение клиентам, подписанным хотя бы на одну из тем, на всех воркерах"""
+        if topics:
+            await self.backend.publish({"target": "topics", "topics": list(topics), "message": message})
+
+    async def send_to_user(self, user_email: str, message: dict):
+        """Отправляет сообщение во все вкладки пользователя, на каком бы воркере он ни был подключен"""
+        await self.publish([user_topic(user_email)], message)
+
+    async def send_to_users(self, user_emails: List[str], message: dict):
+        """Одна публикация для нескольких пользователей (каждый получит сообщение один раз)"""
+        await self.publish([user_topic(email) for email in user_emails], message)
+
+    async def send_to_role(self, role: str, message: dict):
+        await self.publish([role_topic(role)], message)
+
+    async def deliver(self, event: dict):
+        """Доставляет событие из бэкенда рассылки клиентам текущего воркера"""
+        message = event.get("message", {})
+        if event.get("target") == "all":
+            recipients = list(self.connections)
+        else:
+            # Объединяем подписчиков всех тем, чтобы клиент получил сообщение один раз
+            recipients = set()
+            for topic in event.get("topics", []):
+                recipients.update(self.topics.get(topic, ()))
         
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting message: {e}")
-                disconnected.append(connection)
+        if not recipients:
+            return
         
-        # Отключаем соединения с ошибками после итерации
-        for conn in disconnected:
-            self.disconnect(conn)
+        print(f"Delivering message to {len(recipients)} clients: {message.get('type', 'no-type')}")
+        # Сериализуем один раз, отправка идет параллельно через очереди клиентов
+        text = self._serialize(message)
+        for websocket in recipients:
+            client = self.connections.get(websocket)
+            if client:
+                self._enqueue(client, text)
 
 # Создаем экземпляр ConnectionManager
-manager = ConnectionManager()
+manager = ConnectionManager(create_broadcast_backend())
+# Уведомления пользователям: запись в БД одним запросом и отправка подключенным получателям
+notification_service = NotificationService(manager.send_to_users)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -124,13 +322,18 @@ def get_password_hash(password):
 def get_user(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user(db, email)
+async def get_user_async(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_async(db, email)
     print(f"Attempting to authenticate user: {email}")
     print(f"User found: {user is not None}")
     if user:
         print(f"Verifying password...")
-        is_valid = verify_password(password, user.hashed_password)
+        # bcrypt заметно нагружает CPU, поэтому проверяем пароль вне event loop
+        is_valid = await run_in_threadpool(verify_password, password, user.hashed_password)
         print(f"Password valid: {is_valid}")
         if is_valid:
             return user
@@ -148,7 +351,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -163,7 +366,7 @@ async def get_current_user(
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = get_user(db, email=token_data.email)
+    user = await get_user_async(db, email=token_data.email)
     if user is None:
         raise credentials_exception
     return user
@@ -171,9 +374,9 @@ async def get_current_user(
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -214,11 +417,11 @@ async def read_users_me(
 async def update_current_user(
     user_update: schemas.UserUpdate,
     current_user: Annotated[schemas.User, Depends(get_current_user)],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # Получаем пользователя из базы данных
-        db_user = db.query(models.User).filter(models.User.id == current_user.id).first()
+        db_user = await db.get(models.User, current_user.id)
         if not db_user:
             raise HTTPException(status_code=404, detail="Пользователь не найден")
         
@@ -231,16 +434,17 @@ async def update_current_user(
         
         if user_update.email is not None:
             # Проверяем, что email не занят другим пользователем
-            existing_user = db.query(models.User).filter(
+            result = await db.execute(select(models.User).filter(
                 models.User.email == user_update.email, 
                 models.User.id != current_user.id
-            ).first()
+            ))
+            existing_user = result.scalars().first()
             if existing_user:
                 raise HTTPException(status_code=400, detail="Email уже используется другим пользователем")
             db_user.email = user_update.email
         
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     except HTTPException:
         # Пробрасываем уже сформированные HTTP исключения
@@ -250,11 +454,28 @@ async def update_current_user(
         print(f"Ошибка при обновлении пользователя: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
+async def get_application_with_relations(db: AsyncSession, application_id: int):
+    """
+    Загружает заявку вместе с историей статусов и сообщениями.
+    В асинхронной сессии ленивая загрузка недоступна, поэтому связи подгружаются заранее.
+    """
+    result = await db.execute(
+        select(models.Application)
+        .options(
+            selectinload(models.Application.status_history),
+            selectinload(models.Application.messages)
+        )
+        .filter(models.Application.id == application_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
 # Application endpoints
 @app.post("/applications/", response_model=schemas.Application)
 async def create_application(
     application: schemas.ApplicationCreate,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Создаем объект заявки
     db_application = models.Application(
@@ -262,22 +483,20 @@ async def create_application(
         status="новый"
     )
     db.add(db_application)
-    db.commit()
-    db.refresh(db_application)
+    await db.commit()
+    db_application = await get_application_with_relations(db, db_application.id)
     
-    # Создаем уведомления для всех администраторов
-    admins = db.query(models.User).filter(models.User.role == "admin").all()
-    for admin in admins:
-        notification = models.Notification(
-            user_id=admin.id,
-            message=f"Новая заявка от {db_application.full_name}",
-            is_read=False
-        )
-        db.add(notification)
-    db.commit()
+    # Текст резюме для поиска извлекаем после ответа, чтобы не задерживать бота
+    if db_application.resume_file_path:
+        background_tasks.add_task(index_resume_text, models.Application, db_application.id, db_application.resume_file_path)
+    # Поиск дубликатов среди заявок и кандидатов HH - тоже после ответа
+    background_tasks.add_task(dedup_service.check_record, "application", db_application.id)
+    
+    # Уведомляем всех администраторов после ответа
+    notification_service.defer(background_tasks, f"Новая заявка от {db_application.full_name}", roles=["admin"])
     
-    # Отправляем уведомление всем подключенным клиентам
-    await manager.broadcast({
+    # Отправляем уведомление подписчикам ленты заявок
+    await manager.publish(["applications"], {
         "type": "new_application",
         "application": {
             "id": db_application.id,
@@ -302,12 +521,52 @@ async def create_application(
 
 @app.get("/applications/", response_model=List[schemas.Application])
 def read_applications(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    position: Optional[str] = None,
+    city: Optional[str] = None,
+    source: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    applications = db.query(models.Application).offset(skip).limit(limit).all()
+    """
+    Список заявок, новые сверху, с фильтрами на стороне сервера.
+    
+    Пагинация по курсору: курсор следующей страницы возвращается в заголовке X-Next-Cursor,
+    его нужно передать в параметре cursor. Параметр skip оставлен для совместимости.
+    end_date включается в период целиком.
+    """
+    query = db.query(models.Application).options(
+        selectinload(models.Application.status_history),
+        selectinload(models.Application.messages)
+    )
+    
+    if status:
+        query = query.filter(models.Application.status == status)
+    if position:
+        query = query.filter(models.Application.position == position)
+    if city:
+        query = query.filter(models.Application.city == city)
+    if source:
+        query = query.filter(models.Application.source == source)
+    if start_date:
+        query = query.filter(models.Application.created_at >= date_to_datetime(start_date))
+    if end_date:
+        query = query.filter(models.Application.created_at < date_to_datetime(end_date) + timedelta(days=1))
+    
+    query = apply_keyset(query, models.Application.created_at, models.Application.id, cursor)
+    if skip and not cursor:
+        query = query.offset(skip)
+    applications = query.limit(limit).all()
+    
+    cursor_value = next_cursor(applications, limit)
+    if cursor_value:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
     return applications
 
 @app.get("/applications/{application_id}", response_model=schemas.Application)
@@ -331,9 +590,9 @@ async def update_application_status(
     application_id: int,
     status_update: schemas.StatusUpdate,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    application = db.query(models.Application).filter(models.Application.id == application_id).first()
+    application = await db.get(models.Application, application_id)
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
 
@@ -348,30 +607,57 @@ async def update_application_status(
         created_by=current_user.full_name
     )
     db.add(status_history)
-    db.commit()
-    db.refresh(application)
+    await analytics.record_status_change(db, "application", status_update.status)
+    await db.commit()
     
-    return application
+    return await get_application_with_relations(db, application_id)
 
 @app.get("/applications/{application_id}/history", response_model=List[schemas.StatusHistory])
 async def get_application_history(
     application_id: int,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    history = db.query(models.StatusHistory)\
-        .filter(models.StatusHistory.application_id == application_id)\
-        .order_by(models.StatusHistory.created_at.desc())\
-        .all()
-    return history 
+    result = await db.execute(
+        select(models.StatusHistory)
+        .filter(models.StatusHistory.application_id == application_id)
+        .order_by(models.StatusHistory.created_at.desc())
+    )
+    return result.scalars().all() 
+
+def resolve_notification_topics(message: dict) -> Optional[List[str]]:
+    """
+    Определяет темы для уведомления без явной адресации по его типу.
+    None - тип неизвестен, уведомление уходит всем клиентам (прежнее поведение).
+    """
+    message_type = message.get("type")
+    if message_type == "new_message" and message.get("application_id") is not None:
+        return [application_topic(message["application_id"]), "applications"]
+    if message_type == "new_application":
+        return ["applications"]
+    return None
 
 @app.post("/notify")
 async def notify_clients(message: dict):
     """
-    Отправляет уведомления всем подключенным клиентам через WebSocket.
+    Отправляет уведомления через WebSocket (на всех воркерах) только заинтересованным клиентам.
     Поддерживает различные типы уведомлений: new_message, new_task, new_vacancy, vacancy_assignment, etc.
+    
+    Адресат можно указать явно: {"message": {...}, "topics": [...], "users": [...], "roles": [...]}.
+    Иначе темы определяются по типу уведомления (new_message - чат заявки и лента заявок).
     """
-    await manager.broadcast(message)
+    if isinstance(message.get("message"), dict) and any(key in message for key in ("topics", "users", "roles")):
+        topics = list(message.get("topics") or [])
+        topics += [user_topic(email) for email in message.get("users") or []]
+        topics += [role_topic(role) for role in message.get("roles") or []]
+        await manager.publish(topics, message["message"])
+        return {"status": "success"}
+    
+    topics = resolve_notification_topics(message)
+    if topics is None:
+        await manager.broadcast(message)
+    else:
+        await manager.publish(topics, message)
     return {"status": "success"}
 
 @app.websocket("/ws")
@@ -391,12 +677,19 @@ async def websocket_endpoint(websocket: WebSocket):
             await websocket.close(code=1008, reason="Invalid token")
             return
         
+        # Роль нужна для подписки на ролевые уведомления
+        async with AsyncSessionLocal() as db:
+            user = await get_user_async(db, email)
+        if user is None:
+            await websocket.close(code=1008, reason="User not found")
+            return
+        
         # Если токен валидный, принимаем соединение
         await websocket.accept()
-        await manager.connect(websocket, email)
+        await manager.connect(websocket, email, user.role)
         
         # Отправляем подтверждение успешного подключения
-        await websocket.send_json({"status": "connected", "user": email})
+        await manager.send_personal(websocket, {"status": "connected", "user": email})
         
         try:
             # Ждем сообщений от клиента
@@ -405,13 +698,28 @@ async def websocket_endpoint(websocket: WebSocket):
                 try:
                     # Пробуем обработать полученные данные как JSON
                     message_data = json.loads(data)
-                    # В будущем здесь можно обрабатывать команды от клиента
-                    if message_data.get("type") == "ping":
-                        await websocket.send_json({"type": "pong"})
+                    message_type = message_data.get("type")
+                    if message_type == "ping":
+                        await manager.send_personal(websocket, {"type": "pong"})
+                    elif message_type in ("subscribe", "unsubscribe"):
+                        # {"type": "subscribe", "topic": "applications"} или {"type": "subscribe", "application_id": 5}
+                        topic = message_data.get("topic")
+                        if topic is None and message_data.get("application_id") is not None:
+                            topic = application_topic(message_data["application_id"])
+                        if message_type == "subscribe":
+                            ok = manager.subscribe(websocket, str(topic))
+                        else:
+                            ok = manager.unsubscribe(websocket, str(topic))
+                        await manager.send_personal(websocket, {
+                            "type": f"{message_type}d" if ok else f"{message_type}_rejected",
+                            "topic": topic
+                        })
                 except json.JSONDecodeError:
                     # Если это не JSON, игнорируем
                     pass
         except WebSocketDisconnect:
+            pass
+        finally:
             manager.disconnect(websocket)
     except JWTError as e:
         print(f"JWT Error in WebSocket: {e}")
@@ -430,9 +738,9 @@ async def create_message(
     application_id: int,
     message: schemas.MessageCreate,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    application = db.query(models.Application).filter(models.Application.id == application_id).first()
+    application = await db.get(models.Application, application_id)
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
     
@@ -442,15 +750,15 @@ async def create_message(
         sender='hr'
     )
     db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
+    await db.commit()
+    await db.refresh(db_message)
     
     # Отправляем сообщение кандидату через бота
     success = await send_message_to_candidate(application_id, message.content)
     if not success:
         # Если не удалось отправить сообщение, добавляем пометку в базу
         db_message.delivery_status = 'failed'
-        db.commit()
+        await db.commit()
     
     return db_message
 
@@ -488,27 +796,35 @@ async def search_resumes(
     experience: Optional[str] = None,
     salary: Optional[int] = None,
     page: int = 0,
+    refresh: bool = False,
     current_user: schemas.User = Depends(get_current_user)
 ):
     try:
-        resumes = await hh_parser.search_resumes(
+        # Страница берется из кэша, следующая загружается в фоне; refresh=true - запросить HH заново
+        return await hh_parser.search_resumes_cached(
             query=query,
             experience=experience,
             salary=salary,
-            page=page
+            page=page,
+            refresh=refresh
         )
-        return {"resumes": resumes}
+    except HHClientError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         print(f"Ошибка при поиске резюме: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/hh/resume/{resume_id}")
-async def get_resume_detail(resume_id: str):
+async def get_resume_detail(resume_id: str, refresh: bool = False):
     try:
-        resume = await hh_parser.get_resume_detail(resume_id)
+        resume = await hh_parser.get_resume_detail_cached(resume_id, refresh=refresh)
         if not resume:
             raise HTTPException(status_code=404, detail="Резюме не найдено")
         return resume
+    except HTTPException:
+        raise
+    except HHClientError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -516,36 +832,43 @@ async def get_resume_detail(resume_id: str):
 async def delete_application(
     application_id: int,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # Находим заявку
-        application = db.query(models.Application).filter(models.Application.id == application_id).first()
+        application = await db.get(models.Application, application_id)
         if not application:
             raise HTTPException(status_code=404, detail="Application not found")
         
-        # Если есть файл резюме, удаляем его
-        if application.resume_file_path:
-            resume_path = RESUME_DIR / application.resume_file_path
-            if resume_path.exists():
-                resume_path.unlink()
+        resume_file_path = application.resume_file_path
         
         # Удаляем все связанные сообщения
-        db.query(models.Message).filter(models.Message.application_id == application_id).delete()
+        await db.execute(delete(models.Message).filter(models.Message.application_id == application_id))
         
-        # Удаляем всю историю статусов
-        db.query(models.StatusHistory).filter(models.StatusHistory.application_id == application_id).delete()
+        # Удаляем всю историю статусов (и вычитаем ее из счетчиков аналитики)
+        await analytics.remove_history(db, "application", models.StatusHistory.application_id == application_id)
+        await db.execute(delete(models.StatusHistory).filter(models.StatusHistory.application_id == application_id))
         
         # Удаляем саму заявку
-        db.query(models.Application).filter(models.Application.id == application_id).delete()
+        await db.execute(delete(models.Application).filter(models.Application.id == application_id))
         
         # Фиксируем изменения
-        db.commit()
+        await db.commit()
+        
+        # Файл резюме хранится по хэшу содержимого и может быть общим с другими заявками
+        # и кандидатами HH - удаляем его, только если на него больше никто не ссылается
+        if resume_file_path:
+            resume_path = resolve_resume_path(resume_file_path)
+            try:
+                if resume_path.exists() and not await count_resume_references(db, resume_path.name):
+                    resume_path.unlink()
+            except Exception as e:
+                logging.error(f"Error deleting resume file {resume_path}: {str(e)}")
         
         return {"status": "success", "message": "Application deleted successfully"}
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error deleting application: {str(e)}")
+        await db.rollback()
+        logging.error(f"Error deleting application: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Улучшенный эндпоинт для получения резюме
@@ -588,366 +911,250 @@ async def get_resume(file_path: str):
 # Монтируем директорию с резюме
 app.mount("/resumes", StaticFiles(directory=str(RESUME_DIR)), name="resumes")
 
-def extract_text_from_pdf(file_path):
-    """Извлекает текст из PDF файла"""
-    text = ""
-    try:
-        print("Начинаем извлечение текста из PDF")
-        with open(file_path, 'rb') as file:
-            pdf = PyPDF2.PdfReader(file)
-            print(f"Количество страниц в PDF: {len(pdf.pages)}")
-            for i, page in enumerate(pdf.pages, 1):
-                page_text = page.extract_text()
-                print(f"Страница {i}: извлечено {len(page_text)} символов")
-                text += page_text + "\n"
-        return text
-    except Exception as e:
-        print(f"Ошибка при извлечении текста из PDF: {str(e)}")
-        raise
+def resolve_resume_path(resume_file_path: str) -> PathLib:
+    """
+    Путь к файлу резюме на диске.
+    У заявок из бота хранится только имя файла в RESUME_DIR, у кандидатов HH - путь вида resumes/<файл>.
+    """
+    if resume_file_path.replace("\\", "/").startswith("resumes/"):
+        return BASE_DIR / resume_file_path
+    return RESUME_DIR / resume_file_path
 
-def extract_text_from_doc(file_path):
-    """Извлекает текст из DOC/DOCX файла"""
-    text = ""
+async def index_resume_text(model, record_id: int, resume_file_path: str):
+    """Извлекает текст резюме и сохраняет его в resume_text (фоновая задача)"""
     try:
-        print("Начинаем извлечение текста из Word документа")
-        doc = docx.Document(file_path)
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        print(f"Извлечено {len(text)} символов из Word документа")
-        return text
-    except Exception as e:
-        print(f"Ошибка при извлечении текста из Word: {str(e)}")
-        raise
+        text = (await get_parsed_resume_for_path(resolve_resume_path(resume_file_path)))["text"]
+    except (ResumeParseError, OSError) as e:
+        logging.error(f"Не удалось проиндексировать резюме {resume_file_path}: {str(e)}")
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(model).where(model.id == record_id).values(resume_text=text))
+        await db.commit()
+
+@app.get("/search", response_model=schemas.SearchResults)
+async def search_candidates(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = Query(None, description="applications,hh_candidates"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Поиск по заявкам и кандидатам HH (ФИО, должность, город, опыт, текст резюме, телефон).
+    Результаты отсортированы по релевантности.
+    """
+    type_list = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    return await search_service.search(db, q, type_list, limit, offset)
+
+@app.post("/search/reindex-resumes")
+async def reindex_resumes(
+    background_tasks: BackgroundTasks,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Извлекает текст резюме, которые еще не проиндексированы (только для администраторов)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут запускать индексацию резюме"
+        )
+    
+    queued = 0
+    for model in (models.Application, models.HHCandidate):
+        rows = (await db.execute(
+            select(model.id, model.resume_file_path)
+            .filter(model.resume_file_path.isnot(None), model.resume_text.is_(None))
+        )).all()
+        for record_id, resume_file_path in rows:
+            background_tasks.add_task(index_resume_text, model, record_id, resume_file_path)
+        queued += len(rows)
+    
+    return {"status": "success", "queued": queued}
+
+MERGE_SUGGESTION_STATUSES = {"pending", "merged", "dismissed"}
+# Предложения показывают ФИО и телефоны кандидатов - доступны только администраторам и рекрутерам
+MERGE_SUGGESTION_ROLES = {"admin", "recruiter"}
+
+def check_merge_suggestion_access(current_user: schemas.User):
+    if current_user.role not in MERGE_SUGGESTION_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Предложения объединить дубликаты доступны только администраторам и рекрутерам"
+        )
+
+async def load_merge_records(db: AsyncSession, suggestions) -> dict:
+    """Краткие данные записей из предложений объединения: по запросу на тип записи"""
+    ids_by_type = {}
+    for suggestion in suggestions:
+        ids_by_type.setdefault(suggestion.left_type, set()).add(suggestion.left_id)
+        ids_by_type.setdefault(suggestion.right_type, set()).add(suggestion.right_id)
+    
+    records = {}
+    for record_type, ids in ids_by_type.items():
+        model = dedup_service.RECORD_MODELS[record_type]
+        rows = (await db.execute(
+            select(model.id, model.full_name, model.phone, model.position, model.status, model.created_at)
+            .filter(model.id.in_(ids))
+        )).mappings().all()
+        for row in rows:
+            records[(record_type, row["id"])] = {"type": record_type, **row}
+    return records
+
+@app.get("/candidates/merge-suggestions")
+async def get_merge_suggestions(
+    suggestion_status: str = Query("pending", alias="status"),
+    min_score: float = 0,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Предложения объединить дубликаты кандидатов (заявки из бота и кандидаты HH), сильные первыми"""
+    check_merge_suggestion_access(current_user)
+    suggestions = (await db.execute(
+        select(models.CandidateMergeSuggestion)
+        .filter(
+            models.CandidateMergeSuggestion.status == suggestion_status,
+            models.CandidateMergeSuggestion.score >= min_score
+        )
+        .order_by(models.CandidateMergeSuggestion.score.desc(), models.CandidateMergeSuggestion.id)
+        .offset(offset)
+        .limit(limit)
+    )).scalars().all()
+    records = await load_merge_records(db, suggestions)
+    
+    return [
+        {
+            "id": suggestion.id,
+            "score": suggestion.score,
+            "reasons": suggestion.reasons,
+            "status": suggestion.status,
+            "created_at": suggestion.created_at,
+            "updated_at": suggestion.updated_at,
+            "left": records.get((suggestion.left_type, suggestion.left_id), {"type": suggestion.left_type, "id": suggestion.left_id}),
+            "right": records.get((suggestion.right_type, suggestion.right_id), {"type": suggestion.right_type, "id": suggestion.right_id}),
+        }
+        for suggestion in suggestions
+    ]
+
+@app.patch("/candidates/merge-suggestions/{suggestion_id}")
+async def update_merge_suggestion(
+    suggestion_id: int,
+    suggestion_update: schemas.MergeSuggestionUpdate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Отмечает предложение как объединенное или отклоненное (отклоненная пара больше не предлагается)"""
+    check_merge_suggestion_access(current_user)
+    if suggestion_update.status not in MERGE_SUGGESTION_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Недопустимый статус. Допустимые: {', '.join(sorted(MERGE_SUGGESTION_STATUSES))}"
+        )
+    
+    suggestion = await db.get(models.CandidateMergeSuggestion, suggestion_id)
+    if suggestion is None:
+        raise HTTPException(status_code=404, detail="Предложение не найдено")
+    
+    suggestion.status = suggestion_update.status
+    suggestion.resolved_by = current_user.id if suggestion_update.status != "pending" else None
+    await db.commit()
+    return {"id": suggestion.id, "status": suggestion.status}
+
+@app.post("/candidates/dedup/run")
+async def run_candidate_dedup(
+    background_tasks: BackgroundTasks,
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """Запускает полный пересчет дубликатов кандидатов вне расписания (только для администраторов)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут запускать поиск дубликатов"
+        )
+    
+    background_tasks.add_task(dedup_service.run_batch_exclusive)
+    return {"status": "started"}
         
 @app.post("/hh/parse-resume")
 async def parse_resume(
     resume: UploadFile = File(...),
     current_user: schemas.User = Depends(get_current_user)
 ):
-    """Парсит загруженное резюме и возвращает извлеченную информацию"""
+    """
+    Парсит загруженное резюме и возвращает извлеченную информацию.
+    Извлечение текста и поиск полей выполняются в пуле процессов, чтобы не блокировать event loop.
+    """
+    start_time = time.time()
+    print("\n=== Начало обработки файла ===")
+    print(f"Имя файла: {resume.filename}")
+    print(f"Тип файла: {resume.content_type}")
+    
+    file_type = resume.filename.split('.')[-1]
+    if file_type.lower() not in SUPPORTED_RESUME_EXTENSIONS:
+        print(f"Неподдерживаемый тип файла: {file_type}")
+        return JSONResponse(
+            status_code=400,
+            content={
+                "detail": f"Неподдерживаемый тип файла: {file_type}. Поддерживаются только PDF, DOC и DOCX."
+            }
+        )
+    
     try:
-        start_time = time.time()
-        print("\n=== Начало обработки файла ===")
-        print(f"Имя файла: {resume.filename}")
-        print(f"Тип файла: {resume.content_type}")
+        content = await read_upload_limited(resume)
+    except ResumeTooLarge as e:
+        return JSONResponse(status_code=413, content={"detail": str(e)})
+    
+    try:
+        # Сохраняем файл в папку resumes под именем по хэшу содержимого (одинаковые файлы хранятся один раз)
+        sha256, file_name = await save_resume(content, file_type)
+        save_path = f"resumes/{file_name}"
+        print(f"Резюме сохранено в: {save_path}")
         
-        # Сохраняем файл во временный файл
-        temp_file_path = ""
+        # Берем результат из кэша или парсим резюме в отдельном процессе
+        print("\n=== Извлечение текста из файла ===")
         try:
-            # Генерируем временный файл
-            temp_file_handle, temp_file_path = tempfile.mkstemp(suffix='.' + resume.filename.split('.')[-1])
-            os.close(temp_file_handle)
-            print(f"Создан временный файл: {temp_file_path}")
-            
-            # Сохраняем содержимое загруженного файла во временный файл
-            with open(temp_file_path, "wb") as temp_file:
-                temp_file.write(await resume.read())
-            print("Файл успешно сохранен во временный файл")
-                
-            # Создаем директорию для сохранения резюме, если она не существует
-            if not os.path.exists("resumes"):
-                os.makedirs("resumes")
-                
-            # Сохраняем резюме в постоянное хранилище с текущей датой
-            file_type = resume.filename.split('.')[-1]
-            # Очищаем имя файла от спецсимволов
-            clean_filename = os.path.basename(resume.filename)
-            
-            # Сохраняем файл в папку resumes
-            current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-            save_path = f"resumes\\{current_datetime}_{clean_filename}"
-            shutil.copy(temp_file_path, save_path)
-            print(f"Резюме сохранено в: {save_path}")
-            
-            # Парсим резюме и извлекаем текст
-            print("\n=== Извлечение текста из файла ===")
-            text = ""
-            try:
-                # Выбираем метод извлечения текста в зависимости от типа файла
-                if file_type.lower() in ["pdf"]:
-                    text = extract_text_from_pdf(temp_file_path)
-                elif file_type.lower() in ["doc", "docx"]:
-                    text = extract_text_from_doc(temp_file_path)
-                else:
-                    print(f"Неподдерживаемый тип файла: {file_type}")
-                    return JSONResponse(
-                        status_code=400,
-                        content={
-                            "detail": f"Неподдерживаемый тип файла: {file_type}. Поддерживаются только PDF, DOC и DOCX."
-                        }
-                    )
-            except Exception as e:
-                print(f"Ошибка при извлечении текста: {str(e)}")
-                return JSONResponse(
-                    status_code=400,
-                    content={"detail": f"Ошибка при извлечении текста: {str(e)}"}
-                )
-            
-            # Печатаем первые 500 символов текста для отладки
-            print("\nПервые 500 символов текста:")
-            print("=" * 50)
-            print(text[:500])
-            print("=" * 50)
-            
-            # Разбиваем текст на строки и убираем пустые
-            lines = text.split('\n')
-            non_empty_lines = [line.strip() for line in lines if line.strip()]
-            print(f"\nКоличество непустых строк: {len(non_empty_lines)}")
-            
-            # Поиск ФИО
-            print("\n=== Поиск ФИО ===")
-            names = []
-            print("Проверяем первые 15 строк:")
-            
-            # Сначала проверяем первую строку документа - часто содержит ФИО без маркеров
-            if non_empty_lines and len(non_empty_lines) > 0:
-                first_line = non_empty_lines[0].strip()
-                print(f"Проверка первой строки на ФИО: {first_line}")
-                
-                # Шаблон для имени: "Фамилия Имя Отчество"
-                name_pattern = r'^[А-Я][а-я]+\s+[А-Я][а-я]+(?:\s+[А-Я][а-я]+)?$'
-                if re.match(name_pattern, first_line):
-                    print(f"Найдено ФИО в первой строке: {first_line}")
-                    names.append((first_line, 0.95))  # Высокая вероятность, если имя в первой строке
-            
-            # Затем ищем с использованием маркеров
-            for i, line in enumerate(non_empty_lines[:15], 1):
-                print(f"Строка {i}: {line}")
-                
-                # Проверяем наличие маркеров
-                for marker in ['резюме', 'анкета', 'фио']:
-                    if marker in line.lower():
-                        print(f"Найден маркер '{marker}' в строке: {line}")
-                        cleaned_name = clean_full_name(line)
-                        if cleaned_name:
-                            names.append((cleaned_name, 0.9))
-            
-            # Выбираем наиболее вероятное имя
-            if names:
-                most_probable_name = max(names, key=lambda x: x[1])
-                print(f"Найдено наиболее вероятное ФИО: {most_probable_name[0]} (вероятность: {most_probable_name[1]})")
-            else:
-                print("ФИО не найдено в документе")
-            
-            # Поиск должности
-            print("\n=== Поиск должности ===")
-            positions = []
-            
-            for i, line in enumerate(non_empty_lines):
-                line_lower = line.lower()
-                
-                if 'желаемая должность' in line_lower:
-                    print(f"\nНайден маркер 'желаемая должность' в строке {i+1}:")
-                    print(f"Полная строка: {line}")
-                    # Извлекаем текст после маркера
-                    position_text = None
-                    
-                    # Проверяем, не содержит ли уже текущая строка должность
-                    marker_position = line_lower.find('желаемая должность')
-                    remaining_text = line[marker_position + len('желаемая должность'):].strip()
-                    unwanted_phrases = ['и зарплата', 'зарплата', 'занятость', 'график']
-                    
-                    if remaining_text and len(remaining_text) > 2 and not any(phrase in remaining_text.lower() for phrase in unwanted_phrases):
-                        position_text = remaining_text
-                        print(f"Извлеченный текст после маркера 'желаемая должность': '{position_text}'")
-                    
-                    # Если должность не найдена в текущей строке, проверяем следующую строку
-                    if not position_text and i + 1 < len(non_empty_lines):
-                        next_line = non_empty_lines[i + 1].strip()
-                        # Проверяем, что следующая строка не содержит нежелательные фразы
-                        if next_line and len(next_line) > 2 and not any(phrase in next_line.lower() for phrase in unwanted_phrases):
-                            print(f"Следующая строка (содержит должность): '{next_line}'")
-                            position_text = next_line
-                    
-                    if position_text:
-                        positions.append((position_text, 0.9))
-                
-                elif 'должность' in line_lower and 'желаемая' not in line_lower:
-                    print(f"\nНайден маркер 'должность' в строке {i+1}:")
-                    print(f"Полная строка: {line}")
-                    # Извлекаем текст после маркера
-                    marker_position = line_lower.find('должность')
-                    remaining_text = line[marker_position + len('должность'):].strip()
-                    # Проверяем, что оставшийся текст не содержит нежелательные фразы
-                    unwanted_phrases = ['и зарплата', 'зарплата', 'занятость', 'график']
-                    if remaining_text and len(remaining_text) > 2 and not any(phrase in remaining_text.lower() for phrase in unwanted_phrases):
-                        print(f"Извлеченный текст после маркера: '{remaining_text}'")
-                        positions.append((remaining_text, 0.7))
-                    elif i + 1 < len(non_empty_lines):
-                        next_line = non_empty_lines[i + 1].strip()
-                        # Проверяем, что следующая строка не содержит нежелательные фразы
-                        if next_line and len(next_line) > 2 and not any(phrase in next_line.lower() for phrase in unwanted_phrases):
-                            print(f"Следующая строка (содержит должность): '{next_line}'")
-                            positions.append((next_line, 0.9))
-            
-            if positions:
-                most_probable_position = max(positions, key=lambda x: x[1])
-                print(f"Итоговая найденная должность: {most_probable_position[0]} (вероятность: {most_probable_position[1]})")
-            else:
-                print("Должность не найдена")
-            
-            # Поиск даты рождения
-            print("\n=== Поиск даты рождения ===")
-            birth_date = extract_birth_date(text)
-            
-            # Поиск телефона
-            print("\n=== Поиск телефона ===")
-            phone = None
-            
-            # Проверяем первые 20 строк на наличие телефона
-            for i, line in enumerate(non_empty_lines[:20]):
-                if any(marker in line.lower() for marker in ['тел', 'моб', 'phone', '+', '998']):
-                    print(f"Найдена строка с возможным телефоном ({i+1}): {line}")
-                    # Очищаем телефон
-                    cleaned_phone = clean_phone(line)
-                    if cleaned_phone:
-                        phone = cleaned_phone
-                        print(f"Извлечен телефон: {phone}")
-                        break
-            
-            # Если телефон не найден, ищем числа похожие на телефон в первых 20 строках
-            if not phone:
-                for i, line in enumerate(non_empty_lines[:20]):
-                    if re.search(r'\d{3,}', line):
-                        print(f"Найдена строка с цифрами ({i+1}): {line}")
-                        cleaned_phone = clean_phone(line)
-                        if cleaned_phone:
-                            phone = cleaned_phone
-                            print(f"Извлечен телефон: {phone}")
-                            break
-            
-            # Поиск email
-            print("\n=== Поиск email ===")
-            email = None
-            # Стандартный шаблон для email
-            simple_email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-            # Шаблон для email с пробелами
-            spaced_email_pattern = r'[a-zA-Z0-9._%+-]+\s*@\s*[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-            
-            # Сначала ищем в первых 20 строках
-            for i, line in enumerate(non_empty_lines[:20]):
-                # Проверяем стандартный шаблон
-                email_matches = re.findall(simple_email_pattern, line)
-                if email_matches:
-                    email = email_matches[0]
-                    print(f"Найден email (стандартный шаблон): {email}")
-                    break
-                
-                # Проверяем шаблон с пробелами
-                spaced_matches = re.findall(spaced_email_pattern, line)
-                if spaced_matches:
-                    # Удаляем пробелы из найденного email
-                    email = re.sub(r'\s+', '', spaced_matches[0])
-                    print(f"Найден email с пробелами: {spaced_matches[0]}, очищенный: {email}")
-                    break
-            
-            # Если email не найден, ищем строки с маркерами email
-            if not email:
-                email_markers = ['email', 'e-mail', 'почта', 'электронная почта', 'электронный адрес']
-                for i, line in enumerate(non_empty_lines[:20]):
-                    line_lower = line.lower()
-                    if any(marker in line_lower for marker in email_markers):
-                        print(f"Найдена строка с маркером email ({i+1}): {line}")
-                        
-                        # Ищем стандартный email в этой строке
-                        email_matches = re.findall(simple_email_pattern, line)
-                        if email_matches:
-                            email = email_matches[0]
-                            print(f"Найден email после маркера: {email}")
-                            break
-                        
-                        # Ищем email с пробелами
-                        spaced_matches = re.findall(spaced_email_pattern, line)
-                        if spaced_matches:
-                            email = re.sub(r'\s+', '', spaced_matches[0])
-                            print(f"Найден email с пробелами после маркера: {email}")
-                            break
-                        
-                        # Проверяем следующую строку, если текущая строка только содержит маркер
-                        if i + 1 < len(non_empty_lines):
-                            next_line = non_empty_lines[i + 1]
-                            email_matches = re.findall(simple_email_pattern, next_line)
-                            if email_matches:
-                                email = email_matches[0]
-                                print(f"Найден email в следующей строке: {email}")
-                                break
-                            
-                            spaced_matches = re.findall(spaced_email_pattern, next_line)
-                            if spaced_matches:
-                                email = re.sub(r'\s+', '', spaced_matches[0])
-                                print(f"Найден email с пробелами в следующей строке: {email}")
-                                break
-            
-            # Поиск образования
-            print("\n=== Поиск образования ===")
-            education = extract_education(text)
-            print("Найдена информация об образовании:")
-            for entry in education:
-                for key, value in entry.items():
-                    print(f"  {key}: {value}")
-            
-            # Поиск опыта работы
-            print("\n=== Поиск опыта работы ===")
-            experience = extract_experience(text)
-            print("Найдена информация об опыте работы:")
-            for entry in experience:
-                for key, value in entry.items():
-                    print(f"  {key}: {value}")
-            
-            # Поиск навыков
-            print("\n=== Поиск навыков ===")
-            skills = extract_skills(text)
-            print("Найдена информация о навыках:")
-            for skill in skills:
-                print(f"  {skill}")
-            
-            # Поиск языков
-            print("\n=== Поиск языков ===")
-            languages = extract_languages(text)
-            print("Найдена информация о языках:")
-            for lang in languages:
-                print(f"  {lang['language']} — {lang['level']}")
-            
-            # Формируем и возвращаем результат
-            result = {
-                "full_name": names[0][0] if names else "Не распознано",
-                "birth_date": birth_date or "Не указана",
-                "phone": phone or "Не указан",
-                "position": positions[0][0] if positions else "Не распознана",
-                "resume_file_path": save_path,
-                # Дополнительные данные для отладки
-                "names": names,
-                "positions": positions,
-                "education": education,
-                "experience": experience,
-                "skills": skills,
-                "languages": languages,
-            }
-            
-            # Добавляем email, если найден
-            if email:
-                result["email"] = email
-                print(f"Email: {email}")
-            
-            # Добавляем метаданные для отладки
-            result["_metadata"] = {
-                "file_type": resume.content_type,
-                "original_filename": resume.filename,
-                "processing_time": time.time() - start_time,
-                "text_length": len(text),
-                "lines_count": len(non_empty_lines),
-            }
-            
-            # Удаляем временный файл
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-                print("Временный файл удален")
-            
-            return result
+            parsed = await get_parsed_resume(sha256, RESUME_DIR / file_name)
+        except ResumeParseTimeout as e:
+            return JSONResponse(status_code=504, content={"detail": str(e)})
+        except ResumeParserBusy as e:
+            return JSONResponse(status_code=503, content={"detail": str(e)})
+        except Exception as e:
+            print(f"Ошибка при извлечении текста: {str(e)}")
+            return JSONResponse(
+                status_code=400,
+                content={"detail": f"Ошибка при извлечении текста: {str(e)}"}
+            )
         
-        finally:
-            # Удаляем временный файл, если он существует
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+        text = parsed.pop("text")
+        email = parsed.pop("email", None)
+        lines_count = parsed.pop("lines_count", None)
+        cached = parsed.pop("cached")
+        
+        # Формируем и возвращаем результат
+        result = {
+            **parsed,
+            "resume_file_path": save_path,
+        }
+        
+        # Добавляем email, если найден
+        if email:
+            result["email"] = email
+            print(f"Email: {email}")
+        
+        # Добавляем метаданные для отладки
+        result["_metadata"] = {
+            "file_type": resume.content_type,
+            "original_filename": resume.filename,
+            "processing_time": time.time() - start_time,
+            "text_length": len(text),
+            "lines_count": lines_count,
+            "sha256": sha256,
+            "cached": cached,
+        }
+        
+        return result
                 
     except Exception as e:
         print(f"Ошибка при обработке файла: {str(e)}")
@@ -962,471 +1169,341 @@ async def parse_resume(
             content={"detail": f"Ошибка при обработке файла: {str(e)}"}
         )
 
-@app.get("/hh-candidates/")
-async def get_hh_candidates(
-    position: Optional[str] = None,
-    start_date: Optional[datetime] = None, # Добавляем параметр start_date
-    end_date: Optional[datetime] = None,   # Добавляем параметр end_date
-    current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    query = db.query(models.HHCandidate).order_by(models.HHCandidate.created_at.desc())
-    
-    # Фильтрация по должности
-    if position:
-        # Используем ILIKE для регистронезависимого поиска с частичным совпадением
-        query = query.filter(models.HHCandidate.position.ilike(f"%{position}%"))
-    
-    # Фильтрация по дате создания
-    if start_date:
-        query = query.filter(models.HHCandidate.created_at >= start_date)
-    if end_date:
-        # Добавляем +1 день к end_date для включения всего дня
-        # end_date_inclusive = end_date + timedelta(days=1)
-        # query = query.filter(models.HHCandidate.created_at < end_date_inclusive)
-        # Используем <= для включения последнего дня
-        query = query.filter(models.HHCandidate.created_at <= end_date)
-    
-    candidates = query.all()
-    
-    for candidate in candidates:
-        # Получаем историю статусов для каждого кандидата
-        candidate.status_history = (
-            db.query(models.HHStatusHistory)
-            .filter(models.HHStatusHistory.candidate_id == candidate.id)
-            .order_by(models.HHStatusHistory.created_at.desc())
-            .all()
-        )
-
-    return candidates
-
-@app.put("/hh-candidates/{candidate_id}/status", response_model=schemas.HHCandidate)
-async def update_hh_candidate_status(
-    candidate_id: int,
-    status_update: schemas.StatusUpdate,
-    current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    try:
-        candidate = db.query(models.HHCandidate).filter(models.HHCandidate.id == candidate_id).first()
-        if not candidate:
-            raise HTTPException(status_code=404, detail="Кандидат не найден")
-
-        # Обновляем статус кандидата
-        candidate.status = status_update.status
-
-        # Создаем запись в истории статусов
-        status_history = models.HHStatusHistory(
-            candidate_id=candidate_id,
-            status=status_update.status,
-            comment=status_update.comment,
-            created_by=current_user.full_name
-        )
-        db.add(status_history)
-        db.commit()
-        db.refresh(candidate)
-        
-        return candidate
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=str(e))
-
-def is_name_word(word):
-    # Проверяем, что слово начинается с заглавной буквы и содержит только буквы
-    return (len(word) > 1 and 
-            word[0].isupper() and 
-            any(c.islower() for c in word[1:]) and
-            all(c.isalpha() or c.isspace() for c in word))
-
-def name_probability(text):
-    # Увеличиваем вероятность, если текст похож на полное имя
-    words = text.strip().split()
-    if not words:
-        return 0.0
-    
-    # Проверяем каждое слово на соответствие формату имени
-    valid_words = [w for w in words if is_name_word(w)]
-    
-    probability = 0.0
-    if len(valid_words) >= 2:  # Имя и Фамилия минимум
-        probability = 0.5
-    if len(valid_words) >= 3:  # Полное имя
-        probability = 0.8
-    
-    # Дополнительные проверки
-    if any(marker in text.lower() for marker in ['резюме', 'анкета', 'фио']):
-        probability += 0.1
-    
-    return min(1.0, probability)
+def unpack_resume_zip(content: bytes, max_files: int, unpacked_budget: dict) -> List[tuple]:
+    """
+    Достает резюме из zip-архива и сразу сохраняет их в хранилище резюме:
+    [(имя файла, (sha256, имя файла в RESUME_DIR) или None, если файл слишком большой)].
+    Пропускает папки, служебные файлы macOS и неподдерживаемые форматы. В памяти держится
+    не больше одного файла; размер считается по фактически распакованным байтам (заявленному
+    в архиве верить нельзя), их сумма ограничена unpacked_budget["left"] - защита от zip-бомб.
+    """
+    files = []
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or info.filename.startswith("__MACOSX/") or name.startswith("."):
+                continue
+            extension = name.rsplit('.', 1)[-1].lower()
+            if extension not in SUPPORTED_RESUME_EXTENSIONS:
+                continue
+            if len(files) >= max_files:
+                raise HTTPException(status_code=400, detail=f"В архиве больше {max_files} резюме")
+            if info.file_size > RESUME_MAX_FILE_SIZE:
+                files.append((name, None))
+                continue
+            with archive.open(info) as member:
+                member_content = member.read(RESUME_MAX_FILE_SIZE + 1)
+            unpacked_budget["left"] -= len(member_content)
+            if unpacked_budget["left"] < 0:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Распакованные резюме больше {RESUME_BATCH_MAX_UNPACKED_SIZE // (1024 * 1024)} МБ"
+                )
+            if len(member_content) > RESUME_MAX_FILE_SIZE:
+                files.append((name, None))
+                continue
+            files.append((name, store_resume_content(member_content, extension)))
+    return files
 
-def clean_full_name(text):
-    if not text or not isinstance(text, str):
-        return None
-    
-    # Список маркеров, которые нужно удалить
-    markers = ['резюме обновлено', 'резюме', 'анкета', 'фио', '•']
-    
-    # Преобразуем текст в нижний регистр для поиска маркеров
-    lower_text = text.lower()
-    
-    # Очищаем от маркеров
-    for marker in markers:
-        if marker in lower_text:
-            # Найдем индекс маркера в исходном тексте (с учетом регистра)
-            marker_index = lower_text.find(marker)
-            marker_length = len(marker)
-            
-            # Получаем текст после маркера
-            text = text[marker_index + marker_length:].strip()
-            lower_text = text.lower()  # Обновляем и нижний регистр
-    
-    # Удаление дат и времени (например, "13 января 2025 в 21:17")
-    text = re.sub(r'\d{1,2}\s+[а-я]+\s+\d{4}(?:\s+в\s+\d{1,2}:\d{2})?', '', text, flags=re.IGNORECASE).strip()
-    
-    # Ищем в тексте шаблон имени "Имя Отчество Фамилия" или "Фамилия Имя Отчество"
-    name_pattern = r'([А-Я][а-я]+(?:-[А-Я][а-я]+)?\s+[А-Я][а-я]+(?:-[А-Я][а-я]+)?\s+[А-Я][а-я]+(?:-[А-Я][а-я]+)?)'
-    name_match = re.search(name_pattern, text)
-    
-    if name_match:
-        return name_match.group(1)
-    
-    # Если имя не найдено по шаблону, проверяем, содержит ли текст только имя (без лишних символов)
-    # Удаляем все цифры, знаки препинания и лишние пробелы
-    cleaned_text = re.sub(r'[0-9.,;:!?()"\']', '', text).strip()
-    words = cleaned_text.split()
-    
-    # Проверяем, что все слова начинаются с заглавной буквы (как имена)
-    if 2 <= len(words) <= 3 and all(word[0].isupper() for word in words if word):
-        return ' '.join(words)
+async def collect_batch_resumes(uploads: List[UploadFile]) -> List[dict]:
+    """
+    Сохраняет загруженные файлы и содержимое zip-архивов в хранилище резюме по мере чтения
+    (до начала потоковой выдачи: после ответа загруженные файлы закрываются).
+    Возвращает список резюме для разбора - только имена файлов, без содержимого.
+    """
+    items = []
+    unpacked_budget = {"left": RESUME_BATCH_MAX_UNPACKED_SIZE}
+    
+    def add_item(filename, stored=None, error=None):
+        if len(items) >= RESUME_BATCH_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"Можно загрузить не больше {RESUME_BATCH_MAX_FILES} резюме за раз")
+        item = {"index": len(items), "filename": filename}
+        if error:
+            item["error"] = error
+        else:
+            item["sha256"], item["file_name"] = stored
+        items.append(item)
     
-    return None
+    too_large = f"Файл больше {RESUME_MAX_FILE_SIZE // (1024 * 1024)} МБ"
+    for upload in uploads:
+        extension = upload.filename.rsplit('.', 1)[-1].lower()
+        if extension == "zip":
+            try:
+                content = await read_upload_limited(upload, RESUME_BATCH_MAX_ZIP_SIZE)
+                members = await run_in_threadpool(unpack_resume_zip, content, RESUME_BATCH_MAX_FILES, unpacked_budget)
+            except ResumeTooLarge as e:
+                raise HTTPException(status_code=413, detail=f"{upload.filename}: {str(e)}")
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"{upload.filename}: повреждённый zip-архив")
+            del content
+            for name, stored in members:
+                add_item(f"{upload.filename}/{name}", stored, None if stored else too_large)
+        elif extension in SUPPORTED_RESUME_EXTENSIONS:
+            try:
+                content = await read_upload_limited(upload)
+            except ResumeTooLarge:
+                add_item(upload.filename, error=too_large)
+                continue
+            add_item(upload.filename, await save_resume(content, extension))
+        else:
+            add_item(upload.filename, error=f"Неподдерживаемый тип файла: {extension}. Поддерживаются только PDF, DOC и DOCX.")
+    return items
 
-def extract_birth_date(text):
-    """Извлекает дату рождения из текста резюме"""
-    if not text:
-        return None
+async def parse_batch_item(item: dict, semaphore: asyncio.Semaphore) -> dict:
+    if item.get("error"):
+        return item
+    async with semaphore:
+        try:
+            item["parsed"] = await get_parsed_resume(item["sha256"], RESUME_DIR / item["file_name"])
+        except ResumeParseError as e:
+            item["error"] = str(e)
+        except Exception as e:
+            item["error"] = f"Ошибка при извлечении текста: {str(e)}"
+    return item
+
+@app.post("/hh/parse-resumes/batch")
+async def parse_resumes_batch(
+    files: List[UploadFile] = File(...),
+    create_candidates: bool = Form(True),
+    status: str = Form("новый"),
+    comment: str = Form("Пакетный импорт резюме"),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Пакетный разбор и импорт резюме: несколько файлов и/или zip-архивы.
     
-    print("Начинаем поиск даты рождения...")
-    
-    # Преобразуем текст в список строк
-    lines = text.split('\n')
-    candidate_date = None
-    
-    # Список ключевых слов для поиска даты рождения
-    birth_keywords = ['родился', 'родилась', 'дата рождения', 'год рождения', 'день рождения']
-    month_names = {
-        'января': '01', 'февраля': '02', 'марта': '03', 'апреля': '04',
-        'мая': '05', 'июня': '06', 'июля': '07', 'августа': '08',
-        'сентября': '09', 'октября': '10', 'ноября': '11', 'декабря': '12',
-        'янв': '01', 'фев': '02', 'мар': '03', 'апр': '04',
-        'май': '05', 'июн': '06', 'июл': '07', 'авг': '08',
-        'сен': '09', 'окт': '10', 'ноя': '11', 'дек': '12'
-    }
+    Файлы разбираются параллельно в пуле процессов (одинаковые файлы - один раз, из кэша),
+    каждый результат сверяется с существующими кандидатами HH по ФИО и телефону.
+    Ответ - NDJSON: по строке на файл по мере готовности и итоговая строка "summary".
+    """
+    items = await collect_batch_resumes(files)
+    created_by = current_user.full_name
     
-    # Шаг 1: Сначала ищем строки, содержащие ключевые слова
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Проверяем наличие ключевых слов
-        line_lower = line.lower()
-        if any(keyword in line_lower for keyword in birth_keywords):
-            print(f"Найдена строка с возможной датой рождения (строка {i+1}): {line}")
-            
-            # Расширенные паттерны для различных форматов дат
-            patterns = [
-                # "родился 3 марта 1998" или "родилась 29 сентября 1892"
-                r'род(?:ился|илась)[^\d]*(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})',
-                
-                # "родился 03.03.1998"
-                r'род(?:ился|илась)[^\d]*(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
-                
-                # Извлечение возраста и даты из формата "Мужчина, 30 лет, родился 1 января 1990"
-                r'(?:.*?,\s*\d+\s*(?:год|лет|года)[^\d]*)[^\d]*род(?:ился|илась)[^\d]*(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})',
+    async def results():
+        start_time = time.time()
+        summary = {"type": "summary", "total": len(items), "created": 0, "duplicates": 0, "parsed": 0, "errors": 0}
+        # Не занимаем больше процессов, чем есть в пуле, чтобы не упереться в лимит очереди
+        semaphore = asyncio.Semaphore(resume_parser_pool.max_workers)
+        tasks = [asyncio.create_task(parse_batch_item(item, semaphore)) for item in items]
+        seen_keys = {}
+        created_ids = []
+        
+        try:
+            for finished in asyncio.as_completed(tasks):
+                item = await finished
+                line = {"type": "file", "index": item["index"], "filename": item["filename"]}
                 
-                # "дата рождения: 03.03.1998"
-                r'(?:дата|день|год)\s+рождения[\s:]+(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
+                if item.get("error"):
+                    line.update({"status": "error", "error": item["error"]})
+                    summary["errors"] += 1
+                    yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+                    continue
                 
-                # "дата рождения: 3 марта 1998"
-                r'(?:дата|день|год)\s+рождения[\s:]+(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})',
+                parsed = item["parsed"]
+                full_name = parsed.get("full_name")
+                if full_name == "Не распознано":
+                    full_name = None
+                phone_digits = normalize_phone(parsed.get("phone") or "")
+                line.update({
+                    "sha256": item["sha256"],
+                    "resume_file_path": f"resumes/{item['file_name']}",
+                    "cached": parsed.get("cached", False),
+                    "full_name": full_name,
+                    "phone": phone_digits or None,
+                    "position": parsed.get("position"),
+                    "birth_date": parsed.get("birth_date"),
+                })
                 
-                # Общий формат "DD.MM.YYYY" или "DD/MM/YYYY" после ключевых слов
-                r'[^\d]*(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
+                # Дубликат - как и при одиночном импорте, совпадение и ФИО, и телефона;
+                # внутри пакета (одно и то же резюме в разных файлах) - по той же паре ключей
+                duplicate_key = hh_duplicate_key(full_name, phone_digits)
+                batch_duplicate = seen_keys.get(duplicate_key) if duplicate_key else None
                 
-                # Формат "DD месяц YYYY" после ключевых слов
-                r'[^\d]*(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    print(f"Паттерн '{pattern}' сработал!")
-                    if len(match.groups()) == 3:
-                        day, month, year = match.groups()
-                        print(f"Извлечено: день={day}, месяц={month}, год={year}")
-                        
-                        # Если месяц - слово, преобразуем его в число
-                        if not month.isdigit():
-                            month_lower = month.lower()
-                            if month_lower in month_names:
-                                month = month_names[month_lower]
-                                print(f"Преобразовали месяц '{month_lower}' в '{month}'")
-                            else:
-                                print(f"Неизвестный месяц: '{month}'")
-                                # Если месяц не распознан, продолжаем поиск
-                                continue
-                        
-                        # Нормализуем день и месяц (добавляем ведущий ноль)
-                        day = day.zfill(2)
-                        month = month.zfill(2)
-                        
-                        # Проверяем валидность даты
-                        try:
-                            # Создаем объект datetime для проверки
-                            date_obj = datetime(int(year), int(month), int(day))
-                            
-                            # Проверяем, что год рождения реалистичен (между 1900 и текущим годом)
-                            current_year = datetime.now().year
-                            if 1900 <= int(year) <= current_year:
-                                print(f"Найдена дата рождения: {day}.{month}.{year}")
-                                return f"{day}.{month}.{year}"
-                        except ValueError:
-                            # Невалидная дата, продолжаем поиск
-                            continue
-    
-    # Шаг 2: Если не нашли по ключевым словам, ищем даты во всех строках
-    print("Поиск дат рождения во всех строках...")
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Те же паттерны, что и выше, но без привязки к ключевым словам о рождении
-        date_patterns = [
-            r'(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
-            r'(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                print(f"Найдена потенциальная дата в строке {i+1}: {line}")
-                if len(match.groups()) == 3:
-                    day, month, year = match.groups()
-                    print(f"Извлечено: день={day}, месяц={month}, год={year}")
-                    
-                    # Преобразование месяца-слова в число, если необходимо
-                    if not month.isdigit():
-                        month_lower = month.lower()
-                        if month_lower in month_names:
-                            month = month_names[month_lower]
-                        else:
-                            continue
+                async with AsyncSessionLocal() as db:
+                    existing = None
+                    if duplicate_key and not batch_duplicate:
+                        existing = await find_hh_duplicate(db, full_name, phone_digits)
                     
-                    day = day.zfill(2)
-                    month = month.zfill(2)
-                    
-                    try:
-                        date_obj = datetime(int(year), int(month), int(day))
-                        current_year = datetime.now().year
-                        
-                        # Для дат без контекста быть строже - очень вероятно, что это не дата рождения
-                        if 1940 <= int(year) <= current_year - 18:  # Предполагаем, что кандидату не меньше 18 лет
-                            print(f"Найдена потенциальная дата рождения: {day}.{month}.{year}")
-                            candidate_date = f"{day}.{month}.{year}"
-                    except ValueError:
-                        continue
-    
-    return candidate_date
-
-def clean_phone(text):
-    """Очищает и форматирует телефонный номер"""
-    if not text:
-        return None
-    
-    # Проверяем, что строка не содержит нежелательные тексты
-    unwanted_texts = ['желательное время', 'не имеет значения', 'занятость', 'опыт работы']
-    for unwanted in unwanted_texts:
-        if unwanted.lower() in text.lower():
-            return None
-    
-    # Шаблоны для поиска номеров телефонов
-    phone_patterns = [
-        r'\+?\d{1,3}\s?\(?\d{2,3}\)?\s?\d{3}[\s-]?\d{2}[\s-]?\d{2}',  # +998 (99) 999-99-99 или 998 99 999 99 99
-        r'\d{2,3}[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}',  # 99 999 99 99
-        r'\+?\d{10,12}'  # +998999999999 или 998999999999
-    ]
-    
-    # Ищем телефоны по шаблонам
-    for pattern in phone_patterns:
-        matches = re.findall(pattern, text)
-        if matches:
-            # Берем первое совпадение
-            phone = matches[0]
-            
-            # Удаляем все нецифровые символы, кроме '+'
-            cleaned = ''.join(c for c in phone if c.isdigit() or c == '+')
-            
-            # Проверяем длину номера после очистки
-            if len(cleaned) >= 9:  # Минимальная длина для номера
-                # Форматируем номер в стандартный вид
-                if cleaned.startswith('+'):
-                    # Уже есть префикс
-                    pass
-                elif len(cleaned) >= 12:
-                    # Добавляем префикс '+' к длинному номеру
-                    cleaned = '+' + cleaned
-                elif len(cleaned) >= 9 and len(cleaned) <= 11:
-                    # Это вероятно номер без кода страны, добавляем +998
-                    cleaned = '+998' + cleaned[-9:]
+                    if existing or batch_duplicate:
+                        duplicate_id = existing.id if existing else batch_duplicate
+                        line.update({"status": "duplicate", "candidate_id": duplicate_id})
+                        summary["duplicates"] += 1
+                    elif create_candidates and full_name and phone_digits:
+                        candidate = models.HHCandidate(
+                            full_name=normalize_full_name(full_name),
+                            birth_date=parsed.get("birth_date"),
+                            phone=phone_digits,
+                            position=parsed.get("position"),
+                            resume_file_path=f"resumes/{item['file_name']}",
+                            resume_text=parsed.get("text"),
+                            status=status
+                        )
+                        db.add(candidate)
+                        await db.flush()
+                        db.add(models.HHStatusHistory(
+                            candidate_id=candidate.id,
+                            status=status,
+                            comment=comment,
+                            created_by=created_by
+                        ))
+                        await analytics.record_status_change(db, "hh", status)
+                        await db.commit()
+                        line.update({"status": "created", "candidate_id": candidate.id})
+                        summary["created"] += 1
+                        created_ids.append(candidate.id)
+                        duplicate_id = candidate.id
+                    else:
+                        # ФИО или телефон не распознаны - кандидата нужно проверить и создать вручную
+                        line["status"] = "parsed"
+                        summary["parsed"] += 1
+                        duplicate_id = None
                 
-                # Проверяем, что номер начинается с +998 (Узбекистан) или другого валидного префикса
-                # Если номер не начинается с +, добавим +
-                if not cleaned.startswith('+'):
-                    cleaned = '+' + cleaned
+                if duplicate_id and duplicate_key:
+                    seen_keys[duplicate_key] = duplicate_id
                 
-                # Форматируем номер для удобочитаемости (если это номер Узбекистана)
-                if cleaned.startswith('+998') and len(cleaned) >= 12:
-                    formatted = f"+998 ({cleaned[4:6]}) {cleaned[6:9]}-{cleaned[9:11]}-{cleaned[11:13]}"
-                    return formatted
-                
-                return cleaned
-    
-    return None
-
-def extract_education(text):
-    """Извлекает информацию об образовании"""
-    education_data = []
-    education_markers = ['образование', 'учебное заведение', 'университет', 'институт', 'колледж']
-    
-    current_entry = {}
-    for line in text.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Ищем год
-        year_match = re.search(r'\b(19|20)\d{2}\b', line)
+                yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        finally:
+            # Клиент оборвал соединение - отменяем оставшийся разбор
+            for task in tasks:
+                task.cancel()
         
-        # Ищем учебное заведение
-        is_education_line = any(marker.lower() in line.lower() for marker in education_markers)
+        # Созданных кандидатов сверяем с заявками из бота и другими кандидатами HH
+        for candidate_id in created_ids:
+            await dedup_service.check_record("hh_candidate", candidate_id)
         
-        if year_match or is_education_line:
-            if current_entry and (year_match or is_education_line):
-                education_data.append(current_entry.copy())
-                current_entry = {}
-            
-            if year_match:
-                current_entry['year'] = year_match.group(0)
-            
-            # Очищаем строку от года для извлечения названия
-            institution = re.sub(r'\b(19|20)\d{2}\b', '', line).strip()
-            if institution and is_education_line:
-                current_entry['institution'] = institution
+        summary["processing_time"] = time.time() - start_time
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
     
-    if current_entry:
-        education_data.append(current_entry)
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+# Размер пачки id кандидатов при загрузке истории статусов
+HH_HISTORY_BATCH_SIZE = 1000
+
+async def load_hh_status_history(db: AsyncSession, candidates: list, latest: Optional[int] = None):
+    """
+    Загружает историю статусов для списка кандидатов пачками, а не отдельным запросом на каждого.
+    latest - сколько последних записей оставить на кандидата (оконная функция row_number).
+    """
+    history_by_candidate = defaultdict(list)
+    candidate_ids = [candidate.id for candidate in candidates]
+    
+    for i in range(0, len(candidate_ids), HH_HISTORY_BATCH_SIZE):
+        chunk = candidate_ids[i:i + HH_HISTORY_BATCH_SIZE]
+        if latest is None:
+            history_query = (
+                select(models.HHStatusHistory)
+                .filter(models.HHStatusHistory.candidate_id.in_(chunk))
+                .order_by(models.HHStatusHistory.candidate_id, models.HHStatusHistory.created_at.desc(), models.HHStatusHistory.id.desc())
+            )
+        else:
+            row_number = func.row_number().over(
+                partition_by=models.HHStatusHistory.candidate_id,
+                order_by=(models.HHStatusHistory.created_at.desc(), models.HHStatusHistory.id.desc())
+            ).label("row_number")
+            ranked = (
+                select(models.HHStatusHistory, row_number)
+                .filter(models.HHStatusHistory.candidate_id.in_(chunk))
+                .subquery()
+            )
+            history_alias = aliased(models.HHStatusHistory, ranked)
+            history_query = (
+                select(history_alias)
+                .filter(ranked.c.row_number <= latest)
+                .order_by(ranked.c.candidate_id, ranked.c.row_number)
+            )
+        
+        for entry in (await db.execute(history_query)).scalars().all():
+            history_by_candidate[entry.candidate_id].append(entry)
     
-    return education_data
+    for candidate in candidates:
+        # Записываем историю как уже загруженную, без ленивой подгрузки старого значения
+        set_committed_value(candidate, 'status_history', history_by_candidate.get(candidate.id, []))
 
-def extract_experience(text):
-    experience_data = []
-    experience_started = False
-    current_entry = {}
+@app.get("/hh-candidates/")
+async def get_hh_candidates(
+    response: Response,
+    position: Optional[str] = None,
+    start_date: Optional[datetime] = None, # Добавляем параметр start_date
+    end_date: Optional[datetime] = None,   # Добавляем параметр end_date
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Размер страницы; без параметра - все кандидаты"),
+    cursor: Optional[str] = None,
+    history_limit: Optional[int] = Query(None, ge=0, description="Сколько последних записей истории статусов вернуть"),
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Список кандидатов HH, новые сверху.
+    
+    Пагинация по курсору: при заданном limit курсор следующей страницы возвращается
+    в заголовке X-Next-Cursor, его нужно передать в параметре cursor.
+    """
+    query = select(models.HHCandidate)
+    
+    # Фильтрация по должности
+    if position:
+        # Используем ILIKE для регистронезависимого поиска с частичным совпадением
+        query = query.filter(models.HHCandidate.position.ilike(f"%{position}%"))
     
-    for line in text.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-            
-        if 'опыт работы' in line.lower():
-            experience_started = True
-            # Извлекаем общий стаж
-            match = re.search(r'(\d+)\s*(?:год|лет|года).*?(\d+)\s*(?:месяц|месяца|месяцев)?', line)
-            if match:
-                years, months = match.groups()
-                current_entry['total_experience'] = f"{years} лет {months} месяцев"
-            continue
-            
-        if experience_started:
-            if 'образование' in line.lower() or 'навыки' in line.lower():
-                break
-                
-            # Ищем даты
-            date_match = re.search(r'([А-Яа-я]+\s+\d{4})\s*[—–-]\s*([А-Яа-я]+\s+\d{4}|настоящее время)', line)
-            if date_match:
-                if current_entry:
-                    experience_data.append(current_entry)
-                current_entry = {'period': f"{date_match.group(1)} - {date_match.group(2)}"}
-                
-            # Ищем компанию
-            if 'ооо' in line.lower() or 'компания' in line.lower() or 'фирма' in line.lower():
-                current_entry['company'] = line
-                
-            # Ищем должность
-            if any(pos in line.lower() for pos in ['менеджер', 'специалист', 'руководитель', 'директор']):
-                current_entry['position'] = line
-                
-    if current_entry:
-        experience_data.append(current_entry)
-        
-    return experience_data
-
-def extract_skills(text):
-    # Implementation of extract_skills function
-    # This function should return a list of skills extracted from the text
-    # For now, we'll return an empty list
-    return []
-
-def extract_languages(text):
-    """Извлекает информацию о языках"""
-    languages = []
-    language_markers = ['язык', 'languages', 'владение языками']
-    language_levels = {
-        'a1': 'начальный',
-        'a2': 'элементарный',
-        'b1': 'средний',
-        'b2': 'выше среднего',
-        'c1': 'продвинутый',
-        'c2': 'в совершенстве',
-        'native': 'родной',
-        'свободно': 'в совершенстве'
-    }
+    # Фильтрация по дате создания
+    if start_date:
+        query = query.filter(models.HHCandidate.created_at >= start_date)
+    if end_date:
+        # Добавляем +1 день к end_date для включения всего дня
+        # end_date_inclusive = end_date + timedelta(days=1)
+        # query = query.filter(models.HHCandidate.created_at < end_date_inclusive)
+        # Используем <= для включения последнего дня
+        query = query.filter(models.HHCandidate.created_at <= end_date)
     
-    in_language_section = False
-    seen_languages = set()
+    query = apply_keyset(query, models.HHCandidate.created_at, models.HHCandidate.id, cursor)
+    if limit:
+        query = query.limit(limit)
     
-    for line in text.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Определяем начало секции языков
-        if any(marker.lower() in line.lower() for marker in language_markers):
-            in_language_section = True
-            continue
-            
-        if in_language_section:
-            # Проверяем, не начался ли новый раздел
-            if any(marker in line.lower() for marker in ['опыт работы', 'образование', 'навыки']):
-                break
-                
-            # Извлекаем язык и уровень
-            parts = line.split('—')
-            if len(parts) >= 2:
-                language = parts[0].strip()
-                level = parts[-1].strip()
-                
-                # Проверяем, не видели ли мы уже этот язык
-                if language.lower() not in seen_languages:
-                    seen_languages.add(language.lower())
-                    languages.append({
-                        'language': language,
-                        'level': level
-                    })
+    candidates = (await db.execute(query)).scalars().all()
+    await load_hh_status_history(db, candidates, history_limit)
     
-    return languages
+    if limit:
+        cursor_value = next_cursor(candidates, limit)
+        if cursor_value:
+            response.headers[NEXT_CURSOR_HEADER] = cursor_value
+
+    return candidates
+
+@app.put("/hh-candidates/{candidate_id}/status", response_model=schemas.HHCandidate)
+async def update_hh_candidate_status(
+    candidate_id: int,
+    status_update: schemas.StatusUpdate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        candidate = await db.get(models.HHCandidate, candidate_id)
+        if not candidate:
+            raise HTTPException(status_code=404, detail="Кандидат не найден")
+
+        # Обновляем статус кандидата
+        candidate.status = status_update.status
+
+        # Создаем запись в истории статусов
+        status_history = models.HHStatusHistory(
+            candidate_id=candidate_id,
+            status=status_update.status,
+            comment=status_update.comment,
+            created_by=current_user.full_name
+        )
+        db.add(status_history)
+        await analytics.record_status_change(db, "hh", status_update.status)
+        await db.commit()
+        
+        result = await db.execute(
+            select(models.HHCandidate)
+            .options(selectinload(models.HHCandidate.status_history))
+            .filter(models.HHCandidate.id == candidate_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
 
 def normalize_phone(phone: str) -> str:
     """Нормализует телефонный номер, оставляя только цифры"""
@@ -1436,33 +1513,65 @@ def normalize_full_name(full_name: str) -> str:
     """Нормализует полное имя (убирает лишние пробелы)"""
     return ' '.join(full_name.split())
 
+# Максимум кандидатов в одном запросе пакетной проверки (страница поиска HH - до 100 карточек)
+HH_CHECK_BATCH_MAX_ITEMS = 200
+
+def hh_candidate_brief(candidate: models.HHCandidate) -> dict:
+    return {
+        "id": candidate.id,
+        "full_name": candidate.full_name,
+        "position": candidate.position,
+        "status": candidate.status,
+        "created_at": candidate.created_at.isoformat() if candidate.created_at else None
+    }
+
+def hh_duplicate_key(full_name: Optional[str], phone: Optional[str]) -> Optional[tuple]:
+    """
+    Ключ дубликата (name_key, телефон E.164); если номер не приводится к E.164 (слишком короткий,
+    необычный формат) - (name_key, цифры номера). None, если ФИО или телефон не распознаны
+    """
+    key = name_key(full_name)
+    digits = normalize_phone(phone or "")
+    if not key or not digits:
+        return None
+    return key, normalize_phone_e164(digits) or digits
+
+async def find_hh_duplicate(db: AsyncSession, full_name: str, phone: Optional[str]) -> Optional[models.HHCandidate]:
+    """
+    Ищет кандидата HH с тем же ФИО (name_key) и телефоном (E.164) по индексу
+    ix_hh_candidates_name_key_phone. Номер, который не приводится к E.164, сравнивается
+    по цифрам (phone LIKE, как раньше) среди кандидатов с тем же name_key
+    """
+    duplicate_key = hh_duplicate_key(full_name, phone)
+    if duplicate_key is None:
+        return None
+    key, phone_key = duplicate_key
+    if normalize_phone_e164(phone):
+        phone_condition = models.HHCandidate.phone_normalized == phone_key
+    else:
+        phone_condition = models.HHCandidate.phone.like(f"%{phone_key}%")
+    result = await db.execute(
+        select(models.HHCandidate)
+        .filter(models.HHCandidate.name_key == key, phone_condition)
+        .order_by(models.HHCandidate.id)
+        .limit(1)
+    )
+    return result.scalars().first()
+
 @app.get("/api/hh/candidates/check")
-async def check_hh_candidate(full_name: str, phone: str, db: Session = Depends(get_db)):
+async def check_hh_candidate(full_name: str, phone: str, db: AsyncSession = Depends(get_async_db)):
     """Проверяет, существует ли кандидат с такими же full_name и phone"""
     try:
-        # Нормализуем входные данные
-        clean_phone = normalize_phone(phone)
-        normalized_name = normalize_full_name(full_name)
-        
-        logging.info(f"Проверка существования кандидата: {normalized_name} ({clean_phone})")
+        logging.info(f"Проверка существования кандидата: {normalize_full_name(full_name)} ({normalize_phone(phone)})")
         
         # Ищем кандидата в базе
-        candidate = db.query(models.HHCandidate).filter(
-            models.HHCandidate.full_name == normalized_name,
-            models.HHCandidate.phone.like(f"%{clean_phone}%")
-        ).first()
+        candidate = await find_hh_duplicate(db, full_name, phone)
         
         if candidate:
             logging.info(f"Найден существующий кандидат: ID={candidate.id}")
             return {
                 "exists": True,
-                "candidate": {
-                    "id": candidate.id,
-                    "full_name": candidate.full_name,
-                    "position": candidate.position,
-                    "status": candidate.status,
-                    "created_at": candidate.created_at.isoformat()
-                }
+                "candidate": hh_candidate_brief(candidate)
             }
         
         logging.info("Кандидат не найден в базе")
@@ -1475,6 +1584,72 @@ async def check_hh_candidate(full_name: str, phone: str, db: Session = Depends(g
             detail="Ошибка при проверке существования кандидата"
         )
 
+@app.post("/api/hh/candidates/check-batch")
+async def check_hh_candidates_batch(
+    request: schemas.HHCandidateCheckBatch,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Проверяет сразу список кандидатов (например, всю страницу поиска HH) одним запросом.
+    Кандидаты с телефоном сверяются по ФИО и телефону, без телефона - только по ФИО
+    (match = "name", такое совпадение стоит проверить вручную).
+    """
+    if len(request.candidates) > HH_CHECK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {HH_CHECK_BATCH_MAX_ITEMS} кандидатов за запрос"
+        )
+    
+    keys = [
+        (name_key(item.full_name), normalize_phone_e164(item.phone))
+        for item in request.candidates
+    ]
+    full_keys = {(key, phone_key) for key, phone_key in keys if key and phone_key}
+    name_only_keys = {key for key, phone_key in keys if key and not phone_key}
+    
+    try:
+        by_full_key = {}
+        by_name_key = {}
+        if full_keys:
+            result = await db.execute(
+                select(models.HHCandidate)
+                .filter(tuple_(models.HHCandidate.name_key, models.HHCandidate.phone_normalized).in_(list(full_keys)))
+                .order_by(models.HHCandidate.id)
+            )
+            for candidate in result.scalars():
+                by_full_key.setdefault((candidate.name_key, candidate.phone_normalized), candidate)
+        if name_only_keys:
+            result = await db.execute(
+                select(models.HHCandidate)
+                .filter(models.HHCandidate.name_key.in_(list(name_only_keys)))
+                .order_by(models.HHCandidate.id)
+            )
+            for candidate in result.scalars():
+                by_name_key.setdefault(candidate.name_key, candidate)
+    except Exception as e:
+        logging.error(f"Ошибка при пакетной проверке кандидатов: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Ошибка при проверке существования кандидатов"
+        )
+    
+    results = []
+    for index, (item, (key, phone_key)) in enumerate(zip(request.candidates, keys)):
+        if phone_key:
+            candidate, match = by_full_key.get((key, phone_key)), "name_phone"
+        else:
+            candidate, match = by_name_key.get(key), "name"
+        entry = {"index": index, "full_name": item.full_name, "phone": item.phone, "exists": candidate is not None}
+        if candidate is not None:
+            entry.update({"match": match, "candidate": hh_candidate_brief(candidate)})
+        results.append(entry)
+    
+    return {
+        "results": results,
+        "total": len(results),
+        "existing": sum(1 for entry in results if entry["exists"])
+    }
+
 @app.post("/api/hh/candidates")
 async def import_hh_candidate(
     full_name: str = Form(...),
@@ -1489,8 +1664,9 @@ async def import_hh_candidate(
     status: Optional[str] = Form("новый"),  # Добавляем статус с дефолтным значением "новый"
     comment: Optional[str] = Form("Импортирован из HeadHunter"),  # Добавляем комментарий с дефолтным значением
     resume: UploadFile = File(None),
+    background_tasks: BackgroundTasks = None,
     current_user: Optional[schemas.User] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Импортирует нового кандидата из HeadHunter"""
     try:
@@ -1511,10 +1687,7 @@ async def import_hh_candidate(
         logging.info(f"Гражданство: {citizenship}")
         
         # Проверяем, существует ли уже кандидат
-        existing_candidate = db.query(models.HHCandidate).filter(
-            models.HHCandidate.full_name == normalized_name,
-            models.HHCandidate.phone.like(f"%{clean_phone}%")
-        ).first()
+        existing_candidate = await find_hh_duplicate(db, normalized_name, clean_phone)
         
         if existing_candidate:
             logging.warning(f"Попытка повторного импорта кандидата: {normalized_name} ({clean_phone})")
@@ -1523,33 +1696,25 @@ async def import_hh_candidate(
                 content={
                     "success": False,
                     "error": "Кандидат уже существует в базе данных",
-                    "candidate": {
-                        "id": existing_candidate.id,
-                        "full_name": existing_candidate.full_name,
-                        "position": existing_candidate.position,
-                        "status": existing_candidate.status,
-                        "created_at": existing_candidate.created_at.isoformat()
-                    }
+                    "candidate": hh_candidate_brief(existing_candidate)
                 }
             )
         
         # Обрабатываем PDF-резюме, если оно есть
         resume_file_path = None
+        resume_text = None
         if resume:
-            # Создаем безопасное имя файла с временной меткой
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            safe_filename = f"{timestamp}_{secure_filename(resume.filename)}"
-            
-            # Убеждаемся, что директория для резюме существует
-            os.makedirs("resumes", exist_ok=True)
-            
-            # Сохраняем файл
-            file_path = os.path.join("resumes", safe_filename)
-            with open(file_path, "wb") as f:
-                f.write(await resume.read())
-            
-            resume_file_path = f"resumes/{safe_filename}"
+            # Сохраняем файл под именем по хэшу содержимого: повторный импорт того же резюме не дублирует файл
+            extension = secure_filename(resume.filename).rsplit('.', 1)[-1] or "pdf"
+            sha256, file_name = await save_resume(await read_upload_limited(resume), extension)
+            resume_file_path = f"resumes/{file_name}"
             logging.info(f"Сохранено резюме: {resume_file_path}")
+            
+            # Текст резюме для полнотекстового поиска (из кэша, если файл уже разбирался)
+            try:
+                resume_text = (await get_parsed_resume(sha256, RESUME_DIR / file_name))["text"]
+            except ResumeParseError as e:
+                logging.error(f"Не удалось извлечь текст резюме {resume_file_path}: {str(e)}")
         
         # Создаем новую запись кандидата
         new_candidate = models.HHCandidate(
@@ -1558,11 +1723,12 @@ async def import_hh_candidate(
             phone=clean_phone,
             position=specialty,
             resume_file_path=resume_file_path,
+            resume_text=resume_text,
             status=status
         )
         
         db.add(new_candidate)
-        db.flush()  # Получаем id без коммита
+        await db.flush()  # Получаем id без коммита
         
         # Добавляем запись в историю статусов
         status_history = models.HHStatusHistory(
@@ -1572,10 +1738,14 @@ async def import_hh_candidate(
             created_by=current_user.full_name if current_user else "HeadHunter Extension"
         )
         db.add(status_history)
+        await analytics.record_status_change(db, "hh", status)
         
         # Сохраняем изменения
-        db.commit()
+        await db.commit()
+        # Подгружаем created_at, выставленный сервером
+        await db.refresh(new_candidate)
         logging.info(f"Успешно импортирован кандидат с ID: {new_candidate.id}")
+        background_tasks.add_task(dedup_service.check_record, "hh_candidate", new_candidate.id)
         
         return {
             "success": True,
@@ -1592,28 +1762,12 @@ async def import_hh_candidate(
         
     except Exception as e:
         logging.error(f"Ошибка при импорте кандидата: {str(e)}")
-        db.rollback()
+        await db.rollback()
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": f"Ошибка при импорте кандидата: {str(e)}"}
         )
 
-# Функция для извлечения упоминаний пользователей в формате @email из текста
-def extract_mentions(text: str) -> Set[str]:
-    """
-    Извлекает упоминания пользователей в формате @email из текста
-    
-    Например: "Задача для @user@example.com, срочно!"
-    """
-    if not text:
-        return set()
-    
-    # Регулярное выражение для поиска упоминаний в формате @email
-    mention_pattern = r'@([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-    mentions = re.findall(mention_pattern, text)
-    
-    return set(mentions)
-
 # Функция для создания уведомлений для упомянутых пользователей
 def create_mention_notifications(db: Session, task_id: int, text: str, creator_id: int):
     """
@@ -1661,7 +1815,12 @@ def create_mention_notifications(db: Session, task_id: int, text: str, creator_i
     db.commit()
 
 @app.post("/tasks/", response_model=schemas.Task)
-def create_task(task: schemas.TaskCreate, current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_task(
+    task: schemas.TaskCreate,
+    background_tasks: BackgroundTasks,
+    current_user: schemas.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Создание новой задачи для календаря, автоматически устанавливает текущего пользователя как создателя
     """
@@ -1677,6 +1836,8 @@ def create_task(task: schemas.TaskCreate, current_user: schemas.User = Depends(g
         assigned_to=task.assigned_to,
         created_by_id=current_user.id  # Сохраняем ID текущего пользователя как создателя
     )
+    # Упоминания сохраняются в task_mentions вместе с задачей
+    sync_task_mentions(db, db_task)
     
     db.add(db_task)
     db.commit()
@@ -1686,6 +1847,9 @@ def create_task(task: schemas.TaskCreate, current_user: schemas.User = Depends(g
     combined_text = f"{task.title} {task.description}" if task.description else task.title
     create_mention_notifications(db, db_task.id, combined_text, current_user.id)
     
+    # Планировщик напоминаний добавит задачу в очередь
+    background_tasks.add_task(reminder_scheduler.task_changed, db_task.id)
+    
     # Получаем задачу с данными о создателе
     created_task = db.query(models.Task).options(joinedload(models.Task.creator)).filter(models.Task.id == db_task.id).first()
     
@@ -1711,29 +1875,30 @@ def get_tasks(
     # Используем joinedload для eagerly loading связанных объектов
     query = db.query(models.Task).options(joinedload(models.Task.creator))
     
-    if start_date:
-        query = query.filter(models.Task.date >= start_date)
+    # Диапазон дат переводим в границы starts_at, чтобы фильтр шел по индексу
+    try:
+        range_start, range_end = local_day_range(parse_task_date(start_date), parse_task_date(end_date))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Дата должна быть в формате YYYY-MM-DD")
     
-    if end_date:
-        query = query.filter(models.Task.date <= end_date)
+    if range_start:
+        query = query.filter(models.Task.starts_at >= range_start)
+    
+    if range_end:
+        query = query.filter(models.Task.starts_at < range_end)
     
     # Если пользователь не администратор, то возвращаем только задачи,
     # где он является создателем, ИЛИ назначенным исполнителем, ИЛИ упомянут.
+    # Каждая ветка идет по своему индексу (assigned_to, created_by_id, task_mentions.email).
     if current_user.role != "admin":
-        mention_pattern = f"%@{current_user.email}%"
-        query = query.filter(
-            or_(
-                models.Task.assigned_to == current_user.id,
-                models.Task.created_by_id == current_user.id,
-                models.Task.title.ilike(mention_pattern), # Регистронезависимый поиск
-                and_( # Проверяем описание только если оно не NULL
-                    models.Task.description != None,
-                    models.Task.description.ilike(mention_pattern)
-                )
-            )
+        visible_task_ids = union(
+            select(models.Task.id).filter(models.Task.assigned_to == current_user.id),
+            select(models.Task.id).filter(models.Task.created_by_id == current_user.id),
+            select(models.TaskMention.task_id).filter(models.TaskMention.email == current_user.email.lower())
         )
+        query = query.filter(models.Task.id.in_(visible_task_ids))
     
-    tasks = query.order_by(models.Task.date.asc()).all()
+    tasks = query.order_by(models.Task.starts_at.asc(), models.Task.id.asc()).all()
     
     # Выводим информацию о загруженных задачах для отладки
     print(f"Загружено {len(tasks)} задач")
@@ -1772,14 +1937,11 @@ def get_task(task_id: int, current_user: schemas.User = Depends(get_current_user
         is_creator = db_task.created_by_id == current_user.id
         
         # Проверка упоминания
-        mention_pattern = f"%@{current_user.email}%"
-        is_mentioned_in_title = db_task.title is not None and db.query(func.count(models.Task.id)).filter(models.Task.id == task_id, models.Task.title.ilike(mention_pattern)).scalar() > 0
-        is_mentioned_in_desc = db_task.description is not None and db.query(func.count(models.Task.id)).filter(models.Task.id == task_id, models.Task.description.ilike(mention_pattern)).scalar() > 0
-        is_mentioned = is_mentioned_in_title or is_mentioned_in_desc
+        is_mentioned = db.get(models.TaskMention, (task_id, current_user.email.lower())) is not None
 
         print(f"  Is assignee? {is_assignee}")
         print(f"  Is creator? {is_creator}")
-        print(f"  Is mentioned? {is_mentioned} (Title: {is_mentioned_in_title}, Desc: {is_mentioned_in_desc})")
+        print(f"  Is mentioned? {is_mentioned}")
         
         if not is_assignee and not is_creator and not is_mentioned:
             print(f"  Access denied for user ID: {current_user.id}")
@@ -1798,6 +1960,7 @@ def get_task(task_id: int, current_user: schemas.User = Depends(get_current_user
 def update_task(
     task_id: int,
     task_update: schemas.TaskUpdate,
+    background_tasks: BackgroundTasks,
     current_user: schemas.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -1831,6 +1994,9 @@ def update_task(
     if 'created_by_id' not in update_data and original_creator_id:
         db_task.created_by_id = original_creator_id
     
+    if 'title' in update_data or 'description' in update_data:
+        sync_task_mentions(db, db_task)
+    
     db.commit()
     db.refresh(db_task)
     
@@ -1838,13 +2004,21 @@ def update_task(
     combined_text = f"{db_task.title} {db_task.description}" if db_task.description else db_task.title
     create_mention_notifications(db, db_task.id, combined_text, current_user.id)
     
+    # Время или статус могли измениться - планировщик перечитает задачу
+    background_tasks.add_task(reminder_scheduler.task_changed, task_id)
+    
     # Снова загружаем задачу с создателем
     db_task = db.query(models.Task).options(joinedload(models.Task.creator)).filter(models.Task.id == task_id).first()
     
     return db_task
 
 @app.delete("/tasks/{task_id}", response_model=schemas.Task)
-def delete_task(task_id: int, current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_task(
+    task_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: schemas.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Удаление задачи
     """
@@ -1862,156 +2036,71 @@ def delete_task(task_id: int, current_user: schemas.User = Depends(get_current_u
     db.delete(db_task)
     db.commit()
     
+    background_tasks.add_task(reminder_scheduler.task_changed, task_id)
+    
     return task_data
 
 # ===== Уведомления =====
 @app.get("/notifications/", response_model=List[schemas.Notification])
 async def get_notifications(
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     include_read: bool = False
 ):
     """
     Получение списка уведомлений для текущего пользователя
     """
-    query = db.query(models.Notification).filter(models.Notification.user_id == current_user.id)
+    query = select(models.Notification).options(
+        selectinload(models.Notification.task).selectinload(models.Task.creator),
+        selectinload(models.Notification.vacancy)
+    ).filter(models.Notification.user_id == current_user.id)
     
     if not include_read:
         query = query.filter(models.Notification.is_read == False)
     
-    notifications = query.order_by(models.Notification.created_at.desc()).all()
-    return notifications
+    result = await db.execute(query.order_by(models.Notification.created_at.desc()))
+    return result.scalars().all()
 
 @app.post("/notifications/{notification_id}/read", response_model=dict)
 async def mark_notification_as_read(
     notification_id: int,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отметить уведомление как прочитанное
     """
-    notification = db.query(models.Notification).filter(
+    result = await db.execute(select(models.Notification).filter(
         models.Notification.id == notification_id,
         models.Notification.user_id == current_user.id
-    ).first()
+    ))
+    notification = result.scalars().first()
     
     if not notification:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
     
     notification.is_read = True
-    db.commit()
+    await db.commit()
     
     return {"status": "success"}
 
 @app.post("/notifications/read-all", response_model=dict)
 async def mark_all_notifications_as_read(
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отметить все уведомления пользователя как прочитанные
     """
-    db.query(models.Notification).filter(
+    await db.execute(update(models.Notification).filter(
         models.Notification.user_id == current_user.id,
         models.Notification.is_read == False
-    ).update({"is_read": True})
+    ).values(is_read=True))
     
-    db.commit()
+    await db.commit()
     
     return {"status": "success"}
 
-# Фоновая задача для проверки и создания уведомлений
-async def check_upcoming_tasks():
-    """
-    Проверяет задачи, которые начинаются в ближайшее время, и создает уведомления
-    """
-    while True:
-        try:
-            # Используем независимую сессию для проверки
-            db = SessionLocal()
-            
-            try:
-                # Получаем текущее время и время для проверки (+5 минут)
-                now = datetime.now()
-                check_time = now + timedelta(minutes=5)
-                
-                # Форматируем для сравнения с данными в БД
-                check_date = check_time.strftime('%Y-%m-%d')
-                check_time_str = check_time.strftime('%H:%M')
-                
-                # Округляем до минут для корректного сравнения
-                check_time_rounded = check_time.replace(second=0, microsecond=0)
-                now_rounded = now.replace(second=0, microsecond=0)
-                
-                # Ищем все запланированные задачи, которые начинаются через 5 минут
-                upcoming_tasks = db.query(models.Task).filter(
-                    models.Task.date == check_date,
-                    models.Task.time == check_time_str,
-                    models.Task.status == "planned"
-                ).all()
-                
-                print(f"Found {len(upcoming_tasks)} tasks scheduled for {check_date} {check_time_str}")
-                
-                # Обрабатываем найденные задачи
-                for task in upcoming_tasks:
-                    # Определяем получателей уведомлений (создатель и назначенный пользователь)
-                    recipients = set()
-                    if task.created_by_id:
-                        recipients.add(task.created_by_id)
-                    if task.assigned_to:
-                        recipients.add(task.assigned_to)
-                    
-                    # Создаем уведомление для каждого получателя
-                    for user_id in recipients:
-                        # Проверяем, не создавалось ли уже уведомление для этой задачи и пользователя
-                        existing = db.query(models.Notification).filter(
-                            models.Notification.task_id == task.id,
-                            models.Notification.user_id == user_id,
-                            models.Notification.created_at >= now - timedelta(minutes=10)
-                        ).first()
-                        
-                        if not existing:
-                            notification = models.Notification(
-                                user_id=user_id,
-                                task_id=task.id,
-                                message=f"Через 5 минут начинается задача: {task.title}"
-                            )
-                            db.add(notification)
-                            print(f"Created notification for user {user_id}, task {task.id}")
-                            
-                            # Отправляем WebSocket уведомление
-                            # Получаем email пользователя по ID
-                            user = db.query(models.User).filter(models.User.id == user_id).first()
-                            if user and user.email in manager.authenticated_users:
-                                print(f"Sending upcoming_task WebSocket notification to {user.email}")
-                                await manager.authenticated_users[user.email].send_json({
-                                    "type": "upcoming_task",
-                                    "task": {
-                                        "id": task.id,
-                                        "title": task.title,
-                                        "time": task.time,
-                                        "date": task.date
-                                    }
-                                })
-                
-                # Сохраняем изменения
-                db.commit()
-                
-            except Exception as e:
-                print(f"Error checking upcoming tasks: {e}")
-                db.rollback()
-            finally:
-                db.close()
-            
-            # Проверяем каждую минуту
-            await asyncio.sleep(60)
-            
-        except Exception as e:
-            print(f"Critical error in check_upcoming_tasks: {e}")
-            # В случае критической ошибки ждем немного перед следующей попыткой
-            await asyncio.sleep(10)
-
 @app.on_event("startup")
 async def start_background_tasks():
     """
@@ -2026,8 +2115,28 @@ async def start_background_tasks():
     except Exception as e:
         logging.error(f"Error registering telegram confirmation handlers: {str(e)}")
     
-    # Создаем и запускаем фоновую задачу для проверки предстоящих заданий
-    asyncio.create_task(check_upcoming_tasks())
+    # Подключаемся к рассылке WebSocket-событий между воркерами
+    await manager.start()
+    
+    # События об изменении данных для кэша ответов
+    await response_cache.start()
+    
+    # Напоминания о предстоящих задачах (отправляет один воркер под advisory-блокировкой)
+    await reminder_scheduler.start(manager.send_to_user)
+    
+    # Ночной пересчет дубликатов кандидатов (выполняет один воркер под advisory-блокировкой)
+    asyncio.create_task(dedup_service.nightly_dedup_loop())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """
+    Останавливает фоновые задачи при завершении приложения
+    """
+    await reminder_scheduler.stop()
+    await response_cache.stop()
+    await manager.stop()
+    resume_parser_pool.shutdown()
+    await hh_parser.close()
 
 @app.get("/users/", response_model=List[schemas.User])
 def get_users(current_user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -2049,6 +2158,34 @@ def get_user_by_id(
         raise HTTPException(status_code=404, detail="Пользователь не найден")
     return user
 
+@app.get("/admin/db-pool", response_model=Dict[str, Any])
+async def get_db_pool_stats(current_user: models.User = Depends(get_current_user)):
+    """
+    Состояние пулов соединений с БД: занятые соединения, overflow и гистограмма ожидания.
+    Только для администраторов.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут просматривать состояние пула соединений"
+        )
+    
+    return get_pool_stats()
+
+@app.get("/admin/response-cache", response_model=Dict[str, Any])
+async def get_response_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """
+    Состояние кэша ответов текущего воркера: попадания, ответы 304, версии ресурсов.
+    Только для администраторов.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут просматривать состояние кэша ответов"
+        )
+    
+    return response_cache.stats()
+
 # Новые API-эндпоинты для аналитики
 
 @app.get("/analytics/status-history")
@@ -2056,7 +2193,7 @@ async def get_status_history_analytics(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение статистики изменений статусов заявок и кандидатов по времени.
@@ -2072,101 +2209,16 @@ async def get_status_history_analytics(
     if end_date:
         end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
     
-    # Получаем историю статусов из обеих таблиц
-    application_history_query = db.query(models.StatusHistory)
-    hh_history_query = db.query(models.HHStatusHistory)
-    
-    # Применяем фильтрацию по датам, если указаны
-    if start_datetime:
-        application_history_query = application_history_query.filter(
-            models.StatusHistory.created_at >= start_datetime
-        )
-        hh_history_query = hh_history_query.filter(
-            models.HHStatusHistory.created_at >= start_datetime
-        )
-    
-    if end_datetime:
-        application_history_query = application_history_query.filter(
-            models.StatusHistory.created_at <= end_datetime
-        )
-        hh_history_query = hh_history_query.filter(
-            models.HHStatusHistory.created_at <= end_datetime
-        )
-    
-    # Получаем данные из базы
-    application_history = application_history_query.all()
-    hh_history = hh_history_query.all()
-    
-    # Структура для агрегации данных по дням и статусам
-    daily_status_counts = defaultdict(lambda: defaultdict(int))
-    
-    # Обрабатываем историю статусов заявок
-    for history_item in application_history:
-        # Извлекаем дату (без времени)
-        date_str = history_item.created_at.strftime('%Y-%m-%d')
-        status = history_item.status.lower()
-        
-        # Инкрементируем счетчик для этого статуса в этот день
-        daily_status_counts[date_str][status] += 1
-    
-    # Обрабатываем историю статусов HH кандидатов
-    for history_item in hh_history:
-        # Извлекаем дату (без времени)
-        date_str = history_item.created_at.strftime('%Y-%m-%d')
-        status = history_item.status.lower()
-        
-        # Инкрементируем счетчик для этого статуса в этот день
-        daily_status_counts[date_str][f"hh_{status}"] += 1
-    
-    # Преобразуем в список для ответа API, сортируем по дате
-    result = []
-    for date_str, status_counts in sorted(daily_status_counts.items()):
-        # Вычисляем день недели и название месяца для удобства отображения
-        try:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-            weekday = calendar.day_name[date_obj.weekday()]
-            month = calendar.month_name[date_obj.month]
-        except:
-            weekday = ""
-            month = ""
-        
-        # Комбинированные счетчики
-        combined_counts = defaultdict(int)
-        for status, count in status_counts.items():
-            # Если это статус HH кандидата
-            if status.startswith('hh_'):
-                base_status = status[3:]  # Убираем префикс 'hh_'
-                combined_counts[f"combined_{base_status}"] += count
-            else:
-                combined_counts[f"combined_{status}"] += count
-                
-        # Добавляем комбинированные счетчики в результат
-        status_counts.update(combined_counts)
-        
-        result.append({
-            "date": date_str,
-            "weekday": weekday,
-            "month": month,
-            "counts": status_counts
-        })
-    
-    # Общая статистика
-    total_stats = defaultdict(int)
-    for date_data in result:
-        for status, count in date_data["counts"].items():
-            total_stats[status] += count
-    
-    return {
-        "daily_data": result,
-        "total_stats": dict(total_stats)
-    }
+    # Счетчики по дням из status_daily_rollup
+    rows = await analytics.status_counts(db, "day", start_datetime, end_datetime)
+    return analytics.daily_status_history(rows)
 
 # Дополнительный эндпоинт для получения помесячной статистики
 @app.get("/analytics/monthly-status-history")
 async def get_monthly_status_history_analytics(
     year: Optional[int] = None,
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение статистики изменений статусов заявок и кандидатов по месяцам.
@@ -2179,68 +2231,56 @@ async def get_monthly_status_history_analytics(
     start_datetime = datetime(year, 1, 1)
     end_datetime = datetime(year, 12, 31, 23, 59, 59)
     
-    # Получаем историю статусов из обеих таблиц
-    application_history = db.query(models.StatusHistory).filter(
-        models.StatusHistory.created_at >= start_datetime,
-        models.StatusHistory.created_at <= end_datetime
-    ).all()
-    
-    hh_history = db.query(models.HHStatusHistory).filter(
-        models.HHStatusHistory.created_at >= start_datetime,
-        models.HHStatusHistory.created_at <= end_datetime
-    ).all()
-    
-    # Структура для агрегации данных по месяцам и статусам
-    monthly_status_counts = defaultdict(lambda: defaultdict(int))
-    
-    # Обрабатываем историю статусов заявок
-    for history_item in application_history:
-        # Извлекаем месяц
-        month_str = history_item.created_at.strftime('%Y-%m')
-        month_name = calendar.month_name[history_item.created_at.month]
-        status = history_item.status.lower()
-        
-        # Инкрементируем счетчик для этого статуса в этот месяц
-        monthly_status_counts[month_str]['name'] = month_name
-        monthly_status_counts[month_str][status] += 1
-    
-    # Обрабатываем историю статусов HH кандидатов
-    for history_item in hh_history:
-        # Извлекаем месяц
-        month_str = history_item.created_at.strftime('%Y-%m')
-        month_name = calendar.month_name[history_item.created_at.month]
-        status = history_item.status.lower()
-        
-        # Инкрементируем счетчик для этого статуса в этот месяц
-        monthly_status_counts[month_str]['name'] = month_name
-        monthly_status_counts[month_str][f"hh_{status}"] += 1
-    
-    # Преобразуем в список для ответа API, сортируем по месяцу
-    result = []
-    for month_str, status_counts in sorted(monthly_status_counts.items()):
-        # Комбинированные счетчики
-        combined_counts = defaultdict(int)
-        for status, count in status_counts.items():
-            if status == 'name':
-                continue
-                
-            # Если это статус HH кандидата
-            if status.startswith('hh_'):
-                base_status = status[3:]  # Убираем префикс 'hh_'
-                combined_counts[f"combined_{base_status}"] += count
-            else:
-                combined_counts[f"combined_{status}"] += count
-                
-        # Добавляем комбинированные счетчики в результат
-        status_counts.update(combined_counts)
-        
-        result.append({
-            "month": month_str,
-            "month_name": status_counts.pop('name', ''),
-            "counts": status_counts
-        })
+    # Счетчики по дням из status_daily_rollup, сложенные по месяцам
+    rows = await analytics.status_counts(db, "month", start_datetime, end_datetime)
+    return analytics.monthly_status_history(rows)
+
+@app.get("/analytics/recruiters")
+async def get_recruiter_analytics(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    refresh: bool = False,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Показатели рекрутеров по назначениям вакансий: открытые назначения, закрытые за период,
+    медианное время закрытия (дни) и закрытия в неделю. Период - дни YYYY-MM-DD включительно,
+    по умолчанию последние 12 недель. Результат кэшируется до изменения назначений.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут просматривать показатели рекрутеров"
+        )
     
-    return result
+    try:
+        start_day, end_day = analytics.recruiter_stats_period(start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Начало периода позже его окончания")
+    
+    return await analytics.recruiter_stats_cached(db, start_day, end_day, refresh=refresh)
+
+@app.get("/analytics/funnel")
+async def get_hiring_funnel_analytics(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    refresh: bool = False,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Воронка найма (новый → собеседование → оффер → принят на работу): число заявок и кандидатов HH
+    на каждом этапе, конверсия между этапами, медиана и p90 времени в каждом статусе (в часах).
+    Результат кэшируется по диапазону дат; refresh=true пересчитывает его.
+    """
+    try:
+        start_datetime = datetime.fromisoformat(start_date.replace('Z', '+00:00')) if start_date else None
+        end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00')) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Дата должна быть в формате ISO 8601")
+    
+    return await analytics.hiring_funnel_cached(db, start_datetime, end_datetime, refresh=refresh)
 
 # Функции для работы с вакансиями
 
@@ -2275,24 +2315,17 @@ def get_vacancy(db: Session, vacancy_id: int):
     
     return vacancy
 
-def create_vacancy(db: Session, vacancy: schemas.VacancyCreate, user_id: int):
+def create_vacancy(db: Session, vacancy: schemas.VacancyCreate, user_id: int, background_tasks: BackgroundTasks):
     db_vacancy = models.Vacancy(**vacancy.model_dump(), created_by_id=user_id)
     db.add(db_vacancy)
     db.commit()
     db.refresh(db_vacancy)
     
-    # Отправляем уведомления всем рекрутерам
-    recruiters = db.query(models.User).filter(models.User.role == "recruiter").all()
-    for recruiter in recruiters:
-        notification = models.Notification(
-            user_id=recruiter.id,
-            message=f"Новая вакансия: {vacancy.title}",
-            vacancy_id=db_vacancy.id,
-            is_read=False
-        )
-        db.add(notification)
-    
-    db.commit()
+    # Отправляем уведомления всем рекрутерам после ответа
+    notification_service.defer(
+        background_tasks, f"Новая вакансия: {vacancy.title}",
+        roles=["recruiter"], vacancy_id=db_vacancy.id
+    )
     return db_vacancy
 
 def update_vacancy(db: Session, vacancy_id: int, vacancy: schemas.VacancyUpdate):
@@ -2421,13 +2454,14 @@ def read_vacancies(
 @app.post("/vacancies/", response_model=schemas.Vacancy)
 def create_new_vacancy(
     vacancy: schemas.VacancyCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # Только администраторы могут создавать вакансии
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Только администраторы могут создавать вакансии")
-    return create_vacancy(db, vacancy, current_user.id)
+    return create_vacancy(db, vacancy, current_user.id, background_tasks)
 
 @app.get("/vacancies/{vacancy_id}", response_model=schemas.VacancyDetail)
 def read_vacancy(
@@ -2611,6 +2645,7 @@ def read_assignment(
 
 @app.put("/vacancy-assignments/{assignment_id}/close", response_model=schemas.VacancyAssignment)
 def close_vacancy_assignment(
+    background_tasks: BackgroundTasks,
     assignment_id: int = FastAPIPath(..., title="ID назначения"),
     candidate_id: Optional[int] = Query(None, title="ID кандидата"),
     db: Session = Depends(get_db),
@@ -2658,25 +2693,14 @@ def close_vacancy_assignment(
     db.refresh(assignment)
     
     # Отправляем уведомление администраторам
-    admins = db.query(models.User).filter(models.User.role == "admin").all()
     recruiter = db.query(models.User).filter(models.User.id == assignment.recruiter_id).first()
+    message = f"Рекрутер {recruiter.full_name} закрыл вакансию: {vacancy.title}"
+    if candidate_id:
+        candidate = db.query(models.Application).filter(models.Application.id == candidate_id).first()
+        if candidate:
+            message += f" с кандидатом {candidate.full_name}"
     
-    for admin in admins:
-        message = f"Рекрутер {recruiter.full_name} закрыл вакансию: {vacancy.title}"
-        if candidate_id:
-            candidate = db.query(models.Application).filter(models.Application.id == candidate_id).first()
-            if candidate:
-                message += f" с кандидатом {candidate.name}"
-        
-        notification = models.Notification(
-            user_id=admin.id,
-            vacancy_id=vacancy.id,
-            message=message,
-            is_read=False
-        )
-        db.add(notification)
-    
-    db.commit()
+    notification_service.defer(background_tasks, message, roles=["admin"], vacancy_id=vacancy.id)
     
     return assignment
 
@@ -2699,6 +2723,7 @@ def update_vacancy(
 @app.put("/vacancies/{vacancy_id}/close", response_model=schemas.Vacancy)
 def close_vacancy_endpoint(
     vacancy_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -2737,21 +2762,15 @@ def close_vacancy_endpoint(
         assignment.status = "closed"
         assignment.closed_at = datetime.now()
     
-    # Create notification for admins
-    admins = db.query(models.User).filter(models.User.role == "admin").all()
-    for admin in admins:
-        if admin.id != current_user.id:  # Don't notify the admin who closed it
-            notification = models.Notification(
-                user_id=admin.id,
-                vacancy_id=vacancy.id,
-                message=f"{current_user.full_name} закрыл(а) вакансию: {vacancy.title}",
-                is_read=False
-            )
-            db.add(notification)
-    
     db.commit()
     db.refresh(vacancy)
     
+    # Notify admins after the response (except the admin who closed it)
+    notification_service.defer(
+        background_tasks, f"{current_user.full_name} закрыл(а) вакансию: {vacancy.title}",
+        roles=["admin"], vacancy_id=vacancy.id, exclude_user_ids=[current_user.id]
+    )
+    
     return vacancy
 
 # Константы для путей хранения файлов
@@ -2935,26 +2954,26 @@ def delete_folder(
 async def create_document(
     folder_id: Optional[int] = Form(None),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """Загрузка нового документа"""
     # Проверяем, существует ли указанная папка и принадлежит ли она пользователю
     if folder_id:
-        folder = db.query(models.Folder).filter(
+        folder = (await db.execute(select(models.Folder).filter(
             models.Folder.id == folder_id,
             models.Folder.owner_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not folder:
             raise HTTPException(status_code=404, detail="Folder not found or access denied")
     
     # Проверяем, есть ли уже документ с таким именем в этой папке
-    existing_document = db.query(models.Document).filter(
+    existing_document = (await db.execute(select(models.Document).filter(
         models.Document.name == file.filename,
         models.Document.folder_id == folder_id,
         models.Document.owner_id == current_user.id
-    ).first()
+    ))).scalars().first()
     
     if existing_document:
         raise HTTPException(status_code=400, detail="Document with this name already exists in this folder")
@@ -2993,8 +3012,8 @@ async def create_document(
     )
     
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    await db.commit()
+    await db.refresh(db_document)
     
     return db_document
 
@@ -3069,13 +3088,11 @@ def read_document(
 @app.get("/documents/{document_id}/download")
 async def download_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     """Скачивание документа"""
-    document = db.query(models.Document).filter(
-        models.Document.id == document_id
-    ).first()
+    document = await db.get(models.Document, document_id)
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -3083,10 +3100,10 @@ async def download_document(
     # Проверяем, имеет ли пользователь доступ к документу
     if document.owner_id != current_user.id:
         # Проверяем, есть ли у пользователя доступ через таблицу document_access
-        access = db.query(models.DocumentAccess).filter(
+        access = (await db.execute(select(models.DocumentAccess).filter(
             models.DocumentAccess.document_id == document_id,
             models.DocumentAccess.user_id == current_user.id
-        ).first()
+        ))).scalars().first()
         
         if not access:
             raise HTTPException(status_code=403, detail="Access denied")
@@ -3101,7 +3118,7 @@ async def download_document(
         db.add(document)
     
     # Сохраняем изменения, если были исправления
-    db.commit()
+    await db.commit()
     
     file_path = DOCUMENTS_DIR / document.file_path
     
@@ -3285,7 +3302,7 @@ def revoke_document_access(
 @app.post("/telegram/broadcast", response_model=Dict[str, Any])
 async def send_telegram_broadcast(
     broadcast: schemas.TelegramBroadcast,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
@@ -3311,8 +3328,8 @@ async def send_telegram_broadcast(
             status="processing"
         )
         db.add(broadcast_record)
-        db.commit()
-        db.refresh(broadcast_record)
+        await db.commit()
+        await db.refresh(broadcast_record)
         
         # Обрабатываем рассылку с передачей ID рассылки
         result = await process_broadcast(
@@ -3326,14 +3343,14 @@ async def send_telegram_broadcast(
         # Обновляем запись о рассылке
         broadcast_record.status = "completed"
         broadcast_record.recipients_count = result.get("results", {}).get("success_count", 0)
-        db.commit()
+        await db.commit()
         
         return result
     except Exception as e:
         # В случае ошибки обновляем статус рассылки
         if 'broadcast_record' in locals():
             broadcast_record.status = "failed"
-            db.commit()
+            await db.commit()
         
         logging.error(f"Error sending Telegram broadcast: {str(e)}")
         raise HTTPException(
@@ -3373,7 +3390,7 @@ def get_broadcast_history(
 @app.get("/telegram/broadcasts/{broadcast_id}", response_model=schemas.TelegramBroadcastDetailResponse)
 async def get_broadcast_details(
     broadcast_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
@@ -3385,9 +3402,12 @@ async def get_broadcast_details(
             detail="Только администраторы могут получать детали рассылок"
         )
     
-    broadcast = db.query(models.TelegramBroadcast).filter(
-        models.TelegramBroadcast.id == broadcast_id
-    ).first()
+    result = await db.execute(
+        select(models.TelegramBroadcast)
+        .options(selectinload(models.TelegramBroadcast.confirmations))
+        .filter(models.TelegramBroadcast.id == broadcast_id)
+    )
+    broadcast = result.scalars().first()
     
     if not broadcast:
         raise HTTPException(
@@ -3401,7 +3421,7 @@ async def get_broadcast_details(
 async def get_broadcast_confirmations(
     broadcast_id: int,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
@@ -3413,14 +3433,14 @@ async def get_broadcast_confirmations(
             detail="Только администраторы могут получать детали рассылок"
         )
     
-    query = db.query(models.MessageConfirmation).filter(
+    query = select(models.MessageConfirmation).filter(
         models.MessageConfirmation.broadcast_id == broadcast_id
     )
     
     if status:
         query = query.filter(models.MessageConfirmation.status == status)
     
-    confirmations = query.all()
+    confirmations = (await db.execute(query)).scalars().all()
     
     if not confirmations:
         # Возвращаем пустой список, а не ошибку
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Индексы для курсорной пагинации и фильтров GET /applications/
+INDEXES = {
+    "ix_applications_created_at_id": "(created_at, id)",
+    "ix_applications_status_created_at_id": "(status, created_at, id)",
+    "ix_applications_position_created_at_id": "(position, created_at, id)",
+    "ix_applications_city_created_at_id": "(city, created_at, id)",
+    "ix_applications_source_created_at_id": "(source, created_at, id)",
+}
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+    
+    for name, columns in INDEXES.items():
+        query = text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON applications {columns}")
+        connection.execute(query)
+        logger.info(f"Индекс {name} создан")
+    
+    connection.execute(text("ANALYZE applications"))
+    logger.info("Успешно добавлены индексы для таблицы applications")
+    
+except Exception as e:
+    logger.error(f"Ошибка при добавлении индексов: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Индекс для показателей рекрутеров (/analytics/recruiters)
+INDEXES = {
+    "ix_vacancy_assignments_recruiter_status_assigned_at": "vacancy_assignments (recruiter_id, status, assigned_at)",
+}
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+    
+    for name, target in INDEXES.items():
+        query = text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        connection.execute(query)
+        logger.info(f"Индекс {name} создан")
+    
+    logger.info("Успешно добавлены индексы назначений вакансий")
+    
+except Exception as e:
+    logger.error(f"Ошибка при добавлении индексов: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,90 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+from candidate_keys import normalize_phone_e164, name_key, translit_name_key
+import models
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Размер пачки при заполнении ключей существующих записей
+BATCH_SIZE = 1000
+
+COLUMNS = [
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS phone_normalized VARCHAR",
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS name_key VARCHAR",
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS name_translit VARCHAR",
+    "ALTER TABLE hh_candidates ADD COLUMN IF NOT EXISTS name_translit VARCHAR",
+]
+
+# Блоки поиска дубликатов: точный телефон (btree) и похожее ФИО в латинице (триграммы)
+INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_phone_normalized ON applications (phone_normalized)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_name_translit_trgm ON applications USING GIN (name_translit gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hh_candidates_name_translit_trgm ON hh_candidates USING GIN (name_translit gin_trgm_ops)",
+    "ANALYZE applications",
+    "ANALYZE hh_candidates",
+]
+
+def backfill(connection, table):
+    """Заполняет ключи пачками по id той же нормализацией, что и при создании записей"""
+    last_id = 0
+    updated = 0
+    while True:
+        rows = connection.execute(
+            text(f"SELECT id, full_name, phone FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        connection.execute(
+            text(
+                f"UPDATE {table} SET phone_normalized = :phone_normalized, name_key = :name_key, "
+                f"name_translit = :name_translit WHERE id = :id"
+            ),
+            [
+                {
+                    "id": row.id,
+                    "phone_normalized": normalize_phone_e164(row.phone),
+                    "name_key": name_key(row.full_name),
+                    "name_translit": translit_name_key(row.full_name),
+                }
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+        updated += len(rows)
+        logger.info(f"{table}: обновлено записей {updated}")
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+
+    for statement in COLUMNS:
+        connection.execute(text(statement))
+        logger.info(f"Выполнено: {statement}")
+
+    # Таблица предложений объединения
+    models.Base.metadata.create_all(bind=engine, tables=[models.CandidateMergeSuggestion.__table__])
+    logger.info("Таблица candidate_merge_suggestions создана")
+
+    backfill(connection, "applications")
+    backfill(connection, "hh_candidates")
+
+    for statement in INDEXES:
+        connection.execute(text(statement))
+        logger.info(f"Выполнено: {statement[:80]}...")
+
+    logger.info("Успешно добавлен поиск дубликатов кандидатов")
+    logger.info("Первичный поиск дубликатов: python dedup_service.py")
+
+except Exception as e:
+    logger.error(f"Ошибка при добавлении поиска дубликатов: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,63 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+from candidate_keys import normalize_phone_e164, name_key
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Размер пачки при заполнении ключей существующих кандидатов
+BATCH_SIZE = 1000
+
+# Индексы для поиска дубликатов кандидатов HH
+INDEXES = {
+    "ix_hh_candidates_name_key_phone": "hh_candidates (name_key, phone_normalized)",
+    "ix_hh_candidates_phone_normalized": "hh_candidates (phone_normalized)",
+}
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+
+    # Добавляем колонки с нормализованными телефоном и ФИО
+    connection.execute(text("ALTER TABLE hh_candidates ADD COLUMN IF NOT EXISTS phone_normalized VARCHAR"))
+    connection.execute(text("ALTER TABLE hh_candidates ADD COLUMN IF NOT EXISTS name_key VARCHAR"))
+    logger.info("Колонки phone_normalized и name_key добавлены")
+
+    # Заполняем ключи пачками по id: нормализация та же, что и при импорте (candidate_keys.py)
+    last_id = 0
+    updated = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, full_name, phone FROM hh_candidates WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        connection.execute(
+            text("UPDATE hh_candidates SET phone_normalized = :phone_normalized, name_key = :name_key WHERE id = :id"),
+            [
+                {"id": row.id, "phone_normalized": normalize_phone_e164(row.phone), "name_key": name_key(row.full_name)}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+        updated += len(rows)
+        logger.info(f"Обновлено кандидатов: {updated}")
+
+    for name, target in INDEXES.items():
+        query = text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        connection.execute(query)
+        logger.info(f"Индекс {name} создан")
+
+    logger.info("Успешно добавлены ключи дубликатов для кандидатов HH")
+
+except Exception as e:
+    logger.error(f"Ошибка при добавлении ключей дубликатов: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
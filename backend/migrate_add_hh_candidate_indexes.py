@@ -0,0 +1,32 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Индексы для пагинации GET /hh-candidates/ и пакетной загрузки истории статусов
+INDEXES = {
+    "ix_hh_candidates_created_at_id": "hh_candidates (created_at, id)",
+    "ix_hh_status_history_candidate_created_at": "hh_status_history (candidate_id, created_at)",
+}
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+    
+    for name, target in INDEXES.items():
+        query = text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        connection.execute(query)
+        logger.info(f"Индекс {name} создан")
+    
+    logger.info("Успешно добавлены индексы для кандидатов HH")
+    
+except Exception as e:
+    logger.error(f"Ошибка при добавлении индексов: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,73 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Каждое поле индексируется конфигурацией 'russian' (стемминг) и 'simple' (латиница, узбекский)
+def weighted(column, weight):
+    return (
+        f"setweight(to_tsvector('russian', coalesce({column}, '')), '{weight}') || "
+        f"setweight(to_tsvector('simple', coalesce({column}, '')), '{weight}')"
+    )
+
+APPLICATIONS_VECTOR = " || ".join([
+    weighted("full_name", "A"),
+    weighted("position", "B"),
+    weighted("specialization", "B"),
+    weighted("city", "C"),
+    weighted("education", "C"),
+    weighted("experience", "C"),
+    weighted("languages", "C"),
+    weighted("resume_text", "D"),
+])
+
+HH_CANDIDATES_VECTOR = " || ".join([
+    weighted("full_name", "A"),
+    weighted("position", "B"),
+    weighted("resume_text", "D"),
+])
+
+PHONE_DIGITS = "regexp_replace(coalesce(phone, ''), '[^0-9]', '', 'g')"
+
+STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE applications ADD COLUMN IF NOT EXISTS resume_text TEXT",
+    "ALTER TABLE hh_candidates ADD COLUMN IF NOT EXISTS resume_text TEXT",
+    f"ALTER TABLE applications ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({APPLICATIONS_VECTOR}) STORED",
+    f"ALTER TABLE hh_candidates ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({HH_CANDIDATES_VECTOR}) STORED",
+    # GIN-индексы для полнотекстового поиска
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_search_vector ON applications USING GIN (search_vector)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hh_candidates_search_vector ON hh_candidates USING GIN (search_vector)",
+    # Триграммные индексы: опечатки в ФИО, поиск по части телефона, ILIKE по должности
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_full_name_trgm ON applications USING GIN (full_name gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hh_candidates_full_name_trgm ON hh_candidates USING GIN (full_name gin_trgm_ops)",
+    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_applications_phone_digits_trgm ON applications USING GIN (({PHONE_DIGITS}) gin_trgm_ops)",
+    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hh_candidates_phone_digits_trgm ON hh_candidates USING GIN (({PHONE_DIGITS}) gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_hh_candidates_position_trgm ON hh_candidates USING GIN (position gin_trgm_ops)",
+    "ANALYZE applications",
+    "ANALYZE hh_candidates",
+]
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+    
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
+        logger.info(f"Выполнено: {statement[:80]}...")
+    
+    logger.info("Успешно добавлен полнотекстовый поиск по заявкам и кандидатам HH")
+    logger.info("Для уже загруженных резюме вызовите POST /search/reindex-resumes от имени администратора")
+    
+except Exception as e:
+    logger.error(f"Ошибка при добавлении поискового индекса: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,30 @@
+from sqlalchemy import create_engine
+import asyncio
+import logging
+from database import DATABASE_URL
+import analytics
+import models
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    engine = create_engine(DATABASE_URL)
+
+    # Таблица дневных счетчиков изменений статусов
+    models.Base.metadata.create_all(bind=engine, tables=[models.StatusDailyRollup.__table__])
+    logger.info("Таблица status_daily_rollup создана")
+
+    # Заполняем счетчики из существующей истории (повторно: python analytics.py)
+    rows = asyncio.run(analytics.rebuild_status_rollup())
+    logger.info(f"Счетчики пересчитаны, строк: {rows}")
+
+    logger.info("Успешно добавлены дневные счетчики статусов")
+
+except Exception as e:
+    logger.error(f"Ошибка при добавлении счетчиков статусов: {str(e)}")
+finally:
+    if 'engine' in locals():
+        engine.dispose()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,67 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+from task_mentions import task_mention_emails
+import models
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Размер пачки задач при заполнении упоминаний
+BATCH_SIZE = 1000
+
+# Индексы для фильтра видимости задач в GET /tasks/
+INDEXES = {
+    "ix_tasks_assigned_to": "tasks (assigned_to)",
+    "ix_tasks_created_by_id": "tasks (created_by_id)",
+}
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+
+    # Таблица упоминаний (вместе с индексом по email)
+    models.Base.metadata.create_all(bind=engine, tables=[models.TaskMention.__table__])
+    logger.info("Таблица task_mentions создана")
+
+    # Заполняем упоминания существующих задач пачками по id, тем же разбором, что и при сохранении задачи
+    last_id = 0
+    total_mentions = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, title, description FROM tasks WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).fetchall()
+        if not rows:
+            break
+
+        mentions = [
+            {"task_id": row.id, "email": email}
+            for row in rows
+            for email in task_mention_emails(row.title, row.description)
+        ]
+        if mentions:
+            connection.execute(
+                text("INSERT INTO task_mentions (task_id, email) VALUES (:task_id, :email) ON CONFLICT DO NOTHING"),
+                mentions
+            )
+        last_id = rows[-1].id
+        total_mentions += len(mentions)
+        logger.info(f"Обработано задач до id={last_id}, упоминаний: {total_mentions}")
+
+    for name, target in INDEXES.items():
+        query = text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        connection.execute(query)
+        logger.info(f"Индекс {name} создан")
+
+    connection.execute(text("ANALYZE task_mentions"))
+    logger.info("Успешно добавлены упоминания задач")
+
+except Exception as e:
+    logger.error(f"Ошибка при добавлении упоминаний задач: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -0,0 +1,33 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATEMENTS = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS reminder_sent_at TIMESTAMPTZ",
+    # Прошедшие задачи считаем уже напомненными, чтобы после обновления не пришли старые напоминания
+    "UPDATE tasks SET reminder_sent_at = now() WHERE reminder_sent_at IS NULL AND starts_at < now()",
+    # Досинхронизация планировщика напоминаний по измененным задачам
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_updated_at ON tasks (updated_at)",
+]
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
+        logger.info(f"Выполнено: {statement}")
+
+    logger.info("Успешно добавлены напоминания о задачах")
+
+except Exception as e:
+    logger.error(f"Ошибка при добавлении напоминаний о задачах: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
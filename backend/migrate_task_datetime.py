@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, text
+import logging
+from database import DATABASE_URL
+from config import APP_TIMEZONE
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Строковые колонки tasks.date (YYYY-MM-DD) и tasks.time (HH:MM) переводятся в DATE/TIME,
+# starts_at - начало задачи в APP_TIMEZONE для выборок по диапазону и напоминаний
+CONVERSIONS = {
+    "date": [
+        # Некорректные даты заменяем датой создания задачи, иначе приведение типа упадет
+        r"UPDATE tasks SET date = to_char(created_at AT TIME ZONE :tz, 'YYYY-MM-DD') "
+        r"WHERE date IS NULL OR date !~ '^\d{4}-\d{2}-\d{2}$'",
+        "ALTER TABLE tasks ALTER COLUMN date TYPE DATE USING date::date",
+    ],
+    "time": [
+        r"UPDATE tasks SET time = NULL WHERE time IS NOT NULL AND trim(time) !~ '^\d{1,2}:\d{2}(:\d{2})?$'",
+        "ALTER TABLE tasks ALTER COLUMN time TYPE TIME USING date_trunc('minute', trim(time)::time)",
+    ],
+}
+
+STATEMENTS = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS starts_at TIMESTAMPTZ",
+    "UPDATE tasks SET starts_at = (date + coalesce(time, TIME '00:00')) AT TIME ZONE :tz",
+]
+
+# Индексы для напоминаний (status, starts_at) и выборки календаря по диапазону
+INDEXES = {
+    "ix_tasks_status_starts_at": "tasks (status, starts_at)",
+    "ix_tasks_starts_at": "tasks (starts_at)",
+}
+
+try:
+    # CREATE INDEX CONCURRENTLY не работает внутри транзакции, поэтому AUTOCOMMIT
+    engine = create_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    connection = engine.connect()
+
+    for column, statements in CONVERSIONS.items():
+        data_type = connection.execute(
+            text("SELECT data_type FROM information_schema.columns WHERE table_name = 'tasks' AND column_name = :column"),
+            {"column": column}
+        ).scalar()
+        if data_type not in ("character varying", "text"):
+            logger.info(f"Колонка tasks.{column} уже имеет тип {data_type}")
+            continue
+        for statement in statements:
+            connection.execute(text(statement), {"tz": APP_TIMEZONE})
+        logger.info(f"Колонка tasks.{column} преобразована")
+
+    for statement in STATEMENTS:
+        connection.execute(text(statement), {"tz": APP_TIMEZONE})
+        logger.info(f"Выполнено: {statement}")
+
+    for name, target in INDEXES.items():
+        query = text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        connection.execute(query)
+        logger.info(f"Индекс {name} создан")
+
+    logger.info("Успешно преобразованы дата и время задач")
+
+except Exception as e:
+    logger.error(f"Ошибка при преобразовании даты и времени задач: {str(e)}")
+finally:
+    if 'connection' in locals():
+        connection.close()
+    logger.info("Соединение с базой данных закрыто")
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, MetaData
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, MetaData, Index, JSON, Float, UniqueConstraint, Date, Time
+from sqlalchemy.orm import relationship, configure_mappers, validates, deferred
 from sqlalchemy.sql import func
 from database import Base
+from candidate_keys import normalize_phone_e164, name_key, translit_name_key
+from dateutils import parse_task_date, parse_task_time, task_starts_at
 from datetime import datetime
 
 class User(Base):
@@ -34,10 +36,37 @@ class Application(Base):
     languages = Column(String)
     source = Column(String)
     resume_file_path = Column(String, nullable=True)
+    # Текст резюме для полнотекстового поиска; не загружается вместе с записью (читают только индексация и поиск)
+    resume_text = deferred(Column(Text, nullable=True))
+    # Ключи для поиска дубликатов (см. candidate_keys.py), заполняются автоматически
+    phone_normalized = Column(String, nullable=True)
+    name_key = Column(String, nullable=True)
+    name_translit = Column(String, nullable=True)
     status = Column(String, default="новый")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     status_history = relationship("StatusHistory", back_populates="application")
 
+    # Составные индексы под курсорную пагинацию (created_at, id) и фильтры списка заявок
+    __table_args__ = (
+        Index("ix_applications_created_at_id", "created_at", "id"),
+        Index("ix_applications_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_applications_position_created_at_id", "position", "created_at", "id"),
+        Index("ix_applications_city_created_at_id", "city", "created_at", "id"),
+        Index("ix_applications_source_created_at_id", "source", "created_at", "id"),
+        Index("ix_applications_phone_normalized", "phone_normalized"),
+    )
+
+    @validates("full_name")
+    def _set_name_keys(self, key, value):
+        self.name_key = name_key(value)
+        self.name_translit = translit_name_key(value)
+        return value
+
+    @validates("phone")
+    def _set_phone_normalized(self, key, value):
+        self.phone_normalized = normalize_phone_e164(value)
+        return value
+
 class StatusHistory(Base):
     __tablename__ = "status_history"
 
@@ -49,6 +78,23 @@ class StatusHistory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     application = relationship("Application", back_populates="status_history")
 
+    # Аналитика статусов за период
+    __table_args__ = (
+        Index("ix_status_history_created_at", "created_at"),
+    )
+
+class StatusDailyRollup(Base):
+    """
+    Число изменений статусов за день (UTC) по источнику: application - заявки, hh - кандидаты HH.
+    Обновляется вместе с записью истории статусов, пересчитывается analytics.rebuild_status_rollup
+    """
+    __tablename__ = "status_daily_rollup"
+
+    day = Column(Date, primary_key=True)
+    source = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)  # в нижнем регистре
+    count = Column(Integer, nullable=False, default=0)
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -71,11 +117,34 @@ class HHCandidate(Base):
     phone = Column(String)
     position = Column(String)
     resume_file_path = Column(String, nullable=True)
+    # Текст резюме для полнотекстового поиска; не загружается вместе с записью (читают только индексация и поиск)
+    resume_text = deferred(Column(Text, nullable=True))
+    # Нормализованные телефон (E.164) и ФИО для поиска дубликатов, заполняются автоматически
+    phone_normalized = Column(String, nullable=True)
+    name_key = Column(String, nullable=True)
+    name_translit = Column(String, nullable=True)  # ФИО в латинице для нечеткого поиска дубликатов
     status = Column(String, default="новый")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     modified_at = Column(DateTime(timezone=True), onupdate=func.now())
     status_history = relationship("HHStatusHistory", back_populates="candidate")
 
+    __table_args__ = (
+        Index("ix_hh_candidates_created_at_id", "created_at", "id"),
+        Index("ix_hh_candidates_name_key_phone", "name_key", "phone_normalized"),
+        Index("ix_hh_candidates_phone_normalized", "phone_normalized"),
+    )
+
+    @validates("full_name")
+    def _set_name_keys(self, key, value):
+        self.name_key = name_key(value)
+        self.name_translit = translit_name_key(value)
+        return value
+
+    @validates("phone")
+    def _set_phone_normalized(self, key, value):
+        self.phone_normalized = normalize_phone_e164(value)
+        return value
+
 class HHStatusHistory(Base):
     __tablename__ = "hh_status_history"
 
@@ -87,22 +156,73 @@ class HHStatusHistory(Base):
     created_by = Column(String)
     candidate = relationship("HHCandidate", back_populates="status_history")
 
+    # История кандидата выбирается пачкой по candidate_id, новые записи первыми
+    __table_args__ = (
+        Index("ix_hh_status_history_candidate_created_at", "candidate_id", "created_at"),
+        # Аналитика статусов за период
+        Index("ix_hh_status_history_created_at", "created_at"),
+    )
+
 class Task(Base):
     __tablename__ = "tasks"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    date = Column(String, nullable=False)  # хранится в формате YYYY-MM-DD
-    time = Column(String, nullable=True)  # время выполнения задачи
+    date = Column(Date, nullable=False)  # в API - строка YYYY-MM-DD
+    time = Column(Time, nullable=True)  # время выполнения задачи, в API - строка HH:MM
+    # Начало задачи (date + time в APP_TIMEZONE) для выборок по диапазону и напоминаний
+    starts_at = Column(DateTime(timezone=True), nullable=True)
+    # Когда отправлено напоминание о начале (сбрасывается при переносе задачи)
+    reminder_sent_at = Column(DateTime(timezone=True), nullable=True)
     status = Column(String, default="planned")  # planned, completed, canceled
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
-    assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
-    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # ID создателя задачи
+    assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # ID создателя задачи
     
     user = relationship("User", foreign_keys=[assigned_to], backref="assigned_tasks")
     creator = relationship("User", foreign_keys=[created_by_id], backref="created_tasks")
+    mentions = relationship("TaskMention", back_populates="task", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_tasks_status_starts_at", "status", "starts_at"),
+        Index("ix_tasks_starts_at", "starts_at"),
+        # Досинхронизация планировщика напоминаний по измененным задачам
+        Index("ix_tasks_updated_at", "updated_at"),
+    )
+
+    # Строки из API приводятся к date/time, starts_at пересчитывается при любом изменении
+    @validates("date")
+    def _set_date(self, key, value):
+        value = parse_task_date(value)
+        self._set_starts_at(task_starts_at(value, self.time))
+        return value
+
+    @validates("time")
+    def _set_time(self, key, value):
+        value = parse_task_time(value)
+        self._set_starts_at(task_starts_at(self.date, value))
+        return value
+
+    def _set_starts_at(self, starts_at):
+        # Перенесенная задача снова получит напоминание
+        if starts_at != self.starts_at:
+            self.starts_at = starts_at
+            self.reminder_sent_at = None
+
+class TaskMention(Base):
+    """Пользователь, упомянутый в задаче как @email (заполняется из названия и описания)"""
+    __tablename__ = "task_mentions"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    email = Column(String, primary_key=True)  # в нижнем регистре
+    task = relationship("Task", back_populates="mentions")
+
+    # Задачи, где упомянут пользователь: поиск по email
+    __table_args__ = (
+        Index("ix_task_mentions_email_task_id", "email", "task_id"),
+    )
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -153,6 +273,11 @@ class VacancyAssignment(Base):
     recruiter = relationship("User", foreign_keys=[recruiter_id], backref="vacancy_assignments")
     candidate = relationship("Application", foreign_keys=[candidate_id], backref="closed_vacancies")
 
+    # Показатели рекрутеров: открытые назначения и закрытые за период
+    __table_args__ = (
+        Index("ix_vacancy_assignments_recruiter_status_assigned_at", "recruiter_id", "status", "assigned_at"),
+    )
+
 class Folder(Base):
     __tablename__ = "folders"
 
@@ -231,4 +356,52 @@ class MessageConfirmation(Base):
     broadcast = relationship("TelegramBroadcast", back_populates="confirmations")
 
     def __repr__(self):
-        return f"<MessageConfirmation(id={self.id}, status={self.status})>" 
\ No newline at end of file
+        return f"<MessageConfirmation(id={self.id}, status={self.status})>" 
+
+class ParsedResume(Base):
+    """Кэш разобранных резюме по SHA-256 содержимого файла"""
+    __tablename__ = "parsed_resumes"
+
+    sha256 = Column(String(64), primary_key=True)
+    parser_version = Column(Integer, nullable=False)  # Версия парсера, которой получены поля
+    file_name = Column(String, nullable=False)  # Файл в RESUME_DIR, один на одинаковое содержимое
+    file_size = Column(Integer)
+    text = Column(Text)
+    fields = Column(JSON)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # Для вытеснения LRU
+
+    def __repr__(self):
+        return f"<ParsedResume(sha256={self.sha256}, parser_version={self.parser_version})>"
+
+class CandidateMergeSuggestion(Base):
+    """
+    Предложение объединить две записи кандидата (заявка из бота и/или кандидат HH).
+    Пара хранится упорядоченной: (left_type, left_id) < (right_type, right_id).
+    """
+    __tablename__ = "candidate_merge_suggestions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    left_type = Column(String, nullable=False)  # application, hh_candidate
+    left_id = Column(Integer, nullable=False)
+    right_type = Column(String, nullable=False)
+    right_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    reasons = Column(JSON)  # Совпавшие признаки: телефон, сходство ФИО
+    status = Column(String, default="pending", nullable=False)  # pending, merged, dismissed
+    resolved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("left_type", "left_id", "right_type", "right_id", name="uq_candidate_merge_pair"),
+        Index("ix_candidate_merge_status_score", "status", "score"),
+    )
+
+    def __repr__(self):
+        return f"<CandidateMergeSuggestion({self.left_type}:{self.left_id} ~ {self.right_type}:{self.right_id}, score={self.score})>"
+
+# Настраиваем мапперы сразу после объявления моделей, чтобы атрибуты из backref
+# (например, Application.messages) были доступны при построении запросов с selectinload
+configure_mappers()
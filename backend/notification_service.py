@@ -0,0 +1,102 @@
+"""
+Рассылка уведомлений группе пользователей.
+
+Уведомления для всех получателей (по id и/или по ролям) сохраняются одним INSERT,
+после commit событие "notification" одной публикацией уходит в темы получателей
+(manager.send_to_users) - его получат только подключенные получатели на любом воркере.
+
+Рассылку на много получателей можно отложить в BackgroundTasks (defer), тогда она
+выполняется после ответа и не задерживает исходный запрос.
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastapi import BackgroundTasks
+from sqlalchemy import insert, or_, select
+
+import models
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+SendToUsers = Callable[[List[str], dict], Awaitable[None]]
+
+
+class NotificationService:
+    def __init__(self, send_to_users: Optional[SendToUsers] = None):
+        # manager.send_to_users: доставка события пользователям на всех воркерах
+        self.send_to_users = send_to_users
+
+    async def _recipients(self, db, user_ids: Iterable[int], roles: Iterable[str], exclude_user_ids: Iterable[int]) -> Dict[int, str]:
+        """id и email получателей одним запросом"""
+        user_ids, roles = set(user_ids or ()), set(roles or ())
+        if not user_ids and not roles:
+            return {}
+        conditions = []
+        if user_ids:
+            conditions.append(models.User.id.in_(user_ids))
+        if roles:
+            conditions.append(models.User.role.in_(roles))
+        query = select(models.User.id, models.User.email).filter(or_(*conditions))
+        exclude_user_ids = set(exclude_user_ids or ())
+        if exclude_user_ids:
+            query = query.filter(models.User.id.notin_(exclude_user_ids))
+        return dict((await db.execute(query)).all())
+
+    async def notify(
+        self,
+        message: str,
+        user_ids: Iterable[int] = (),
+        roles: Iterable[str] = (),
+        task_id: Optional[int] = None,
+        vacancy_id: Optional[int] = None,
+        exclude_user_ids: Iterable[int] = (),
+    ) -> int:
+        """
+        Создает уведомление для пользователей user_ids и всех пользователей с ролями roles
+        (кроме exclude_user_ids) и отправляет его подключенным получателям.
+        Возвращает число созданных уведомлений; ошибки логируются, чтобы не ломать фоновые задачи.
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                recipients = await self._recipients(db, user_ids, roles, exclude_user_ids)
+                if not recipients:
+                    return 0
+                await db.execute(insert(models.Notification), [
+                    {
+                        "user_id": user_id,
+                        "task_id": task_id,
+                        "vacancy_id": vacancy_id,
+                        "message": message,
+                        "is_read": False,
+                    }
+                    for user_id in recipients
+                ])
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error creating notifications '{message}': {e}")
+            return 0
+
+        await self.push(recipients.values(), {
+            "type": "notification",
+            "notification": {
+                "message": message,
+                "task_id": task_id,
+                "vacancy_id": vacancy_id,
+            }
+        })
+        return len(recipients)
+
+    async def push(self, emails: Iterable[str], event: Dict[str, Any]):
+        """Одна публикация во все темы получателей; офлайн-получатели увидят уведомление в списке"""
+        emails = [email for email in emails if email]
+        if not emails or self.send_to_users is None:
+            return
+        try:
+            await self.send_to_users(emails, event)
+        except Exception as e:
+            logger.error(f"Error pushing notification to {len(emails)} users: {e}")
+
+    def defer(self, background_tasks: BackgroundTasks, message: str, **kwargs):
+        """То же, что notify, но после отправки ответа"""
+        background_tasks.add_task(self.notify, message, **kwargs)
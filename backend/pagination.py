@@ -0,0 +1,58 @@
+"""
+Курсорная (keyset) пагинация.
+
+Курсор - непрозрачная для клиента строка (base64 от JSON) с ключом последней записи
+страницы, например (created_at, id). Следующая страница выбирается условием
+"ключ строго меньше курсора" по составному индексу, поэтому глубокие страницы
+стоят столько же, сколько первая, в отличие от OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+# Заголовок ответа, в котором передается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: Optional[datetime], item_id: int) -> str:
+    payload = json.dumps({"c": created_at.isoformat() if created_at else None, "i": item_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"]) if payload.get("c") else None
+        return created_at, int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        ) from e
+
+
+def apply_keyset(query: Any, created_at_column, id_column, cursor: Optional[str]):
+    """
+    Сортирует запрос по (created_at DESC, id DESC) и, если передан курсор,
+    оставляет только записи после него. Работает и с Query, и с select().
+    """
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.filter(id_column < item_id)
+        else:
+            query = query.filter(tuple_(created_at_column, id_column) < tuple_(created_at, item_id))
+    return query.order_by(created_at_column.desc(), id_column.desc())
+
+
+def next_cursor(items: list, limit: int) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница неполная (дальше данных нет)"""
+    if len(items) < limit or not items:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
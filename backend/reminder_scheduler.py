@@ -0,0 +1,314 @@
+"""
+Планировщик напоминаний о задачах календаря.
+
+Напоминания ближайших TASK_REMINDER_LOOKAHEAD_HOURS часов держатся в памяти в min-куче по
+времени срабатывания; планировщик спит до ближайшего напоминания, а не опрашивает БД раз в минуту.
+Работает только один воркер - лидер, получивший advisory-блокировку PostgreSQL; остальные
+ждут и подхватывают лидерство, если лидер завершился.
+
+Изменения задач (создание, правка, удаление) на любом воркере рассылаются событием через
+бэкенд ws_broadcast, лидер перечитывает задачу и обновляет кучу. Дополнительно раз в
+TASK_REMINDER_RESYNC_SECONDS лидер дочитывает задачи, измененные после прошлой синхронизации
+(updated_at), и сдвигает окно загрузки.
+
+Напоминание отправляется ровно один раз: задачи помечаются reminder_sent_at условным
+UPDATE ... WHERE reminder_sent_at IS NULL RETURNING, уведомления вставляются одним запросом.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.sql import func
+
+import models
+from config import (
+    TASK_REMINDER_LEAD_MINUTES, TASK_REMINDER_LOOKAHEAD_HOURS,
+    TASK_REMINDER_RESYNC_SECONDS, TASK_REMINDER_GRACE_MINUTES, TASK_EVENTS_CHANNEL
+)
+from database import AsyncSessionLocal, try_advisory_lock
+from dateutils import format_task_date, format_task_time
+from ws_broadcast import create_broadcast_backend
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки лидера планировщика
+REMINDER_LOCK_KEY = 7311002
+# Как часто воркер без лидерства пытается получить блокировку (секунды)
+LEADER_RETRY_SECONDS = 15
+
+SendToUser = Callable[[str, dict], Awaitable[None]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ReminderScheduler:
+    def __init__(self):
+        self.lead = timedelta(minutes=TASK_REMINDER_LEAD_MINUTES)
+        self.lookahead = timedelta(hours=TASK_REMINDER_LOOKAHEAD_HOURS)
+        self.grace = timedelta(minutes=TASK_REMINDER_GRACE_MINUTES)
+        self.is_leader = False
+        self._send_to_user: Optional[SendToUser] = None
+        self._backend = None
+        self._task: Optional[asyncio.Task] = None
+        # Куча (время напоминания, id задачи); актуальное время задачи - в _scheduled,
+        # устаревшие элементы кучи пропускаются при извлечении
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, datetime] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._synced_at: Optional[datetime] = None
+        self._loaded_until: Optional[datetime] = None
+
+    async def start(self, send_to_user: SendToUser):
+        self._send_to_user = send_to_user
+        # Событие создаем в цикле событий приложения, а не при импорте модуля
+        self._wake = asyncio.Event()
+        self._backend = create_broadcast_backend(channel=TASK_EVENTS_CHANNEL)
+        await self._backend.start(self._on_event)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self._backend:
+            await self._backend.stop()
+            self._backend = None
+
+    async def task_changed(self, task_id: int):
+        """Сообщает лидеру (на любом воркере) о создании, изменении или удалении задачи"""
+        if self._backend is None:
+            return
+        try:
+            await self._backend.publish({"type": "task_changed", "task_id": task_id})
+        except Exception as e:
+            logger.error(f"Error publishing task change {task_id}: {e}")
+
+    def stats(self) -> dict:
+        next_reminder = min(self._scheduled.values()) if self._scheduled else None
+        return {
+            "is_leader": self.is_leader,
+            "scheduled": len(self._scheduled),
+            "next_reminder_at": next_reminder.isoformat() if next_reminder else None,
+            "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+        }
+
+    # ----- лидерство -----
+
+    async def _run(self):
+        while True:
+            try:
+                async with try_advisory_lock(REMINDER_LOCK_KEY) as locked:
+                    if locked:
+                        self.is_leader = True
+                        logger.info("Reminder scheduler: this worker is the leader")
+                        await self._lead()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reminder scheduler error: {e}")
+            finally:
+                self.is_leader = False
+                self._reset()
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+
+    def _reset(self):
+        self._heap.clear()
+        self._scheduled.clear()
+        self._synced_at = None
+        self._loaded_until = None
+
+    async def _lead(self):
+        await self._sync()
+        next_sync = _utcnow() + timedelta(seconds=TASK_REMINDER_RESYNC_SECONDS)
+        while True:
+            self._wake.clear()
+            now = _utcnow()
+            due = self._pop_due(now)
+            if due:
+                await self._fire(due)
+
+            if now >= next_sync:
+                await self._sync()
+                next_sync = _utcnow() + timedelta(seconds=TASK_REMINDER_RESYNC_SECONDS)
+
+            # Спим до ближайшего напоминания, синхронизации или изменения задачи
+            wake_at = next_sync
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+            timeout = max((wake_at - _utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # ----- куча -----
+
+    def _schedule(self, task_id: int, starts_at: datetime):
+        remind_at = starts_at - self.lead
+        if self._scheduled.get(task_id) == remind_at:
+            return
+        self._scheduled[task_id] = remind_at
+        heapq.heappush(self._heap, (remind_at, task_id))
+        self._wake.set()
+
+    def _unschedule(self, task_id: int):
+        # Элемент в куче остается и будет пропущен при извлечении
+        self._scheduled.pop(task_id, None)
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            remind_at, task_id = heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) == remind_at:
+                del self._scheduled[task_id]
+                due.append(task_id)
+        return due
+
+    def _is_eligible(self, row, now: datetime) -> bool:
+        return (
+            row.status == "planned"
+            and row.time is not None
+            and row.starts_at is not None
+            and row.reminder_sent_at is None
+            and row.starts_at >= now - self.grace
+        )
+
+    def _apply(self, row, now: datetime):
+        if self._is_eligible(row, now) and row.starts_at <= now + self.lookahead:
+            self._schedule(row.id, row.starts_at)
+        else:
+            self._unschedule(row.id)
+
+    # ----- загрузка -----
+
+    def _columns(self):
+        task = models.Task
+        return select(task.id, task.status, task.time, task.starts_at, task.reminder_sent_at)
+
+    async def _sync(self):
+        """
+        Первая загрузка - все неотправленные напоминания окна; далее - задачи, измененные
+        после прошлой синхронизации, и задачи, вошедшие в окно по времени.
+        """
+        now = _utcnow()
+        window_end = now + self.lookahead
+        task = models.Task
+        query = self._columns().filter(
+            task.starts_at >= now - self.grace,
+            task.starts_at <= window_end
+        )
+        if self._synced_at is not None:
+            query = self._columns().filter(
+                or_(
+                    task.updated_at >= self._synced_at - timedelta(seconds=1),
+                    (task.starts_at > self._loaded_until) & (task.starts_at <= window_end)
+                )
+            )
+        else:
+            query = query.filter(task.status == "planned", task.reminder_sent_at.is_(None))
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+        for row in rows:
+            self._apply(row, now)
+        self._synced_at = now
+        self._loaded_until = window_end
+        logger.debug(f"Reminder scheduler synced {len(rows)} tasks, {len(self._scheduled)} scheduled")
+
+    async def _on_event(self, event: dict):
+        if not self.is_leader or event.get("type") != "task_changed":
+            return
+        task_id = event.get("task_id")
+        try:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(self._columns().filter(models.Task.id == task_id))).first()
+            if row is None:
+                # Задача удалена
+                self._unschedule(task_id)
+            else:
+                self._apply(row, _utcnow())
+            self._wake.set()
+        except Exception as e:
+            logger.error(f"Error reloading task {task_id} for reminders: {e}")
+
+    # ----- отправка -----
+
+    async def _fire(self, task_ids: List[int]):
+        task = models.Task
+        async with AsyncSessionLocal() as db:
+            try:
+                # Помечаем задачи отправленными; задачу, уже помеченную другим воркером, UPDATE не вернет
+                claimed = (await db.execute(
+                    update(task)
+                    .where(
+                        task.id.in_(task_ids),
+                        task.reminder_sent_at.is_(None),
+                        task.status == "planned"
+                    )
+                    .values(reminder_sent_at=func.now())
+                    .returning(task.id, task.title, task.date, task.time, task.created_by_id, task.assigned_to)
+                    .execution_options(synchronize_session=False)
+                )).all()
+
+                notifications = []
+                recipients_by_task = {}
+                for row in claimed:
+                    recipients = {user_id for user_id in (row.created_by_id, row.assigned_to) if user_id}
+                    recipients_by_task[row.id] = recipients
+                    notifications.extend(
+                        {
+                            "user_id": user_id,
+                            "task_id": row.id,
+                            "message": f"Через {TASK_REMINDER_LEAD_MINUTES} минут начинается задача: {row.title}",
+                            "is_read": False,
+                        }
+                        for user_id in recipients
+                    )
+
+                if notifications:
+                    await db.execute(insert(models.Notification), notifications)
+
+                user_ids = {item["user_id"] for item in notifications}
+                emails = {}
+                if user_ids:
+                    emails = dict((await db.execute(
+                        select(models.User.id, models.User.email).filter(models.User.id.in_(user_ids))
+                    )).all())
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Error sending task reminders {task_ids}: {e}")
+                return
+
+        logger.info(f"Sent reminders for {len(claimed)} tasks ({len(notifications)} notifications)")
+
+        # Уведомления уже сохранены - рассылаем подключенным пользователям
+        for row in claimed:
+            message = {
+                "type": "upcoming_task",
+                "task": {
+                    "id": row.id,
+                    "title": row.title,
+                    "time": format_task_time(row.time),
+                    "date": format_task_date(row.date)
+                }
+            }
+            for user_id in recipients_by_task[row.id]:
+                email = emails.get(user_id)
+                if email and self._send_to_user:
+                    try:
+                        await self._send_to_user(email, message)
+                    except Exception as e:
+                        logger.error(f"Error pushing reminder for task {row.id} to {email}: {e}")
+
+
+reminder_scheduler = ReminderScheduler()
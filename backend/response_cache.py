@@ -0,0 +1,283 @@
+"""
+Кэш ответов часто опрашиваемых GET-эндпоинтов (списки вакансий, пользователей, кандидатов HH,
+аналитика) с ETag и ответом 304 Not Modified.
+
+Каждый эндпоинт зависит от набора ресурсов (vacancies, users, ...), у ресурса есть счетчик
+версии. Изменяющий запрос (POST/PUT/PATCH/DELETE) к пути ресурса увеличивает счетчик, событие
+рассылается остальным воркерам через бэкенд ws_broadcast по отдельному каналу. Сохраненный
+ответ отдается, только пока версии его ресурсов не изменились и не истек TTL (TTL ограничивает
+устаревание, если событие с другого воркера потерялось).
+
+Через те же события сбрасываются кэши в памяти воркеров, зависящие от ресурсов (on_change):
+кэши аналитики очищаются после commit изменяющего запроса на всех воркерах. Поэтому версии
+увеличиваются и рассылаются и при RESPONSE_CACHE_ENABLED=false - отключается только хранение ответов.
+
+ETag - хэш тела ответа, поэтому он всегда соответствует отдаваемым данным. Клиент с совпавшим
+If-None-Match получает 304 без тела; браузер при Cache-Control: no-cache сам подставляет ETag.
+Ответы кэшируются отдельно для каждого токена (права и фильтры зависят от пользователя).
+"""
+import hashlib
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from jose import JWTError, jwt
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from auth import SECRET_KEY, ALGORITHM
+from cache import TTLCache
+from config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_CHANNEL
+from ws_broadcast import create_broadcast_backend
+
+logger = logging.getLogger(__name__)
+
+# Кэшируемые GET-эндпоинты и ресурсы, от которых зависит ответ.
+# users входит в каждый набор: от пользователя зависят права, имена создателей и рекрутеров
+CACHED_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "/vacancies/": ("vacancies", "users"),
+    "/users/": ("users",),
+    "/hh-candidates/": ("hh_candidates", "users"),
+    "/analytics/status-history": ("status_history", "users"),
+    "/analytics/monthly-status-history": ("status_history", "users"),
+    "/analytics/funnel": ("status_history", "users"),
+    "/analytics/recruiters": ("vacancies", "users"),
+}
+
+# Изменяющие запросы по префиксу пути -> ресурсы, версии которых увеличиваются
+WRITE_ROUTES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("/vacancies", ("vacancies",)),
+    ("/vacancy-assignments", ("vacancies",)),
+    ("/users", ("users",)),
+    ("/hh-candidates", ("hh_candidates", "status_history")),
+    ("/api/hh/candidates", ("hh_candidates", "status_history")),
+    ("/hh/parse-resumes", ("hh_candidates", "status_history")),
+    ("/applications", ("status_history",)),
+)
+
+# POST-запросы, которые ничего не изменяют
+READ_ONLY_POSTS = {"/api/hh/candidates/check-batch"}
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def _matches(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix.rstrip("/") + "/")
+
+
+def write_resources(method: str, path: str) -> Tuple[str, ...]:
+    """Ресурсы, которые может изменить запрос"""
+    if method in ("GET", "HEAD", "OPTIONS") or path in READ_ONLY_POSTS:
+        return ()
+    resources = []
+    for prefix, names in WRITE_ROUTES:
+        if _matches(path, prefix):
+            resources.extend(name for name in names if name not in resources)
+    return tuple(resources)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение If-None-Match (RFC 9110): W/ не учитывается, * совпадает с любым"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    status_code: int
+    headers: Dict[str, str]
+    media_type: Optional[str]
+    versions: Tuple[int, ...]
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.enabled = enabled
+        self.responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.versions: Dict[str, int] = defaultdict(int)
+        # Обработчики изменения ресурса (например, сброс кэша аналитики)
+        self._listeners: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+        self.not_modified = 0
+        # Отличает свои события от событий других воркеров
+        self._origin = uuid.uuid4().hex
+        self._backend = None
+
+    async def start(self):
+        self._backend = create_broadcast_backend(channel=RESPONSE_CACHE_CHANNEL)
+        await self._backend.start(self._on_event)
+
+    async def stop(self):
+        if self._backend:
+            await self._backend.stop()
+            self._backend = None
+
+    def current_versions(self, resources: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self.versions[name] for name in resources)
+
+    def on_change(self, resource: str, callback: Callable[[], None]):
+        """Вызывать callback на каждом воркере, когда ресурс изменился (после commit изменяющего запроса)"""
+        self._listeners[resource].append(callback)
+
+    def _bump_local(self, resources: Iterable[str]):
+        callbacks = []
+        for name in resources:
+            self.versions[name] += 1
+            callbacks.extend(callback for callback in self._listeners.get(name, ()) if callback not in callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error handling change of {list(resources)}: {e}")
+
+    async def bump(self, resources: Iterable[str]):
+        """Увеличивает версии ресурсов на этом воркере сразу, на остальных - через рассылку"""
+        resources = list(resources)
+        if not resources:
+            return
+        self._bump_local(resources)
+        if self._backend is None:
+            return
+        try:
+            await self._backend.publish({"origin": self._origin, "resources": resources})
+        except Exception as e:
+            logger.error(f"Error publishing response cache invalidation {resources}: {e}")
+
+    async def _on_event(self, event: dict):
+        if event.get("origin") != self._origin:
+            self._bump_local(event.get("resources", []))
+
+    @staticmethod
+    def cache_key(request: Request, token: str) -> Tuple:
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        return (request.url.path, tuple(sorted(request.query_params.multi_items())), token_hash)
+
+    def get(self, key: Tuple, resources: Tuple[str, ...]) -> Optional[CachedResponse]:
+        entry = self.responses.get_entry(key)
+        if entry is None:
+            self.responses.misses += 1
+            return None
+        if entry.value.versions != self.current_versions(resources):
+            # Ресурс изменился после сохранения ответа
+            self.responses.delete(key)
+            self.responses.misses += 1
+            return None
+        self.responses.hits += 1
+        return entry.value
+
+    def set(self, key: Tuple, cached: CachedResponse):
+        self.responses.set(key, cached)
+
+    def stats(self) -> Dict:
+        return {
+            **self.responses.stats(),
+            "not_modified": self.not_modified,
+            "versions": dict(self.versions),
+        }
+
+
+def _bearer_token(request: Request) -> Optional[str]:
+    """Токен из Authorization, если он действителен (подпись и срок); иначе запрос идет мимо кэша"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return token
+
+
+def _wants_refresh(request: Request) -> bool:
+    return request.query_params.get("refresh", "").lower() in ("1", "true", "yes")
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, cache: ResponseCache):
+        super().__init__(app)
+        self.cache = cache
+
+    async def dispatch(self, request: Request, call_next):
+        path, method = request.url.path, request.method
+        changed = write_resources(method, path)
+        if changed:
+            return await self._write(request, call_next, changed)
+        if not self.cache.enabled:
+            return await call_next(request)
+
+        resources = CACHED_ROUTES.get(path)
+        token = _bearer_token(request) if resources and method == "GET" else None
+        if token is None:
+            return await call_next(request)
+
+        key = self.cache.cache_key(request, token)
+        if_none_match = request.headers.get("if-none-match")
+        cached = None if _wants_refresh(request) else self.cache.get(key, resources)
+        if cached is not None:
+            return self._respond(cached, if_none_match, "HIT")
+
+        # Версии до выполнения запроса: если ресурс изменится во время запроса,
+        # ответ сохранится со старыми версиями и не будет отдан повторно
+        versions = self.cache.current_versions(resources)
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in ("content-length", "etag", "cache-control")
+        }
+        cached = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            status_code=response.status_code,
+            headers=headers,
+            media_type=response.media_type,
+            versions=versions
+        )
+        self.cache.set(key, cached)
+        return self._respond(cached, if_none_match, "MISS")
+
+    async def _write(self, request: Request, call_next, resources: Tuple[str, ...]):
+        try:
+            response = await call_next(request)
+        except Exception:
+            await self.cache.bump(resources)
+            raise
+
+        # Версии увеличиваются, когда тело ответа сформировано, но еще не отправлено до конца:
+        # к этому моменту изменения зафиксированы, в том числе у потокового ответа
+        # (пакетный импорт пишет в БД по ходу ответа), а клиент еще не получил ответ целиком
+        body_iterator = response.body_iterator
+
+        async def bump_when_done():
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                await self.cache.bump(resources)
+
+        response.body_iterator = bump_when_done()
+        return response
+
+    def _respond(self, cached: CachedResponse, if_none_match: Optional[str], cache_status: str) -> Response:
+        headers = {"ETag": cached.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization", "X-Cache": cache_status}
+        if etag_matches(if_none_match, cached.etag):
+            self.cache.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=cached.body,
+            status_code=cached.status_code,
+            headers={**cached.headers, **headers},
+            media_type=cached.media_type
+        )
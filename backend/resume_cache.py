@@ -0,0 +1,167 @@
+"""
+Кэш разобранных резюме по SHA-256 содержимого.
+
+Одно и то же резюме приходит из бота, через /hh/parse-resume и из расширения HH.
+Файл с одинаковым содержимым хранится в RESUME_DIR один раз под именем <sha256>.<расширение>,
+а извлеченный текст и поля - в таблице parsed_resumes вместе с версией парсера.
+Повторная загрузка не запускает разбор; записи, которыми давно не пользовались,
+вытесняются при превышении RESUME_CACHE_MAX_ENTRIES.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import delete, func, select
+
+import models
+from config import RESUME_DIR, RESUME_CACHE_MAX_ENTRIES
+from database import AsyncSessionLocal
+from resume_parser import PARSER_VERSION, get_extension, resume_parser_pool
+
+logger = logging.getLogger(__name__)
+
+# Вытеснение запускается, когда записей больше лимита на эту долю, чтобы не чистить на каждой вставке
+EVICTION_SLACK = 0.1
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(file_path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hashed_file_name(sha256: str, extension: str) -> str:
+    return f"{sha256}.{extension.lower().lstrip('.')}"
+
+
+def store_resume_content(content: bytes, extension: str) -> Tuple[str, str]:
+    """
+    Сохраняет содержимое резюме в RESUME_DIR, если такого файла еще нет.
+    Возвращает (sha256, имя файла в RESUME_DIR).
+    """
+    sha256 = content_hash(content)
+    file_name = hashed_file_name(sha256, extension)
+    target = RESUME_DIR / file_name
+    if not target.exists():
+        # Пишем во временный файл и атомарно переименовываем, чтобы параллельные загрузки не видели обрезанный файл
+        handle, temp_path = tempfile.mkstemp(dir=str(RESUME_DIR), suffix=".part")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return sha256, file_name
+
+
+def store_resume_file(file_path) -> Tuple[str, str]:
+    """
+    Переносит уже сохраненный файл резюме под имя по хэшу содержимого.
+    Если такое содержимое уже есть, копия удаляется. Возвращает (sha256, имя файла в RESUME_DIR).
+    """
+    file_path = Path(file_path)
+    sha256 = file_hash(file_path)
+    file_name = hashed_file_name(sha256, get_extension(file_path.name))
+    target = RESUME_DIR / file_name
+    if file_path.resolve() == target.resolve():
+        return sha256, file_name
+    if target.exists():
+        file_path.unlink()
+    else:
+        os.replace(file_path, target)
+    return sha256, file_name
+
+
+async def count_resume_references(db, file_name: str) -> int:
+    """
+    Сколько заявок и кандидатов HH ссылаются на файл резюме. Файл по хэшу может быть общим:
+    у заявок хранится имя файла, у кандидатов HH - путь resumes/<файл>
+    """
+    paths = [file_name, f"resumes/{file_name}"]
+    total = 0
+    for model in (models.Application, models.HHCandidate):
+        total += (await db.execute(
+            select(func.count()).select_from(model).filter(model.resume_file_path.in_(paths))
+        )).scalar_one()
+    return total
+
+
+async def save_resume(content: bytes, extension: str) -> Tuple[str, str]:
+    return await asyncio.to_thread(store_resume_content, content, extension)
+
+
+async def get_parsed_resume(sha256: str, file_path) -> Dict[str, Any]:
+    """
+    Возвращает разобранное резюме из кэша или разбирает файл в пуле процессов и кэширует результат.
+    Результат - поля резюме, текст в ключе "text" и признак попадания в кэш в ключе "cached".
+    """
+    async with AsyncSessionLocal() as db:
+        entry = await db.get(models.ParsedResume, sha256)
+        if entry is not None and entry.parser_version == PARSER_VERSION:
+            entry.last_used_at = func.now()
+            entry.hit_count = (entry.hit_count or 0) + 1
+            await db.commit()
+            return {**(entry.fields or {}), "text": entry.text or "", "cached": True}
+
+    parsed = await resume_parser_pool.parse_file(str(file_path))
+    text = parsed.pop("text")
+
+    async with AsyncSessionLocal() as db:
+        entry = await db.get(models.ParsedResume, sha256)
+        if entry is None:
+            entry = models.ParsedResume(sha256=sha256, hit_count=0)
+            db.add(entry)
+        entry.parser_version = PARSER_VERSION
+        entry.file_name = Path(file_path).name
+        entry.file_size = os.path.getsize(file_path)
+        entry.text = text
+        entry.fields = parsed
+        entry.last_used_at = func.now()
+        try:
+            await db.commit()
+        except Exception as e:
+            # Параллельная загрузка того же файла уже записала результат
+            logger.warning(f"Could not cache parsed resume {sha256}: {e}")
+            await db.rollback()
+        else:
+            await evict_lru(db)
+
+    return {**parsed, "text": text, "cached": False}
+
+
+async def get_parsed_resume_for_path(file_path) -> Dict[str, Any]:
+    """То же для уже сохраненного файла (например, при переиндексации старых резюме)"""
+    sha256 = await asyncio.to_thread(file_hash, file_path)
+    return await get_parsed_resume(sha256, file_path)
+
+
+async def evict_lru(db):
+    """Удаляет давно не использованные записи кэша сверх RESUME_CACHE_MAX_ENTRIES"""
+    total = (await db.execute(select(func.count()).select_from(models.ParsedResume))).scalar_one()
+    if total <= RESUME_CACHE_MAX_ENTRIES * (1 + EVICTION_SLACK):
+        return
+
+    stale = (
+        select(models.ParsedResume.sha256)
+        .order_by(models.ParsedResume.last_used_at.asc())
+        .limit(total - RESUME_CACHE_MAX_ENTRIES)
+    )
+    await db.execute(
+        delete(models.ParsedResume)
+        .where(models.ParsedResume.sha256.in_(stale))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    logger.info(f"Evicted {total - RESUME_CACHE_MAX_ENTRIES} parsed resumes from cache")
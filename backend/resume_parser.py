@@ -0,0 +1,884 @@
+"""
+Разбор резюме: извлечение текста из PDF/DOC/DOCX и поиск полей (ФИО, телефон,
+должность, образование, опыт, языки).
+
+Разбор занимает процессор на секунды, поэтому выполняется в отдельных процессах
+(ResumeParserPool), а не в event loop FastAPI. Функции модуля верхнего уровня
+вызываются в дочерних процессах, поэтому модуль не должен импортировать main/database.
+"""
+import asyncio
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+import PyPDF2
+import docx
+
+from config import (
+    RESUME_PARSER_WORKERS, RESUME_PARSER_TIMEOUT, RESUME_PARSER_MAX_QUEUE, RESUME_MAX_FILE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Форматы резюме, которые умеет разбирать парсер
+SUPPORTED_RESUME_EXTENSIONS = ("pdf", "doc", "docx")
+
+# Версия логики разбора. Увеличьте при изменении извлечения текста или поиска полей,
+# чтобы закэшированные результаты (resume_cache) были разобраны заново
+PARSER_VERSION = 1
+
+
+class ResumeParseError(Exception):
+    """Резюме не удалось разобрать"""
+
+
+class UnsupportedResumeFormat(ResumeParseError):
+    pass
+
+
+class ResumeTooLarge(ResumeParseError):
+    pass
+
+
+class ResumeParseTimeout(ResumeParseError):
+    pass
+
+
+class ResumeParserBusy(ResumeParseError):
+    """Очередь на разбор переполнена"""
+
+
+def get_extension(filename: str) -> str:
+    return str(filename).rsplit('.', 1)[-1].lower()
+
+
+def extract_text_from_pdf(file_path):
+    """Извлекает текст из PDF файла"""
+    text = ""
+    try:
+        print("Начинаем извлечение текста из PDF")
+        with open(file_path, 'rb') as file:
+            pdf = PyPDF2.PdfReader(file)
+            print(f"Количество страниц в PDF: {len(pdf.pages)}")
+            for i, page in enumerate(pdf.pages, 1):
+                page_text = page.extract_text()
+                print(f"Страница {i}: извлечено {len(page_text)} символов")
+                text += page_text + "\n"
+        return text
+    except Exception as e:
+        print(f"Ошибка при извлечении текста из PDF: {str(e)}")
+        raise
+
+def extract_text_from_doc(file_path):
+    """Извлекает текст из DOC/DOCX файла"""
+    text = ""
+    try:
+        print("Начинаем извлечение текста из Word документа")
+        doc = docx.Document(file_path)
+        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        print(f"Извлечено {len(text)} символов из Word документа")
+        return text
+    except Exception as e:
+        print(f"Ошибка при извлечении текста из Word: {str(e)}")
+        raise
+
+def extract_resume_text(file_path) -> str:
+    """Текст резюме для поискового индекса; пустая строка, если формат не поддерживается или файл не читается"""
+    extension = get_extension(file_path)
+    try:
+        if extension == "pdf":
+            return extract_text_from_pdf(file_path)
+        if extension in ("doc", "docx"):
+            return extract_text_from_doc(file_path)
+    except Exception as e:
+        logging.error(f"Не удалось извлечь текст резюме {file_path}: {str(e)}")
+    return ""
+
+def is_name_word(word):
+    # Проверяем, что слово начинается с заглавной буквы и содержит только буквы
+    return (len(word) > 1 and 
+            word[0].isupper() and 
+            any(c.islower() for c in word[1:]) and
+            all(c.isalpha() or c.isspace() for c in word))
+
+def name_probability(text):
+    # Увеличиваем вероятность, если текст похож на полное имя
+    words = text.strip().split()
+    if not words:
+        return 0.0
+    
+    # Проверяем каждое слово на соответствие формату имени
+    valid_words = [w for w in words if is_name_word(w)]
+    
+    probability = 0.0
+    if len(valid_words) >= 2:  # Имя и Фамилия минимум
+        probability = 0.5
+    if len(valid_words) >= 3:  # Полное имя
+        probability = 0.8
+    
+    # Дополнительные проверки
+    if any(marker in text.lower() for marker in ['резюме', 'анкета', 'фио']):
+        probability += 0.1
+    
+    return min(1.0, probability)
+
+def clean_full_name(text):
+    if not text or not isinstance(text, str):
+        return None
+    
+    # Список маркеров, которые нужно удалить
+    markers = ['резюме обновлено', 'резюме', 'анкета', 'фио', '•']
+    
+    # Преобразуем текст в нижний регистр для поиска маркеров
+    lower_text = text.lower()
+    
+    # Очищаем от маркеров
+    for marker in markers:
+        if marker in lower_text:
+            # Найдем индекс маркера в исходном тексте (с учетом регистра)
+            marker_index = lower_text.find(marker)
+            marker_length = len(marker)
+            
+            # Получаем текст после маркера
+            text = text[marker_index + marker_length:].strip()
+            lower_text = text.lower()  # Обновляем и нижний регистр
+    
+    # Удаление дат и времени (например, "13 января 2025 в 21:17")
+    text = re.sub(r'\d{1,2}\s+[а-я]+\s+\d{4}(?:\s+в\s+\d{1,2}:\d{2})?', '', text, flags=re.IGNORECASE).strip()
+    
+    # Ищем в тексте шаблон имени "Имя Отчество Фамилия" или "Фамилия Имя Отчество"
+    name_pattern = r'([А-Я][а-я]+(?:-[А-Я][а-я]+)?\s+[А-Я][а-я]+(?:-[А-Я][а-я]+)?\s+[А-Я][а-я]+(?:-[А-Я][а-я]+)?)'
+    name_match = re.search(name_pattern, text)
+    
+    if name_match:
+        return name_match.group(1)
+    
+    # Если имя не найдено по шаблону, проверяем, содержит ли текст только имя (без лишних символов)
+    # Удаляем все цифры, знаки препинания и лишние пробелы
+    cleaned_text = re.sub(r'[0-9.,;:!?()"\']', '', text).strip()
+    words = cleaned_text.split()
+    
+    # Проверяем, что все слова начинаются с заглавной буквы (как имена)
+    if 2 <= len(words) <= 3 and all(word[0].isupper() for word in words if word):
+        return ' '.join(words)
+    
+    return None
+
+def extract_birth_date(text):
+    """Извлекает дату рождения из текста резюме"""
+    if not text:
+        return None
+    
+    print("Начинаем поиск даты рождения...")
+    
+    # Преобразуем текст в список строк
+    lines = text.split('\n')
+    candidate_date = None
+    
+    # Список ключевых слов для поиска даты рождения
+    birth_keywords = ['родился', 'родилась', 'дата рождения', 'год рождения', 'день рождения']
+    month_names = {
+        'января': '01', 'февраля': '02', 'марта': '03', 'апреля': '04',
+        'мая': '05', 'июня': '06', 'июля': '07', 'августа': '08',
+        'сентября': '09', 'октября': '10', 'ноября': '11', 'декабря': '12',
+        'янв': '01', 'фев': '02', 'мар': '03', 'апр': '04',
+        'май': '05', 'июн': '06', 'июл': '07', 'авг': '08',
+        'сен': '09', 'окт': '10', 'ноя': '11', 'дек': '12'
+    }
+    
+    # Шаг 1: Сначала ищем строки, содержащие ключевые слова
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Проверяем наличие ключевых слов
+        line_lower = line.lower()
+        if any(keyword in line_lower for keyword in birth_keywords):
+            print(f"Найдена строка с возможной датой рождения (строка {i+1}): {line}")
+            
+            # Расширенные паттерны для различных форматов дат
+            patterns = [
+                # "родился 3 марта 1998" или "родилась 29 сентября 1892"
+                r'род(?:ился|илась)[^\d]*(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})',
+                
+                # "родился 03.03.1998"
+                r'род(?:ился|илась)[^\d]*(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
+                
+                # Извлечение возраста и даты из формата "Мужчина, 30 лет, родился 1 января 1990"
+                r'(?:.*?,\s*\d+\s*(?:год|лет|года)[^\d]*)[^\d]*род(?:ился|илась)[^\d]*(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})',
+                
+                # "дата рождения: 03.03.1998"
+                r'(?:дата|день|год)\s+рождения[\s:]+(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
+                
+                # "дата рождения: 3 марта 1998"
+                r'(?:дата|день|год)\s+рождения[\s:]+(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})',
+                
+                # Общий формат "DD.MM.YYYY" или "DD/MM/YYYY" после ключевых слов
+                r'[^\d]*(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
+                
+                # Формат "DD месяц YYYY" после ключевых слов
+                r'[^\d]*(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})'
+            ]
+            
+            for pattern in patterns:
+                match = re.search(pattern, line, re.IGNORECASE)
+                if match:
+                    print(f"Паттерн '{pattern}' сработал!")
+                    if len(match.groups()) == 3:
+                        day, month, year = match.groups()
+                        print(f"Извлечено: день={day}, месяц={month}, год={year}")
+                        
+                        # Если месяц - слово, преобразуем его в число
+                        if not month.isdigit():
+                            month_lower = month.lower()
+                            if month_lower in month_names:
+                                month = month_names[month_lower]
+                                print(f"Преобразовали месяц '{month_lower}' в '{month}'")
+                            else:
+                                print(f"Неизвестный месяц: '{month}'")
+                                # Если месяц не распознан, продолжаем поиск
+                                continue
+                        
+                        # Нормализуем день и месяц (добавляем ведущий ноль)
+                        day = day.zfill(2)
+                        month = month.zfill(2)
+                        
+                        # Проверяем валидность даты
+                        try:
+                            # Создаем объект datetime для проверки
+                            date_obj = datetime(int(year), int(month), int(day))
+                            
+                            # Проверяем, что год рождения реалистичен (между 1900 и текущим годом)
+                            current_year = datetime.now().year
+                            if 1900 <= int(year) <= current_year:
+                                print(f"Найдена дата рождения: {day}.{month}.{year}")
+                                return f"{day}.{month}.{year}"
+                        except ValueError:
+                            # Невалидная дата, продолжаем поиск
+                            continue
+    
+    # Шаг 2: Если не нашли по ключевым словам, ищем даты во всех строках
+    print("Поиск дат рождения во всех строках...")
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Те же паттерны, что и выше, но без привязки к ключевым словам о рождении
+        date_patterns = [
+            r'(\d{1,2})[\.\/](\d{1,2})[\.\/](\d{4})',
+            r'(\d{1,2})\s+([а-яА-Я]+)\s+(\d{4})'
+        ]
+        
+        for pattern in date_patterns:
+            match = re.search(pattern, line, re.IGNORECASE)
+            if match:
+                print(f"Найдена потенциальная дата в строке {i+1}: {line}")
+                if len(match.groups()) == 3:
+                    day, month, year = match.groups()
+                    print(f"Извлечено: день={day}, месяц={month}, год={year}")
+                    
+                    # Преобразование месяца-слова в число, если необходимо
+                    if not month.isdigit():
+                        month_lower = month.lower()
+                        if month_lower in month_names:
+                            month = month_names[month_lower]
+                        else:
+                            continue
+                    
+                    day = day.zfill(2)
+                    month = month.zfill(2)
+                    
+                    try:
+                        date_obj = datetime(int(year), int(month), int(day))
+                        current_year = datetime.now().year
+                        
+                        # Для дат без контекста быть строже - очень вероятно, что это не дата рождения
+                        if 1940 <= int(year) <= current_year - 18:  # Предполагаем, что кандидату не меньше 18 лет
+                            print(f"Найдена потенциальная дата рождения: {day}.{month}.{year}")
+                            candidate_date = f"{day}.{month}.{year}"
+                    except ValueError:
+                        continue
+    
+    return candidate_date
+
+def clean_phone(text):
+    """Очищает и форматирует телефонный номер"""
+    if not text:
+        return None
+    
+    # Проверяем, что строка не содержит нежелательные тексты
+    unwanted_texts = ['желательное время', 'не имеет значения', 'занятость', 'опыт работы']
+    for unwanted in unwanted_texts:
+        if unwanted.lower() in text.lower():
+            return None
+    
+    # Шаблоны для поиска номеров телефонов
+    phone_patterns = [
+        r'\+?\d{1,3}\s?\(?\d{2,3}\)?\s?\d{3}[\s-]?\d{2}[\s-]?\d{2}',  # +998 (99) 999-99-99 или 998 99 999 99 99
+        r'\d{2,3}[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}',  # 99 999 99 99
+        r'\+?\d{10,12}'  # +998999999999 или 998999999999
+    ]
+    
+    # Ищем телефоны по шаблонам
+    for pattern in phone_patterns:
+        matches = re.findall(pattern, text)
+        if matches:
+            # Берем первое совпадение
+            phone = matches[0]
+            
+            # Удаляем все нецифровые символы, кроме '+'
+            cleaned = ''.join(c for c in phone if c.isdigit() or c == '+')
+            
+            # Проверяем длину номера после очистки
+            if len(cleaned) >= 9:  # Минимальная длина для номера
+                # Форматируем номер в стандартный вид
+                if cleaned.startswith('+'):
+                    # Уже есть префикс
+                    pass
+                elif len(cleaned) >= 12:
+                    # Добавляем префикс '+' к длинному номеру
+                    cleaned = '+' + cleaned
+                elif len(cleaned) >= 9 and len(cleaned) <= 11:
+                    # Это вероятно номер без кода страны, добавляем +998
+                    cleaned = '+998' + cleaned[-9:]
+                
+                # Проверяем, что номер начинается с +998 (Узбекистан) или другого валидного префикса
+                # Если номер не начинается с +, добавим +
+                if not cleaned.startswith('+'):
+                    cleaned = '+' + cleaned
+                
+                # Форматируем номер для удобочитаемости (если это номер Узбекистана)
+                if cleaned.startswith('+998') and len(cleaned) >= 12:
+                    formatted = f"+998 ({cleaned[4:6]}) {cleaned[6:9]}-{cleaned[9:11]}-{cleaned[11:13]}"
+                    return formatted
+                
+                return cleaned
+    
+    return None
+
+def extract_education(text):
+    """Извлекает информацию об образовании"""
+    education_data = []
+    education_markers = ['образование', 'учебное заведение', 'университет', 'институт', 'колледж']
+    
+    current_entry = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Ищем год
+        year_match = re.search(r'\b(19|20)\d{2}\b', line)
+        
+        # Ищем учебное заведение
+        is_education_line = any(marker.lower() in line.lower() for marker in education_markers)
+        
+        if year_match or is_education_line:
+            if current_entry and (year_match or is_education_line):
+                education_data.append(current_entry.copy())
+                current_entry = {}
+            
+            if year_match:
+                current_entry['year'] = year_match.group(0)
+            
+            # Очищаем строку от года для извлечения названия
+            institution = re.sub(r'\b(19|20)\d{2}\b', '', line).strip()
+            if institution and is_education_line:
+                current_entry['institution'] = institution
+    
+    if current_entry:
+        education_data.append(current_entry)
+    
+    return education_data
+
+def extract_experience(text):
+    experience_data = []
+    experience_started = False
+    current_entry = {}
+    
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+            
+        if 'опыт работы' in line.lower():
+            experience_started = True
+            # Извлекаем общий стаж
+            match = re.search(r'(\d+)\s*(?:год|лет|года).*?(\d+)\s*(?:месяц|месяца|месяцев)?', line)
+            if match:
+                years, months = match.groups()
+                current_entry['total_experience'] = f"{years} лет {months} месяцев"
+            continue
+            
+        if experience_started:
+            if 'образование' in line.lower() or 'навыки' in line.lower():
+                break
+                
+            # Ищем даты
+            date_match = re.search(r'([А-Яа-я]+\s+\d{4})\s*[—–-]\s*([А-Яа-я]+\s+\d{4}|настоящее время)', line)
+            if date_match:
+                if current_entry:
+                    experience_data.append(current_entry)
+                current_entry = {'period': f"{date_match.group(1)} - {date_match.group(2)}"}
+                
+            # Ищем компанию
+            if 'ооо' in line.lower() or 'компания' in line.lower() or 'фирма' in line.lower():
+                current_entry['company'] = line
+                
+            # Ищем должность
+            if any(pos in line.lower() for pos in ['менеджер', 'специалист', 'руководитель', 'директор']):
+                current_entry['position'] = line
+                
+    if current_entry:
+        experience_data.append(current_entry)
+        
+    return experience_data
+
+def extract_skills(text):
+    # Implementation of extract_skills function
+    # This function should return a list of skills extracted from the text
+    # For now, we'll return an empty list
+    return []
+
+def extract_languages(text):
+    """Извлекает информацию о языках"""
+    languages = []
+    language_markers = ['язык', 'languages', 'владение языками']
+    language_levels = {
+        'a1': 'начальный',
+        'a2': 'элементарный',
+        'b1': 'средний',
+        'b2': 'выше среднего',
+        'c1': 'продвинутый',
+        'c2': 'в совершенстве',
+        'native': 'родной',
+        'свободно': 'в совершенстве'
+    }
+    
+    in_language_section = False
+    seen_languages = set()
+    
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+            
+        # Определяем начало секции языков
+        if any(marker.lower() in line.lower() for marker in language_markers):
+            in_language_section = True
+            continue
+            
+        if in_language_section:
+            # Проверяем, не начался ли новый раздел
+            if any(marker in line.lower() for marker in ['опыт работы', 'образование', 'навыки']):
+                break
+                
+            # Извлекаем язык и уровень
+            parts = line.split('—')
+            if len(parts) >= 2:
+                language = parts[0].strip()
+                level = parts[-1].strip()
+                
+                # Проверяем, не видели ли мы уже этот язык
+                if language.lower() not in seen_languages:
+                    seen_languages.add(language.lower())
+                    languages.append({
+                        'language': language,
+                        'level': level
+                    })
+    
+    return languages
+
+def detect_resume_fields(text: str) -> Dict[str, Any]:
+    """Ищет в тексте резюме ФИО, должность, дату рождения, контакты, образование, опыт и языки"""
+    # Разбиваем текст на строки и убираем пустые
+    lines = text.split('\n')
+    non_empty_lines = [line.strip() for line in lines if line.strip()]
+    print(f"\nКоличество непустых строк: {len(non_empty_lines)}")
+    
+    # Поиск ФИО
+    print("\n=== Поиск ФИО ===")
+    names = []
+    print("Проверяем первые 15 строк:")
+    
+    # Сначала проверяем первую строку документа - часто содержит ФИО без маркеров
+    if non_empty_lines and len(non_empty_lines) > 0:
+        first_line = non_empty_lines[0].strip()
+        print(f"Проверка первой строки на ФИО: {first_line}")
+        
+        # Шаблон для имени: "Фамилия Имя Отчество"
+        name_pattern = r'^[А-Я][а-я]+\s+[А-Я][а-я]+(?:\s+[А-Я][а-я]+)?$'
+        if re.match(name_pattern, first_line):
+            print(f"Найдено ФИО в первой строке: {first_line}")
+            names.append((first_line, 0.95))  # Высокая вероятность, если имя в первой строке
+    
+    # Затем ищем с использованием маркеров
+    for i, line in enumerate(non_empty_lines[:15], 1):
+        print(f"Строка {i}: {line}")
+        
+        # Проверяем наличие маркеров
+        for marker in ['резюме', 'анкета', 'фио']:
+            if marker in line.lower():
+                print(f"Найден маркер '{marker}' в строке: {line}")
+                cleaned_name = clean_full_name(line)
+                if cleaned_name:
+                    names.append((cleaned_name, 0.9))
+    
+    # Выбираем наиболее вероятное имя
+    if names:
+        most_probable_name = max(names, key=lambda x: x[1])
+        print(f"Найдено наиболее вероятное ФИО: {most_probable_name[0]} (вероятность: {most_probable_name[1]})")
+    else:
+        print("ФИО не найдено в документе")
+    
+    # Поиск должности
+    print("\n=== Поиск должности ===")
+    positions = []
+    
+    for i, line in enumerate(non_empty_lines):
+        line_lower = line.lower()
+        
+        if 'желаемая должность' in line_lower:
+            print(f"\nНайден маркер 'желаемая должность' в строке {i+1}:")
+            print(f"Полная строка: {line}")
+            # Извлекаем текст после маркера
+            position_text = None
+            
+            # Проверяем, не содержит ли уже текущая строка должность
+            marker_position = line_lower.find('желаемая должность')
+            remaining_text = line[marker_position + len('желаемая должность'):].strip()
+            unwanted_phrases = ['и зарплата', 'зарплата', 'занятость', 'график']
+            
+            if remaining_text and len(remaining_text) > 2 and not any(phrase in remaining_text.lower() for phrase in unwanted_phrases):
+                position_text = remaining_text
+                print(f"Извлеченный текст после маркера 'желаемая должность': '{position_text}'")
+            
+            # Если должность не найдена в текущей строке, проверяем следующую строку
+            if not position_text and i + 1 < len(non_empty_lines):
+                next_line = non_empty_lines[i + 1].strip()
+                # Проверяем, что следующая строка не содержит нежелательные фразы
+                if next_line and len(next_line) > 2 and not any(phrase in next_line.lower() for phrase in unwanted_phrases):
+                    print(f"Следующая строка (содержит должность): '{next_line}'")
+                    position_text = next_line
+            
+            if position_text:
+                positions.append((position_text, 0.9))
+        
+        elif 'должность' in line_lower and 'желаемая' not in line_lower:
+            print(f"\nНайден маркер 'должность' в строке {i+1}:")
+            print(f"Полная строка: {line}")
+            # Извлекаем текст после маркера
+            marker_position = line_lower.find('должность')
+            remaining_text = line[marker_position + len('должность'):].strip()
+            # Проверяем, что оставшийся текст не содержит нежелательные фразы
+            unwanted_phrases = ['и зарплата', 'зарплата', 'занятость', 'график']
+            if remaining_text and len(remaining_text) > 2 and not any(phrase in remaining_text.lower() for phrase in unwanted_phrases):
+                print(f"Извлеченный текст после маркера: '{remaining_text}'")
+                positions.append((remaining_text, 0.7))
+            elif i + 1 < len(non_empty_lines):
+                next_line = non_empty_lines[i + 1].strip()
+                # Проверяем, что следующая строка не содержит нежелательные фразы
+                if next_line and len(next_line) > 2 and not any(phrase in next_line.lower() for phrase in unwanted_phrases):
+                    print(f"Следующая строка (содержит должность): '{next_line}'")
+                    positions.append((next_line, 0.9))
+    
+    if positions:
+        most_probable_position = max(positions, key=lambda x: x[1])
+        print(f"Итоговая найденная должность: {most_probable_position[0]} (вероятность: {most_probable_position[1]})")
+    else:
+        print("Должность не найдена")
+    
+    # Поиск даты рождения
+    print("\n=== Поиск даты рождения ===")
+    birth_date = extract_birth_date(text)
+    
+    # Поиск телефона
+    print("\n=== Поиск телефона ===")
+    phone = None
+    
+    # Проверяем первые 20 строк на наличие телефона
+    for i, line in enumerate(non_empty_lines[:20]):
+        if any(marker in line.lower() for marker in ['тел', 'моб', 'phone', '+', '998']):
+            print(f"Найдена строка с возможным телефоном ({i+1}): {line}")
+            # Очищаем телефон
+            cleaned_phone = clean_phone(line)
+            if cleaned_phone:
+                phone = cleaned_phone
+                print(f"Извлечен телефон: {phone}")
+                break
+    
+    # Если телефон не найден, ищем числа похожие на телефон в первых 20 строках
+    if not phone:
+        for i, line in enumerate(non_empty_lines[:20]):
+            if re.search(r'\d{3,}', line):
+                print(f"Найдена строка с цифрами ({i+1}): {line}")
+                cleaned_phone = clean_phone(line)
+                if cleaned_phone:
+                    phone = cleaned_phone
+                    print(f"Извлечен телефон: {phone}")
+                    break
+    
+    # Поиск email
+    print("\n=== Поиск email ===")
+    email = None
+    # Стандартный шаблон для email
+    simple_email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+    # Шаблон для email с пробелами
+    spaced_email_pattern = r'[a-zA-Z0-9._%+-]+\s*@\s*[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+    
+    # Сначала ищем в первых 20 строках
+    for i, line in enumerate(non_empty_lines[:20]):
+        # Проверяем стандартный шаблон
+        email_matches = re.findall(simple_email_pattern, line)
+        if email_matches:
+            email = email_matches[0]
+            print(f"Найден email (стандартный шаблон): {email}")
+            break
+        
+        # Проверяем шаблон с пробелами
+        spaced_matches = re.findall(spaced_email_pattern, line)
+        if spaced_matches:
+            # Удаляем пробелы из найденного email
+            email = re.sub(r'\s+', '', spaced_matches[0])
+            print(f"Найден email с пробелами: {spaced_matches[0]}, очищенный: {email}")
+            break
+    
+    # Если email не найден, ищем строки с маркерами email
+    if not email:
+        email_markers = ['email', 'e-mail', 'почта', 'электронная почта', 'электронный адрес']
+        for i, line in enumerate(non_empty_lines[:20]):
+            line_lower = line.lower()
+            if any(marker in line_lower for marker in email_markers):
+                print(f"Найдена строка с маркером email ({i+1}): {line}")
+                
+                # Ищем стандартный email в этой строке
+                email_matches = re.findall(simple_email_pattern, line)
+                if email_matches:
+                    email = email_matches[0]
+                    print(f"Найден email после маркера: {email}")
+                    break
+                
+                # Ищем email с пробелами
+                spaced_matches = re.findall(spaced_email_pattern, line)
+                if spaced_matches:
+                    email = re.sub(r'\s+', '', spaced_matches[0])
+                    print(f"Найден email с пробелами после маркера: {email}")
+                    break
+                
+                # Проверяем следующую строку, если текущая строка только содержит маркер
+                if i + 1 < len(non_empty_lines):
+                    next_line = non_empty_lines[i + 1]
+                    email_matches = re.findall(simple_email_pattern, next_line)
+                    if email_matches:
+                        email = email_matches[0]
+                        print(f"Найден email в следующей строке: {email}")
+                        break
+                    
+                    spaced_matches = re.findall(spaced_email_pattern, next_line)
+                    if spaced_matches:
+                        email = re.sub(r'\s+', '', spaced_matches[0])
+                        print(f"Найден email с пробелами в следующей строке: {email}")
+                        break
+    
+    # Поиск образования
+    print("\n=== Поиск образования ===")
+    education = extract_education(text)
+    print("Найдена информация об образовании:")
+    for entry in education:
+        for key, value in entry.items():
+            print(f"  {key}: {value}")
+    
+    # Поиск опыта работы
+    print("\n=== Поиск опыта работы ===")
+    experience = extract_experience(text)
+    print("Найдена информация об опыте работы:")
+    for entry in experience:
+        for key, value in entry.items():
+            print(f"  {key}: {value}")
+    
+    # Поиск навыков
+    print("\n=== Поиск навыков ===")
+    skills = extract_skills(text)
+    print("Найдена информация о навыках:")
+    for skill in skills:
+        print(f"  {skill}")
+    
+    # Поиск языков
+    print("\n=== Поиск языков ===")
+    languages = extract_languages(text)
+    print("Найдена информация о языках:")
+    for lang in languages:
+        print(f"  {lang['language']} — {lang['level']}")
+
+    return {
+        "full_name": names[0][0] if names else "Не распознано",
+        "birth_date": birth_date or "Не указана",
+        "phone": phone or "Не указан",
+        "position": positions[0][0] if positions else "Не распознана",
+        "email": email,
+        # Дополнительные данные для отладки
+        "names": names,
+        "positions": positions,
+        "education": education,
+        "experience": experience,
+        "skills": skills,
+        "languages": languages,
+        "lines_count": len(non_empty_lines),
+    }
+
+
+def parse_resume_file(file_path: str) -> Dict[str, Any]:
+    """
+    Извлекает текст из файла резюме и разбирает поля. Выполняется в процессе пула.
+    Возвращает поля резюме и исходный текст в ключе "text".
+    """
+    extension = get_extension(file_path)
+    if extension == "pdf":
+        text = extract_text_from_pdf(file_path)
+    elif extension in ("doc", "docx"):
+        text = extract_text_from_doc(file_path)
+    else:
+        raise UnsupportedResumeFormat(
+            f"Неподдерживаемый тип файла: {extension}. Поддерживаются только PDF, DOC и DOCX."
+        )
+
+    # Печатаем первые 500 символов текста для отладки
+    print("\nПервые 500 символов текста:")
+    print("=" * 50)
+    print(text[:500])
+    print("=" * 50)
+
+    fields = detect_resume_fields(text)
+    fields["text"] = text
+    return fields
+
+
+class ResumeParserPool:
+    """
+    Ограниченный пул процессов для разбора резюме.
+
+    Одновременно выполняется не больше max_workers разборов, ждать очереди могут
+    не больше max_queue запросов, остальные сразу получают ResumeParserBusy.
+    Разбор дольше timeout секунд прерывается: пул выводится из работы, новые запросы
+    получают новый пул, а уже выполняющиеся в старом разборы доделываются; процессы
+    старого пула (с зависшим) завершаются, когда в нем не остается других разборов.
+    """
+
+    def __init__(self, max_workers: int = RESUME_PARSER_WORKERS,
+                 timeout: float = RESUME_PARSER_TIMEOUT,
+                 max_queue: int = RESUME_PARSER_MAX_QUEUE):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        # Число выполняющихся разборов в каждом пуле и пулы, выведенные из работы
+        self._running: Dict[ProcessPoolExecutor, int] = {}
+        self._retired: Set[ProcessPoolExecutor] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют соединения с БД и event loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    def _retire(self, executor: ProcessPoolExecutor):
+        """Выводит пул из работы; запрос, уже получивший новый пул, его не затрагивает"""
+        if self._executor is executor:
+            self._executor = None
+        self._retired.add(executor)
+
+    def _release(self, executor: ProcessPoolExecutor):
+        self._running[executor] -= 1
+        if self._running[executor] > 0:
+            return
+        del self._running[executor]
+        if executor in self._retired:
+            # Других разборов в пуле нет - завершаем оставшиеся (зависшие) процессы
+            self._retired.discard(executor)
+            self._terminate(executor)
+
+    @staticmethod
+    def _terminate(executor: ProcessPoolExecutor):
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func, *args):
+        """Выполняет func(*args) в процессе пула с ограничением очереди и таймаутом"""
+        if self._waiting >= self.max_queue:
+            raise ResumeParserBusy("Слишком много резюме в обработке, повторите попытку позже")
+
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        executor = self._get_executor()
+        self._running[executor] = self._running.get(executor, 0) + 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, func, *args),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Resume parsing timed out after {self.timeout}s, replacing parser pool")
+            self._retire(executor)
+            raise ResumeParseTimeout(f"Разбор резюме занял больше {self.timeout:.0f} секунд")
+        except BrokenProcessPool:
+            self._retire(executor)
+            raise ResumeParseError("Процесс разбора резюме аварийно завершился")
+        finally:
+            self._release(executor)
+            semaphore.release()
+
+    async def parse_file(self, file_path: str) -> Dict[str, Any]:
+        return await self.run(parse_resume_file, str(file_path))
+
+    async def extract_text(self, file_path: str) -> str:
+        return await self.run(extract_resume_text, str(file_path))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for executor in self._retired:
+            self._terminate(executor)
+        self._retired.clear()
+
+
+async def read_upload_limited(upload, max_bytes: int = RESUME_MAX_FILE_SIZE) -> bytes:
+    """Читает загруженный файл по частям и прерывает чтение, если он больше max_bytes"""
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(1024 * 1024)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise ResumeTooLarge(f"Файл больше {max_bytes // (1024 * 1024)} МБ")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+# Общий пул процессов для всех эндпоинтов
+resume_parser_pool = ResumeParserPool()
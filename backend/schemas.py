@@ -1,7 +1,8 @@
 from datetime import date
 from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator, model_validator
 from datetime import datetime
+from dateutils import parse_task_date, parse_task_time, format_task_date, format_task_time
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -136,12 +137,23 @@ class HHCandidate(HHCandidateBase):
 class TaskBase(BaseModel):
     title: str
     description: Optional[str] = None
-    date: str
-    time: Optional[str] = None
+    date: str  # YYYY-MM-DD
+    time: Optional[str] = None  # HH:MM
     status: str = "planned"
     assigned_to: Optional[int] = None
     created_by_id: Optional[int] = None
 
+    # В БД дата и время хранятся как DATE/TIME, в API остаются строками
+    @field_validator("date", mode="before")
+    @classmethod
+    def _format_date(cls, value):
+        return format_task_date(parse_task_date(value))
+
+    @field_validator("time", mode="before")
+    @classmethod
+    def _format_time(cls, value):
+        return format_task_time(parse_task_time(value))
+
 class TaskCreate(TaskBase):
     pass
 
@@ -153,6 +165,15 @@ class TaskUpdate(TaskBase):
     status: Optional[str] = None
     created_by_id: Optional[int] = None
 
+    # Дата задачи обязательна (NOT NULL): пустая дата в обновлении означает "не менять",
+    # как и отсутствующее поле. Пустое время по-прежнему сбрасывает время задачи
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_empty_date(cls, data):
+        if isinstance(data, dict) and "date" in data and data["date"] in (None, ""):
+            data = {key: value for key, value in data.items() if key != "date"}
+        return data
+
 class TaskCreator(BaseModel):
     id: int
     full_name: str
@@ -373,4 +394,30 @@ class TelegramBroadcastDetailResponse(TelegramBroadcastResponse):
     confirmations: List[MessageConfirmationResponse] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class SearchHit(BaseModel):
+    type: str  # application, hh_candidate
+    id: int
+    full_name: Optional[str] = None
+    position: Optional[str] = None
+    phone: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    rank: float
+
+class SearchResults(BaseModel):
+    query: str
+    mode: Optional[str] = None  # fulltext, fuzzy, phone
+    total: int
+    items: List[SearchHit] = []
+
+class HHCandidateCheckItem(BaseModel):
+    full_name: str
+    phone: Optional[str] = None  # на странице поиска HH телефона нет - тогда сверяется только ФИО
+
+class HHCandidateCheckBatch(BaseModel):
+    candidates: List[HHCandidateCheckItem]
+
+class MergeSuggestionUpdate(BaseModel):
+    status: str  # pending, merged, dismissed
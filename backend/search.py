@@ -0,0 +1,137 @@
+"""
+Полнотекстовый поиск по заявкам и кандидатам HH.
+
+Индекс - генерируемые колонки search_vector (tsvector) в таблицах applications и
+hh_candidates, создаются скриптом migrate_add_search.py. Каждое поле индексируется
+дважды: конфигурацией 'russian' (стемминг для кириллицы) и 'simple' (узбекский на
+латинице и прочие слова без стемминга). Для имен с опечатками и номеров телефонов
+используется триграммный поиск (pg_trgm).
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Типы документов и таблицы, по которым идет поиск
+SEARCH_SOURCES = {
+    "applications": {"type": "application", "table": "applications"},
+    "hh_candidates": {"type": "hh_candidate", "table": "hh_candidates"},
+}
+
+# Минимальное число цифр, чтобы считать запрос номером телефона
+MIN_PHONE_DIGITS = 4
+
+_PHONE_QUERY_RE = re.compile(r"^[\d\s()+\-]+$")
+
+# Выражение для номера телефона без форматирования - по нему построен триграммный индекс
+PHONE_DIGITS_SQL = "regexp_replace(coalesce({alias}.phone, ''), '[^0-9]', '', 'g')"
+
+_COLUMNS_SQL = (
+    "'{type}' AS type, {alias}.id, {alias}.full_name, {alias}.position, "
+    "{alias}.phone, {alias}.status, {alias}.created_at"
+)
+
+
+def _fulltext_part(source: Dict[str, str], alias: str) -> str:
+    columns = _COLUMNS_SQL.format(type=source["type"], alias=alias)
+    return (
+        f"SELECT {columns}, ts_rank_cd({alias}.search_vector, q.query) AS rank "
+        f"FROM {source['table']} {alias}, q "
+        f"WHERE {alias}.search_vector @@ q.query"
+    )
+
+
+def _fuzzy_name_part(source: Dict[str, str], alias: str) -> str:
+    columns = _COLUMNS_SQL.format(type=source["type"], alias=alias)
+    return (
+        f"SELECT {columns}, similarity({alias}.full_name, :q) AS rank "
+        f"FROM {source['table']} {alias} "
+        f"WHERE {alias}.full_name % :q"
+    )
+
+
+def _phone_part(source: Dict[str, str], alias: str) -> str:
+    columns = _COLUMNS_SQL.format(type=source["type"], alias=alias)
+    phone_digits = PHONE_DIGITS_SQL.format(alias=alias)
+    return (
+        f"SELECT {columns}, similarity({phone_digits}, :digits) AS rank "
+        f"FROM {source['table']} {alias} "
+        f"WHERE {phone_digits} LIKE :digits_like"
+    )
+
+
+def _build_query(mode: str, sources: List[Dict[str, str]]) -> str:
+    part_builders = {"fulltext": _fulltext_part, "fuzzy": _fuzzy_name_part, "phone": _phone_part}
+    parts = [part_builders[mode](source, f"t{i}") for i, source in enumerate(sources)]
+    prefix = ""
+    if mode == "fulltext":
+        prefix = (
+            "WITH q AS (SELECT websearch_to_tsquery('russian', :q) "
+            "|| websearch_to_tsquery('simple', :q) AS query) "
+        )
+    return prefix + "SELECT *, count(*) OVER () AS total FROM (" + " UNION ALL ".join(parts) + ") hits"
+
+
+def detect_mode(query: str) -> str:
+    digits = re.sub(r"\D", "", query)
+    if _PHONE_QUERY_RE.match(query) and len(digits) >= MIN_PHONE_DIGITS:
+        return "phone"
+    return "fulltext"
+
+
+async def _run(db: AsyncSession, mode: str, sources: List[Dict[str, str]], params: Dict[str, Any]):
+    sql = _build_query(mode, sources) + " ORDER BY rank DESC, created_at DESC, id DESC LIMIT :limit OFFSET :offset"
+    return (await db.execute(text(sql), params)).mappings().all()
+
+
+async def search(
+    db: AsyncSession,
+    query: str,
+    types: Optional[List[str]] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Dict[str, Any]:
+    """
+    Ищет заявки и кандидатов HH, результаты отсортированы по релевантности.
+
+    Запрос из цифр ищется по номеру телефона, остальные - полнотекстово;
+    если полнотекстовый поиск ничего не нашел, выполняется нечеткий поиск по ФИО.
+    """
+    query = query.strip()
+    sources = [SEARCH_SOURCES[name] for name in (types or SEARCH_SOURCES) if name in SEARCH_SOURCES]
+    if not query or not sources:
+        return {"query": query, "mode": None, "total": 0, "items": []}
+
+    digits = re.sub(r"\D", "", query)
+    params = {
+        "q": query,
+        "digits": digits,
+        "digits_like": f"%{digits}%",
+        "limit": limit,
+        "offset": offset,
+    }
+
+    mode = detect_mode(query)
+    rows = await _run(db, mode, sources, params)
+    if mode == "fulltext" and not rows:
+        # На следующих страницах режим должен совпадать с первой страницей
+        has_fulltext_hits = offset > 0 and bool(await _run(db, mode, sources, {**params, "limit": 1, "offset": 0}))
+        if not has_fulltext_hits:
+            mode = "fuzzy"
+            rows = await _run(db, mode, sources, params)
+
+    total = 0
+    items = []
+    for row in rows:
+        item = dict(row)
+        total = item.pop("total")
+        item["rank"] = float(item["rank"] or 0)
+        items.append(item)
+
+    return {
+        "query": query,
+        "mode": mode,
+        "total": total,
+        "items": items,
+    }
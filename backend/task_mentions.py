@@ -0,0 +1,49 @@
+"""
+Упоминания пользователей в задачах календаря (@email в названии или описании).
+
+Упоминания хранятся в таблице task_mentions (задача, email в нижнем регистре) и обновляются
+при создании и изменении задачи. Видимость задач для упомянутых пользователей проверяется
+по индексу этой таблицы, а не ILIKE '%@email%' по тексту всех задач.
+"""
+import re
+from typing import Set
+
+from sqlalchemy.orm import Session
+
+import models
+
+# Упоминание в формате @email, например: "Задача для @user@example.com, срочно!"
+MENTION_PATTERN = re.compile(r'@([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+
+
+def extract_mentions(text: str) -> Set[str]:
+    """
+    Извлекает упоминания пользователей в формате @email из текста
+
+    Например: "Задача для @user@example.com, срочно!"
+    """
+    if not text:
+        return set()
+
+    return set(MENTION_PATTERN.findall(text))
+
+
+def task_mention_emails(title: str, description: str) -> Set[str]:
+    """Email упомянутых в задаче пользователей в нижнем регистре (сравнение без учета регистра)"""
+    combined_text = f"{title or ''} {description or ''}"
+    return {email.lower() for email in extract_mentions(combined_text)}
+
+
+def sync_task_mentions(db: Session, task: models.Task):
+    """
+    Приводит записи task_mentions задачи в соответствие с текущими названием и описанием.
+    Изменения попадают в ту же транзакцию, что и задача; commit - на стороне вызывающего.
+    """
+    emails = task_mention_emails(task.title, task.description)
+    current = {mention.email: mention for mention in task.mentions}
+
+    for email, mention in current.items():
+        if email not in emails:
+            task.mentions.remove(mention)
+    for email in emails - set(current):
+        task.mentions.append(models.TaskMention(email=email))
@@ -2,15 +2,20 @@ import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 import importlib
-from database import get_db
+from database import SessionLocal, AsyncSessionLocal
 import models
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from uuid import uuid4
 
 # Словарь для хранения данных о подтверждениях
 message_confirmations = {}
 
+# Сколько записей о подтверждениях накапливать перед записью в БД
+CONFIRMATIONS_BATCH_SIZE = 50
+
 # Импортируем бота из существующего файла
 try:
     # Динамический импорт бота и необходимых функций
@@ -52,6 +57,10 @@ async def send_broadcast_message(message_text: str, telegram_ids: List[str], bro
     # Создаем inline клавиатуру с кнопкой подтверждения
     confirmation_keyboard = InlineKeyboardMarkup(row_width=2)
     
+    # Записи о подтверждениях копятся и сохраняются пачками одной сессией,
+    # а не отдельным соединением на каждого получателя
+    pending_confirmations = []
+    
     # Перебираем всех получателей и отправляем сообщение каждому
     for chat_id in telegram_ids:
         try:
@@ -97,23 +106,17 @@ async def send_broadcast_message(message_text: str, telegram_ids: List[str], bro
                     'sent_at': datetime.now().isoformat()
                 }
                 
-                # Затем сохраняем в базу данных
-                db = next(get_db())
-                try:
-                    # Создаем запись о неподтвержденном сообщении
-                    message_confirmation = models.MessageConfirmation(
-                        broadcast_id=broadcast_id,
-                        telegram_chat_id=str(chat_id),
-                        confirmation_key=confirmation_id,  # Сохраняем ключ подтверждения
-                        status='sent',
-                        message_id=sent_message.message_id
-                    )
-                    db.add(message_confirmation)
-                    db.commit()
-                except Exception as e:
-                    logging.error(f"Error saving message confirmation to DB: {e}")
-                finally:
-                    db.close()
+                # Затем ставим запись о неподтвержденном сообщении в очередь на сохранение
+                pending_confirmations.append(models.MessageConfirmation(
+                    broadcast_id=broadcast_id,
+                    telegram_chat_id=str(chat_id),
+                    confirmation_key=confirmation_id,  # Сохраняем ключ подтверждения
+                    status='sent',
+                    message_id=sent_message.message_id
+                ))
+                if len(pending_confirmations) >= CONFIRMATIONS_BATCH_SIZE:
+                    await save_message_confirmations(pending_confirmations)
+                    pending_confirmations = []
             
             # Увеличиваем счетчик успешных отправок
             results['success_count'] += 1
@@ -127,9 +130,23 @@ async def send_broadcast_message(message_text: str, telegram_ids: List[str], bro
             results['failed_ids'].append(chat_id)
             logging.error(f"Error sending message to {chat_id}: {str(e)}")
     
+    if pending_confirmations:
+        await save_message_confirmations(pending_confirmations)
+    
     return results
 
-async def get_users_by_status(db: Session, status: str) -> List[str]:
+async def save_message_confirmations(confirmations: List[models.MessageConfirmation]):
+    """
+    Сохраняет пачку записей о подтверждениях одной короткой транзакцией.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            db.add_all(confirmations)
+            await db.commit()
+    except Exception as e:
+        logging.error(f"Error saving message confirmations to DB: {e}")
+
+async def get_users_by_status(db: AsyncSession, status: str) -> List[str]:
     """
     Получает Telegram ID всех кандидатов с указанным статусом.
     
@@ -173,14 +190,14 @@ async def get_users_by_status(db: Session, status: str) -> List[str]:
     logging.info(f"Ищем заявки со статусами: {status_variants}")
     
     # Получаем все статусы для отладки
-    all_statuses = db.query(models.Application.status).distinct().all()
+    all_statuses = (await db.execute(select(models.Application.status).distinct())).all()
     logging.info(f"Доступные статусы в базе: {[s[0] for s in all_statuses]}")
     
     # Ищем заявки с указанным статусом (любым из вариантов)
-    applications = db.query(models.Application).filter(
+    applications = (await db.execute(select(models.Application).filter(
         models.Application.status.in_(status_variants),
         models.Application.telegram_chat_id.isnot(None)  # Только с привязанным Telegram
-    ).all()
+    ))).scalars().all()
     
     logging.info(f"Найдено {len(applications)} заявок со статусами {status_variants}")
     
@@ -191,7 +208,7 @@ async def get_users_by_status(db: Session, status: str) -> List[str]:
     
     return telegram_ids
 
-async def get_telegram_ids_by_user_ids(db: Session, user_ids: List[int]) -> List[str]:
+async def get_telegram_ids_by_user_ids(db: AsyncSession, user_ids: List[int]) -> List[str]:
     """
     Получает Telegram ID пользователей по их ID.
     
@@ -204,10 +221,10 @@ async def get_telegram_ids_by_user_ids(db: Session, user_ids: List[int]) -> List
     """
     # Теперь user_ids это ID заявок, а не пользователей
     # Ищем заявки по указанным ID
-    applications = db.query(models.Application).filter(
+    applications = (await db.execute(select(models.Application).filter(
         models.Application.id.in_(user_ids),
         models.Application.telegram_chat_id.isnot(None)
-    ).all()
+    ))).scalars().all()
     
     # Собираем telegram_chat_id из заявок
     telegram_ids = [app.telegram_chat_id for app in applications if app.telegram_chat_id]
@@ -334,7 +351,6 @@ def register_callback_handlers(dp=None):
         logging.warning("Cannot register callback handlers: bot or dispatcher is not available")
         return
     
-    from database import get_db
     from functools import partial
     
     @dp.callback_query_handler(lambda c: c.data.startswith('confirm_') or c.data.startswith('reject_'))
@@ -342,7 +358,7 @@ def register_callback_handlers(dp=None):
         """Обрабатывает callback запросы от кнопок подтверждения"""
         if not db:
             # Получаем сессию базы данных
-            db_session = next(get_db())
+            db_session = SessionLocal()
             try:
                 await process_confirmation_callback(callback_query, db_session)
             finally:
@@ -353,7 +369,7 @@ def register_callback_handlers(dp=None):
     logging.info("Confirmation callback handlers registered successfully")
 
 async def process_broadcast(
-    db: Session, 
+    db: AsyncSession, 
     message: str, 
     status: Optional[str] = None, 
     user_ids: Optional[List[int]] = None,
@@ -0,0 +1,150 @@
+"""
+Проверка асинхронного клиента HH на локальном тестовом сервере (fake_hh_server.py).
+Запуск: python test_hh_client.py
+"""
+import asyncio
+import sys
+import time
+
+from fake_hh_server import FakeHHServer
+from hh_api import HeadHunterParser, HHClientError
+
+
+def make_client(server, **kwargs):
+    return HeadHunterParser(
+        base_url=server.url,
+        login=server.login,
+        password=server.password,
+        retry_backoff=0.05,
+        **kwargs
+    )
+
+
+async def check_search_and_detail(server):
+    client = make_client(server)
+    try:
+        resumes = await client.search_resumes("python", page=0)
+        print(f"Найдено резюме на первой странице: {len(resumes)}")
+        assert len(resumes) == server.page_size
+
+        detail = await client.get_resume_detail(resumes[0]["id"])
+        print(f"Резюме {resumes[0]['id']}: {detail}")
+        assert detail["full_name"] and detail["birth_date"] != "Не указана"
+        assert server.requests["/account/login"] == 2, "авторизация должна выполняться один раз"
+    finally:
+        await client.close()
+
+
+async def check_concurrency_limit(server):
+    server.delay = 0.05
+    server.max_in_flight = 0
+    client = make_client(server, max_concurrency=3)
+    try:
+        await client.authorize()
+        started = time.perf_counter()
+        pages = await asyncio.gather(*(client.search_resumes("python", page=i % 2) for i in range(12)))
+        elapsed = time.perf_counter() - started
+        print(f"12 параллельных запросов за {elapsed:.2f} с, одновременно на сервере: {server.max_in_flight}")
+        assert all(pages)
+        assert server.max_in_flight <= 3
+    finally:
+        server.delay = 0
+        await client.close()
+
+
+async def check_retries(server):
+    client = make_client(server)
+    try:
+        await client.authorize()
+        server.fail(2, status=503)
+        resumes = await client.search_resumes("python")
+        print(f"После двух ответов 503 получено резюме: {len(resumes)}")
+        assert resumes
+
+        server.fail(1, status=429, retry_after=1)
+        started = time.perf_counter()
+        resumes = await client.search_resumes("python")
+        elapsed = time.perf_counter() - started
+        print(f"После 429 с Retry-After=1 ответ через {elapsed:.2f} с")
+        assert resumes and elapsed >= 1
+
+        server.fail(client.max_retries + 1, status=503)
+        try:
+            await client.search_resumes("python")
+            raise AssertionError("ожидалась ошибка HHClientError")
+        except HHClientError as e:
+            print(f"Все повторы исчерпаны: {e}")
+    finally:
+        server.fail(0)
+        await client.close()
+
+
+async def check_session_expiry(server):
+    client = make_client(server)
+    try:
+        await client.authorize()
+        server.expire_sessions()
+        resumes = await client.search_resumes("python")
+        print(f"После истечения сессии получено резюме: {len(resumes)}")
+        assert resumes
+    finally:
+        await client.close()
+
+
+async def check_cache_and_prefetch(server):
+    client = make_client(server)
+    try:
+        first = await client.search_resumes_cached("Python", page=0)
+        print(f"Первая страница: {len(first['ids'])} резюме, кэш: {first['cache']}")
+        assert not first["cache"]["cached"]
+
+        # Тот же запрос с другим регистром и пробелами берется из кэша
+        again = await client.search_resumes_cached("  python ", page=0)
+        assert again["cache"]["cached"] and again["ids"] == first["ids"]
+
+        # Следующая страница загружена в фоне
+        await asyncio.gather(*list(client._prefetch_tasks))
+        searches = server.requests["/search/resume"]
+        second = await client.search_resumes_cached("python", page=1)
+        print(f"Вторая страница: {len(second['ids'])} резюме, кэш: {second['cache']}")
+        assert second["cache"]["cached"] and server.requests["/search/resume"] == searches
+
+        detail = await client.get_resume_detail_cached(first["ids"][0])
+        detail_again = await client.get_resume_detail_cached(first["ids"][0])
+        assert not detail["cache"]["cached"] and detail_again["cache"]["cached"]
+        assert server.requests[f"/resume/{first['ids'][0]}"] == 1
+    finally:
+        await client.close()
+
+
+async def run():
+    checks = [
+        check_search_and_detail,
+        check_concurrency_limit,
+        check_retries,
+        check_session_expiry,
+        check_cache_and_prefetch,
+    ]
+    failed = 0
+    for check in checks:
+        server = await FakeHHServer().start()
+        print(f"\n=== {check.__name__} ===")
+        try:
+            await check(server)
+            print("OK")
+        except Exception as e:
+            failed += 1
+            print(f"ОШИБКА: {type(e).__name__}: {e}")
+        finally:
+            await server.stop()
+    print(f"\nПроверок: {len(checks)}, с ошибками: {failed}")
+    return failed
+
+
+def main():
+    failed = asyncio.run(run())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
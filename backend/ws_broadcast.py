@@ -0,0 +1,210 @@
+"""
+Межпроцессная рассылка WebSocket-событий.
+
+Каждый воркер uvicorn держит свои WebSocket-соединения в памяти, поэтому событие,
+опубликованное на одном воркере, нужно доставить всем остальным. Бэкенд публикует
+событие и вызывает обработчик доставки на каждом воркере (включая отправителя).
+
+Бэкенды:
+    memory   - доставка только внутри процесса (один воркер, тесты)
+    postgres - PostgreSQL LISTEN/NOTIFY, без дополнительной инфраструктуры (Redis и т.п.)
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from config import ASYNC_DATABASE_URL, WS_BROADCAST_BACKEND, WS_BROADCAST_CHANNEL
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# NOTIFY принимает payload до 8000 байт, большие события кладем в таблицу и передаем только id
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+# Сколько хранить большие события в таблице (секунды)
+PAYLOAD_TTL_SECONDS = 300
+
+
+class MemoryBroadcastBackend:
+    """Доставка внутри текущего процесса"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+
+    async def stop(self):
+        self._handler = None
+
+    async def publish(self, event: Dict[str, Any]):
+        if self._handler:
+            await self._handler(event)
+
+
+class PostgresBroadcastBackend:
+    """
+    Рассылка через PostgreSQL LISTEN/NOTIFY.
+
+    Для прослушивания канала держится отдельное соединение asyncpg (вне пула SQLAlchemy),
+    при обрыве оно переподключается с экспоненциальной задержкой. Публикация идет
+    через обычный пул AsyncSessionLocal.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self._handler: Optional[EventHandler] = None
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._listener_task: Optional[asyncio.Task] = None
+        self._consumer_task: Optional[asyncio.Task] = None
+        self._connection = None
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+        await self._ensure_payload_table()
+        self._consumer_task = asyncio.create_task(self._consume())
+        self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        for task in (self._listener_task, self._consumer_task):
+            if task:
+                task.cancel()
+        for task in (self._listener_task, self._consumer_task):
+            if task:
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        await self._close_connection()
+        self._handler = None
+
+    async def publish(self, event: Dict[str, Any]):
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        try:
+            async with AsyncSessionLocal() as db:
+                if len(payload.encode("utf-8")) > MAX_NOTIFY_PAYLOAD_BYTES:
+                    payload_id = (await db.execute(
+                        text("INSERT INTO ws_event_payloads (payload) VALUES (:payload) RETURNING id"),
+                        {"payload": payload}
+                    )).scalar_one()
+                    await db.execute(
+                        text("DELETE FROM ws_event_payloads WHERE created_at < now() - make_interval(secs => :ttl)"),
+                        {"ttl": PAYLOAD_TTL_SECONDS}
+                    )
+                    notify_payload = json.dumps({"payload_id": payload_id})
+                else:
+                    notify_payload = payload
+                await db.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {"channel": self.channel, "payload": notify_payload}
+                )
+                await db.commit()
+        except Exception as e:
+            # Если БД недоступна, доставляем хотя бы клиентам текущего воркера
+            logger.error(f"Error publishing WebSocket event via NOTIFY, delivering locally: {e}")
+            if self._handler:
+                await self._handler(event)
+
+    async def _ensure_payload_table(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text(
+                    "CREATE UNLOGGED TABLE IF NOT EXISTS ws_event_payloads ("
+                    "id BIGSERIAL PRIMARY KEY, "
+                    "payload TEXT NOT NULL, "
+                    "created_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error creating ws_event_payloads table: {e}")
+
+    async def _listen(self):
+        import asyncpg
+
+        delay = 1
+        while True:
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                await self._connection.add_listener(self.channel, self._on_notify)
+                logger.info(f"Listening for WebSocket events on channel {self.channel}")
+                delay = 1
+                # Периодически проверяем, что соединение живо
+                while True:
+                    await asyncio.sleep(30)
+                    await self._connection.fetchval("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket event listener error, reconnecting in {delay}s: {e}")
+                await self._close_connection()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        # Колбэк asyncpg синхронный - передаем событие в очередь, чтобы сохранить порядок
+        self._queue.put_nowait(payload)
+
+    async def _consume(self):
+        while True:
+            payload = await self._queue.get()
+            try:
+                event = json.loads(payload)
+                if isinstance(event, dict) and set(event) == {"payload_id"}:
+                    event = await self._load_payload(event["payload_id"])
+                    if event is None:
+                        continue
+                if self._handler:
+                    await self._handler(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error delivering WebSocket event: {e}")
+
+    async def _load_payload(self, payload_id: int) -> Optional[Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            payload = (await db.execute(
+                text("SELECT payload FROM ws_event_payloads WHERE id = :id"),
+                {"id": payload_id}
+            )).scalar_one_or_none()
+        if payload is None:
+            logger.warning(f"WebSocket event payload {payload_id} not found (expired?)")
+            return None
+        return json.loads(payload)
+
+    async def _close_connection(self):
+        if self._connection is not None:
+            try:
+                await self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+
+def _asyncpg_dsn(url: str) -> str:
+    """asyncpg не понимает префикс драйвера SQLAlchemy"""
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def create_broadcast_backend(name: str = WS_BROADCAST_BACKEND, channel: str = WS_BROADCAST_CHANNEL):
+    """
+    Создает бэкенд рассылки по имени из настроек (WS_BROADCAST_BACKEND).
+    channel - канал NOTIFY; служебные события (например, изменения задач) идут по своему каналу
+    """
+    name = (name or "memory").lower()
+    if name == "postgres":
+        if not ASYNC_DATABASE_URL.startswith("postgresql"):
+            logger.warning("WS_BROADCAST_BACKEND=postgres requires PostgreSQL, falling back to memory backend")
+            return MemoryBroadcastBackend()
+        return PostgresBroadcastBackend(_asyncpg_dsn(ASYNC_DATABASE_URL), channel)
+    if name != "memory":
+        logger.warning(f"Unknown WS_BROADCAST_BACKEND '{name}', falling back to memory backend")
+    return MemoryBroadcastBackend()
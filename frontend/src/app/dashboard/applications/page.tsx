@@ -421,6 +421,8 @@ export default function ApplicationsPage() {
             return;
           }
           console.log('WebSocket connection established');
+          // Подписываемся на ленту заявок: новые заявки и сообщения кандидатов
+          newWs.send(JSON.stringify({ type: 'subscribe', topic: 'applications' }));
           setWs(newWs);
           reconnectAttempts = 0;
         };
@@ -507,6 +509,17 @@ export default function ApplicationsPage() {
       } catch (error) {
         console.error('Ошибка при отправке подписки:', error);
       }
+
+      // Отписываемся от чата заявки при смене выбранной заявки
+      const applicationId = selectedApp.id;
+      return () => {
+        if (ws.readyState === WebSocket.OPEN) {
+          ws.send(JSON.stringify({
+            type: 'unsubscribe',
+            application_id: applicationId
+          }));
+        }
+      };
     }
   }, [selectedApp?.id, ws?.readyState]);
 